@@ -0,0 +1,242 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from astrbot.api import logger
+
+from .metrics import PluginMetrics
+
+# 优先级，数值越小越先执行
+PRIORITY_BAN = 0
+PRIORITY_KICK = 1
+PRIORITY_MESSAGE = 2
+PRIORITY_RECALL = 3
+
+
+class _Action:
+    __slots__ = ("bot", "name", "group_id", "params", "priority", "future", "attempts", "coalesce_key")
+
+    def __init__(self, bot: Any, name: str, group_id: int, params: Dict[str, Any], priority: int,
+                 future: asyncio.Future, coalesce_key: Optional[Hashable]):
+        self.bot = bot
+        self.name = name
+        self.group_id = group_id
+        self.params = params
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+        self.coalesce_key = coalesce_key
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """是否为值得重试的临时错误
+
+    只有网络类错误（连接失败、超时，aiocqhttp 的 NetworkError 也是 IOError）才重试；
+    接口返回的业务错误带有 retcode（如 aiocqhttp 的 ActionFailed，权限不足等），
+    与程序错误一样重试也不会成功。
+    """
+    if getattr(error, "retcode", None) is not None:
+        return False
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+def _retrieve_exception(future: asyncio.Future):
+    # 调用方不等待结果时避免 "exception was never retrieved" 警告
+    if not future.cancelled():
+        future.exception()
+
+
+class ActionScheduler:
+    """OneBot 动作发送队列
+
+    - 每个群一个令牌桶，限制对同一个群的调用速率
+    - 同一个群内按优先级发送（禁言先于提示消息，撤回消息最后）
+    - 网络类的临时错误按指数退避重试，接口返回的业务错误（ActionFailed）和程序错误不重试
+    - coalesce_window 秒内对同一用户的重复禁言/踢人合并为一次调用
+
+    submit 立即返回一个 Future，调用方可以不等待直接返回。
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 5, max_retries: int = 3,
+                 retry_base_delay: float = 0.5, coalesce_window: float = 10.0, concurrency: int = 8,
+                 metrics: Optional[PluginMetrics] = None):
+        self.rate = max(float(rate), 0.01)
+        self.burst = max(1, int(burst))
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.coalesce_window = coalesce_window
+        self.concurrency = concurrency
+        # 记录每次调用的耗时和失败
+        self.metrics = metrics
+
+        # 每个群的待发送队列: { gid: [(priority, seq, _Action)] }
+        self._queues: Dict[int, List[Tuple[int, int, _Action]]] = {}
+        # 每个群的令牌桶: { gid: [tokens, last_refill] }
+        self._buckets: Dict[int, List[float]] = {}
+        # 近期提交过的可合并动作: { key: (提交时间, Future) }
+        self._recent: Dict[Hashable, Tuple[float, asyncio.Future]] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 执行中的任务，持有引用避免被回收
+        self._inflight = set()
+
+        # 统计计数
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.coalesced = 0
+
+    @property
+    def pending(self) -> int:
+        """排队中的动作数"""
+        return sum(len(heap) for heap in self._queues.values())
+
+    @property
+    def inflight(self) -> int:
+        """已出队、正在等待并发名额或接口返回的动作数"""
+        return len(self._inflight)
+
+    def submit(self, bot: Any, action: str, gid: int, priority: int = PRIORITY_MESSAGE, **params) -> asyncio.Future:
+        """提交一个动作，立即返回结果 Future
+
+        gid 决定使用哪个群的限速队列，params 原样传给 call_action。
+        """
+        self._ensure_worker()
+        now = time.monotonic()
+
+        coalesce_key = None
+        if action in ("set_group_ban", "set_group_kick") and "user_id" in params:
+            # 禁言时长不同的请求（如处罚升级）不合并
+            coalesce_key = (action, gid, params["user_id"], params.get("duration"))
+            recent = self._recent.get(coalesce_key)
+            if recent is not None and now - recent[0] < self.coalesce_window:
+                self.coalesced += 1
+                return recent[1]
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        if coalesce_key is not None:
+            self._prune_recent(now)
+            self._recent[coalesce_key] = (now, future)
+
+        self.submitted += 1
+        self._push(_Action(bot, action, gid, params, priority, future, coalesce_key))
+        return future
+
+    def _push(self, action: _Action):
+        heap = self._queues.get(action.group_id)
+        if heap is None:
+            heap = self._queues[action.group_id] = []
+        heapq.heappush(heap, (action.priority, next(self._seq), action))
+        self._wakeup.set()
+
+    def _prune_recent(self, now: float):
+        if len(self._recent) < 1024:
+            return
+        expired = [key for key, (submitted_at, _) in self._recent.items() if now - submitted_at >= self.coalesce_window]
+        for key in expired:
+            del self._recent[key]
+
+    def _take_token(self, gid: int, now: float) -> float:
+        """尝试从群的令牌桶取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        bucket = self._buckets.get(gid)
+        if bucket is None:
+            bucket = self._buckets[gid] = [float(self.burst), now]
+        tokens = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / self.rate
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """按令牌桶和优先级分发动作"""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_wait: Optional[float] = None
+            for gid in list(self._queues):
+                heap = self._queues[gid]
+                while heap:
+                    wait = self._take_token(gid, now)
+                    if wait:
+                        next_wait = wait if next_wait is None else min(next_wait, wait)
+                        break
+                    _, _, action = heapq.heappop(heap)
+                    task = asyncio.create_task(self._execute(action))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+                if not heap:
+                    del self._queues[gid]
+                    # 令牌桶已补满的群不再保留状态
+                    bucket = self._buckets.get(gid)
+                    if bucket is not None and bucket[0] + (now - bucket[1]) * self.rate >= self.burst:
+                        del self._buckets[gid]
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, action: _Action):
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                result = await action.bot.api.call_action(action.name, **action.params)
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.observe_action(action.name, time.perf_counter() - started, error=True)
+                if is_transient_error(e) and action.attempts < self.max_retries:
+                    action.attempts += 1
+                    self.retried += 1
+                    delay = self.retry_base_delay * (2 ** (action.attempts - 1))
+                    logger.warning(f"[刷屏禁言] 调用 {action.name} 失败，{delay:.1f} 秒后第 {action.attempts} 次重试: {e}")
+                    asyncio.get_running_loop().call_later(delay, self._push, action)
+                    return
+                self.failed += 1
+                logger.error(f"[刷屏禁言] 调用 {action.name} 失败（群 {action.group_id}）: {e}")
+                if action.coalesce_key is not None:
+                    recent = self._recent.get(action.coalesce_key)
+                    if recent is not None and recent[1] is action.future:
+                        del self._recent[action.coalesce_key]
+                if not action.future.done():
+                    action.future.set_exception(e)
+                return
+
+        if self.metrics is not None:
+            self.metrics.observe_action(action.name, time.perf_counter() - started)
+        self.sent += 1
+        if not action.future.done():
+            action.future.set_result(result)
+
+    async def stop(self):
+        """停止发送，取消所有未完成的动作"""
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+        for heap in self._queues.values():
+            for _, _, action in heap:
+                action.future.cancel()
+        self._queues.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """返回队列统计信息"""
+        return {
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "coalesced": self.coalesced,
+        }
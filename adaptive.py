@@ -0,0 +1,143 @@
+import math
+from typing import Dict, Optional
+
+
+class P2Quantile:
+    """P² 算法流式估计单个分位数
+
+    只保存 5 个标记点的高度和位置，每个样本 O(1) 更新，不保存样本本身。
+    样本不足 5 个时按已有样本直接取值。
+    """
+
+    __slots__ = ("p", "count", "_heights", "_positions", "_desired", "_increments")
+
+    def __init__(self, p: float):
+        self.p = min(max(float(p), 0.01), 0.999)
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1.0, 1 + 2 * self.p, 1 + 4 * self.p, 3 + 2 * self.p, 5.0]
+        self._increments = (0.0, self.p / 2, self.p, (1 + self.p) / 2, 1.0)
+
+    def add(self, x: float):
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        positions = self._positions
+        # 找到样本所在的区间，必要时更新最小、最大值
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        desired = self._desired
+        for i in range(5):
+            desired[i] += self._increments[i]
+
+        # 调整中间三个标记点，偏离期望位置超过 1 时移动一格
+        for i in (1, 2, 3):
+            d = desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q = self._heights
+        n = self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        """当前的分位数估计，没有样本时为 None"""
+        if not self.count:
+            return None
+        if self.count <= 5:
+            index = min(len(self._heights) - 1, int(round(self.p * (len(self._heights) - 1))))
+            return self._heights[index]
+        return self._heights[2]
+
+
+class TrafficBaseline:
+    """单个群的消息速率基线，用于自适应刷屏阈值
+
+    每条正常消息提供一个样本：发送者最近 period 秒内的消息开销（按时间衰减的计数）。
+    基线由样本的 EWMA 和 P² 分位数组成，每个样本 O(1) 更新，每个群的内存固定。
+    P² 估计不会遗忘旧样本，因此每 window 个样本重新开始一轮，新一轮样本不足时沿用上一轮的结果。
+    """
+
+    # 一轮中至少有这么多样本，分位数才用于计算阈值
+    MIN_SAMPLES = 100
+
+    __slots__ = ("quantile", "window", "period", "ewma", "samples", "_alpha", "_sketch", "_previous")
+
+    def __init__(self, quantile: float, window: int, period: float):
+        self.quantile = quantile
+        self.window = max(self.MIN_SAMPLES, int(window))
+        self.period = max(float(period), 0.001)
+        self.ewma = 0.0
+        self.samples = 0
+        self._alpha = 2.0 / (self.window + 1)
+        self._sketch = P2Quantile(quantile)
+        self._previous: Optional[float] = None
+
+    def observe(self, burst: float):
+        """记录一个样本"""
+        if self.samples:
+            self.ewma += self._alpha * (burst - self.ewma)
+        else:
+            self.ewma = burst
+        self.samples += 1
+        sketch = self._sketch
+        sketch.add(burst)
+        if sketch.count >= self.window:
+            self._previous = sketch.value()
+            self._sketch = P2Quantile(self.quantile)
+
+    def tail(self) -> Optional[float]:
+        """当前可用的分位数，样本不足时为 None"""
+        if self._sketch.count >= self.MIN_SAMPLES:
+            return self._sketch.value()
+        return self._previous
+
+    def threshold(self, headroom: float, minimum: int, maximum: int) -> Optional[int]:
+        """阈值 = 分位数 + 余量倍数 × (分位数 - 平均值)，限制在 [minimum, maximum] 之间
+
+        样本不足时返回 None，由调用方使用固定阈值。
+        """
+        tail = self.tail()
+        if tail is None:
+            return None
+        threshold = math.ceil(tail + headroom * max(0.0, tail - self.ewma) - 1e-9)
+        return min(max(threshold, minimum), maximum)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "samples": self.samples,
+            "rate": self.ewma / self.period,
+            "mean": self.ewma,
+            "tail": self.tail(),
+        }
+
+
+def decayed_burst(previous: float, elapsed: float, period: float, cost: float) -> float:
+    """按时间衰减的消息计数，匀速发送时约等于最近 period 秒内的消息开销"""
+    if elapsed <= 0:
+        return previous + cost
+    return previous * math.exp(-elapsed / period) + cost
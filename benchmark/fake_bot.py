@@ -0,0 +1,112 @@
+import asyncio
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ActionFailed(Exception):
+    """模拟 OneBot 返回的业务错误（权限不足、参数错误等），与 aiocqhttp 一样带有 retcode，不会重试"""
+
+    def __init__(self, message: str, retcode: int = 100):
+        super().__init__(message)
+        self.retcode = retcode
+
+
+class FakeOneBotAPI:
+    """模拟 event.bot.api，call_action 按设定的延迟返回，并按概率失败
+
+    Args:
+        latency: 平均调用延迟（秒）
+        jitter: 延迟的随机浮动比例，0.5 表示在 [0.5, 1.5] 倍平均延迟之间
+        failure_rate: 网络类错误（会被重试）的概率
+        permanent_failure_rate: 业务错误（不会被重试）的概率
+        roles: 指定用户的群角色 { uid: "owner"/"admin"/"member" }，未指定的为 member
+        self_id: 机器人 QQ 号，默认具有管理员权限
+    """
+
+    def __init__(self,
+                 latency: float = 0.01,
+                 jitter: float = 0.5,
+                 failure_rate: float = 0.0,
+                 permanent_failure_rate: float = 0.0,
+                 roles: Optional[Dict[int, str]] = None,
+                 self_id: int = 10000,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.permanent_failure_rate = permanent_failure_rate
+        self.roles = dict(roles or {})
+        self.roles.setdefault(self_id, "admin")
+        self.self_id = self_id
+        self._random = random.Random(seed)
+
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.log: List[Tuple[str, Dict[str, Any]]] = []
+
+    async def call_action(self, action: str, **params) -> Dict[str, Any]:
+        self.calls[action] += 1
+        self.log.append((action, params))
+        if self.latency > 0:
+            delay = self.latency * (1 + self.jitter * (2 * self._random.random() - 1))
+            await asyncio.sleep(max(0.0, delay))
+
+        roll = self._random.random()
+        if roll < self.permanent_failure_rate:
+            self.failures[action] += 1
+            raise ActionFailed(f"{action} failed")
+        if roll < self.permanent_failure_rate + self.failure_rate:
+            self.failures[action] += 1
+            raise ConnectionError(f"{action} timed out")
+
+        if action == "get_group_member_info":
+            user_id = int(params.get("user_id", 0))
+            return {
+                "group_id": params.get("group_id"),
+                "user_id": user_id,
+                "role": self.roles.get(user_id, "member"),
+                "nickname": f"user{user_id}",
+                "card": "",
+            }
+        return {}
+
+
+class FakeBot:
+    def __init__(self, api: FakeOneBotAPI):
+        self.api = api
+
+
+class FakeMessageObject:
+    def __init__(self, raw_message: Dict[str, Any]):
+        self.raw_message = raw_message
+
+
+class FakeEvent:
+    """插件用到的 AstrMessageEvent 接口子集"""
+
+    def __init__(self, bot: FakeBot, raw: Dict[str, Any], message_str: str = ""):
+        self.bot = bot
+        self.message_obj = FakeMessageObject(raw)
+        self.message_str = message_str
+
+    def get_self_id(self) -> str:
+        return str(self.bot.api.self_id)
+
+    def get_platform_name(self) -> str:
+        return "aiocqhttp"
+
+    def plain_result(self, text: str) -> str:
+        return text
+
+
+def message_text(raw: Dict[str, Any]) -> str:
+    """从原始事件中提取纯文本，作为 event.message_str"""
+    message = raw.get("message")
+    if isinstance(message, str):
+        return message
+    parts = []
+    for seg in message or ():
+        if isinstance(seg, dict) and seg.get("type") == "text":
+            parts.append(seg.get("data", {}).get("text", ""))
+    return "".join(parts)
@@ -0,0 +1,349 @@
+"""刷屏禁言插件离线压测
+
+不需要真实 QQ 账号：用模拟的 OneBot 接口驱动 BanFloodingTheScreenPlugin.handle_group_message，
+统计吞吐量、处理延迟、协程数量和内存占用。需要在装有 AstrBot 的环境中运行。
+
+用法:
+    python benchmark/run.py --scenario mixed
+    python benchmark/run.py --replay events.jsonl --set detector_type=token_bucket
+    python benchmark/run.py --scenario raid --record raid.jsonl
+"""
+
+import argparse
+import asyncio
+import heapq
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot import FakeBot, FakeEvent, FakeOneBotAPI, message_text  # noqa: E402
+from scenarios import SCENARIOS, TimedEvent, dump_jsonl, generate, load_jsonl  # noqa: E402
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "ban_flooding_the_screen"
+
+
+class VirtualClock:
+    """替换插件各模块中的 time 和 asyncio，使计时和定时等待都跟随事件流中的时间
+
+    这样 5 分钟的聊天记录可以在几秒内重放完，检测、动作合并、限速和累计次数的衰减
+    与按真实节奏发送一致；后台循环（状态过期清理、攻击模式批量禁言、延迟踢人等）的
+    asyncio.sleep / asyncio.wait_for 按虚拟时间到期。虚拟时间在两次事件之间仍按真实时间流逝，
+    发送队列可以正常排空。其余函数（perf_counter 等）仍使用真实时间。
+    """
+
+    def __init__(self):
+        self._start = time.monotonic()
+        # 虚拟时间领先真实时间的秒数
+        self.offset = 0.0
+        # 等待中的 sleep: (虚拟截止时间, 序号, future)
+        self._sleepers: List[Any] = []
+        self._sequence = 0
+        self.asyncio = _VirtualAsyncio(self)
+
+    def advance_to(self, t: float):
+        """把虚拟时间推进到事件流中的第 t 秒（不会后退），唤醒已到期的 sleep"""
+        self.offset = max(self.offset, self._start + t - time.monotonic())
+        now = self.monotonic()
+        while self._sleepers and self._sleepers[0][0] <= now:
+            _, _, waiter = heapq.heappop(self._sleepers)
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def monotonic(self) -> float:
+        return time.monotonic() + self.offset
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    async def sleep(self, delay: float, result: Any = None) -> Any:
+        """按虚拟时间等待 delay 秒
+
+        虚拟时间不慢于真实时间，真实时间过去 delay 秒时虚拟时间一定已经到期，
+        因此同时登记一个真实定时器，虚拟时间不再推进时也能按时醒来。
+        """
+        if delay <= 0:
+            return await asyncio.sleep(0, result)
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._sequence += 1
+        heapq.heappush(self._sleepers, (self.monotonic() + delay, self._sequence, waiter))
+        handle = loop.call_later(delay, lambda: waiter.done() or waiter.set_result(None))
+        try:
+            await waiter
+        finally:
+            handle.cancel()
+        return result
+
+    async def wait_for(self, awaitable: Any, timeout: Optional[float]) -> Any:
+        """按虚拟时间计算超时的 asyncio.wait_for"""
+        if timeout is None:
+            return await awaitable
+        task = asyncio.ensure_future(awaitable)
+        timer = asyncio.ensure_future(self.sleep(timeout))
+        try:
+            await asyncio.wait({task, timer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            timer.cancel()
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if task.cancelled():
+            raise asyncio.TimeoutError()
+        return task.result()
+
+    def install(self, package_name: str):
+        """替换包内所有导入了 time、asyncio 模块的子模块"""
+        for name, module in list(sys.modules.items()):
+            if not name.startswith(package_name + "."):
+                continue
+            if getattr(module, "time", None) is time:
+                module.time = self
+            if getattr(module, "asyncio", None) is asyncio:
+                module.asyncio = self.asyncio
+
+    def __getattr__(self, name: str):
+        return getattr(time, name)
+
+
+class _VirtualAsyncio:
+    """asyncio 的替代品，sleep 和 wait_for 使用虚拟时间，其余属性转发给 asyncio"""
+
+    def __init__(self, clock: VirtualClock):
+        self.sleep = clock.sleep
+        self.wait_for = clock.wait_for
+
+    def __getattr__(self, name: str):
+        return getattr(asyncio, name)
+
+
+class BenchConfig(dict):
+    """AstrBotConfig 的替代品，save_config 不写磁盘"""
+
+    def save_config(self):
+        pass
+
+
+def load_plugin_class():
+    """把插件目录作为包导入，返回插件类及其 main 模块"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    plugin_main = importlib.import_module(f"{PACKAGE_NAME}.main")
+
+    class BenchPlugin(plugin_main.BanFloodingTheScreenPlugin):
+        """使用内存 KV 存储的插件"""
+
+        def __init__(self, config: Dict[str, Any]):
+            self.kv: Dict[str, Any] = {}
+            super().__init__(None, BenchConfig(config))
+
+        async def get_kv_data(self, key, default):
+            return self.kv.get(key, default)
+
+        async def put_kv_data(self, key, value):
+            self.kv[key] = value
+
+        async def delete_kv_data(self, key):
+            self.kv.pop(key, None)
+
+    return BenchPlugin, plugin_main
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def enforcement_summary(api: FakeOneBotAPI, kv: Dict[str, Any]) -> Dict[str, int]:
+    """统计每个用户被禁言的次数和累计次数的增量，同一波刷屏应只禁言一次、累计一次"""
+    bans: Dict[Any, int] = {}
+    for action, params in api.log:
+        if action == "set_group_ban" and params.get("duration"):
+            target = (params.get("group_id"), params.get("user_id"))
+            bans[target] = bans.get(target, 0) + 1
+    offenses = [value["count"] for value in kv.values() if isinstance(value, dict) and "count" in value]
+    return {
+        "banned_users": len(bans),
+        "ban_calls": sum(bans.values()),
+        "max_bans_per_user": max(bans.values(), default=0),
+        "offense_increments": sum(offenses),
+        "max_offenses_per_user": max(offenses, default=0),
+    }
+
+
+def settled(plugin: Any) -> bool:
+    """插件的后台工作是否都已完成"""
+    scheduler = plugin.action_scheduler
+    if scheduler.pending or scheduler.inflight or plugin.kick_scheduler.pending or len(plugin.flood_states):
+        return False
+    if plugin._active_raids or plugin._enforcement_tasks:
+        return False
+    return all(
+        not monitor.pending and (monitor.flush_task is None or monitor.flush_task.done())
+        for monitor in plugin.raid_monitors.values()
+    )
+
+
+def parse_overrides(items: List[str]) -> Dict[str, Any]:
+    """解析 --set key=value，value 按 JSON 解析，失败时作为字符串"""
+    overrides = {}
+    for item in items or ():
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"无效的配置覆盖: {item}")
+        try:
+            overrides[key.strip()] = json.loads(value)
+        except ValueError:
+            overrides[key.strip()] = value
+    return overrides
+
+
+async def run(events: List[TimedEvent], api: FakeOneBotAPI, overrides: Dict[str, Any], drain_timeout: float) -> Dict[str, Any]:
+    plugin_class, _ = load_plugin_class()
+    clock = VirtualClock()
+    clock.install(PACKAGE_NAME)
+
+    groups = sorted({str(event.get("group_id")) for _, event in events if event.get("group_id") is not None})
+    config = {"enabled_groups": groups}
+    config.update(overrides)
+
+    tracemalloc.start()
+    plugin = plugin_class(config)
+    await plugin.initialize()
+    bot = FakeBot(api)
+
+    latencies: List[float] = []
+    max_tasks = 0
+    last_t = 0.0
+    start = time.perf_counter()
+    for t, raw in events:
+        if t > last_t:
+            # 虚拟时间前进时让出事件循环，后台任务有机会运行
+            clock.advance_to(t)
+            last_t = t
+            await asyncio.sleep(0)
+        event = FakeEvent(bot, raw, message_text(raw))
+        began = time.perf_counter()
+        await plugin.handle_group_message(event)
+        latencies.append(time.perf_counter() - began)
+        tasks = len(asyncio.all_tasks())
+        if tasks > max_tasks:
+            max_tasks = tasks
+    elapsed = time.perf_counter() - start
+    events_t = last_t
+
+    # 事件结束后继续推进虚拟时间，直到处罚任务、发送队列、攻击模式批量禁言、延迟踢人都执行完，
+    # 刷屏状态全部过期
+    deadline = time.perf_counter() + drain_timeout
+    while not settled(plugin) and time.perf_counter() < deadline:
+        last_t += plugin.expiry_wheel.tick
+        clock.advance_to(last_t)
+        await asyncio.sleep(0.01)
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 写回累计次数，用于统计每个用户的累计增量
+    await plugin.offense_store.flush()
+    latencies.sort()
+    report = {
+        "events": len(events),
+        "virtual_seconds": round(events_t, 3),
+        "settle_seconds": round(last_t - events_t, 3),
+        "settled": settled(plugin),
+        "elapsed_seconds": round(elapsed, 3),
+        "events_per_second": round(len(events) / elapsed, 1) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round((latencies[-1] if latencies else 0.0) * 1000, 3),
+        },
+        "tasks": {"max": max_tasks, "final": len(asyncio.all_tasks())},
+        "memory_kb": {"current": current // 1024, "peak": peak // 1024},
+        "flood_states": plugin.flood_states.stats(),
+        "actions": dict(api.calls),
+        "action_failures": dict(api.failures),
+        "scheduler": plugin.action_scheduler.stats(),
+        "offense_store": {"cached": len(plugin.offense_store), "dirty": plugin.offense_store.dirty},
+        "enforcement": enforcement_summary(api, plugin.kv),
+    }
+    await plugin.terminate()
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    latency = report["latency_ms"]
+    print(f"事件数: {report['events']}（虚拟时长 {report['virtual_seconds']} 秒，实际耗时 {report['elapsed_seconds']} 秒）")
+    settle = "" if report["settled"] else "，超时未完成"
+    print(f"收尾: 继续推进虚拟时间 {report['settle_seconds']} 秒{settle}")
+    print(f"吞吐量: {report['events_per_second']} 条/秒")
+    print(f"处理延迟: p50 {latency['p50']} ms, p99 {latency['p99']} ms, 最大 {latency['max']} ms")
+    print(f"协程数: 最多 {report['tasks']['max']}，结束时 {report['tasks']['final']}")
+    print(f"内存: 当前 {report['memory_kb']['current']} KB，峰值 {report['memory_kb']['peak']} KB")
+    print(f"刷屏状态: {report['flood_states']}")
+    print(f"接口调用: {report['actions']}")
+    if report["action_failures"]:
+        print(f"调用失败: {report['action_failures']}")
+    print(f"发送队列: {report['scheduler']}")
+    print(f"累计次数: {report['offense_store']}")
+    enforcement = report["enforcement"]
+    print(
+        f"处罚: 禁言 {enforcement['banned_users']} 人 {enforcement['ban_calls']} 次（单人最多 {enforcement['max_bans_per_user']} 次），"
+        f"累计次数增加 {enforcement['offense_increments']} 次（单人最多 {enforcement['max_offenses_per_user']} 次）"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷屏禁言插件离线压测")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--scenario", choices=SCENARIOS, default="mixed", help="合成事件场景")
+    source.add_argument("--replay", metavar="PATH", help="重放 JSONL 格式的原始 OneBot 事件日志")
+    parser.add_argument("--groups", type=int, default=10, help="合成场景的群数量")
+    parser.add_argument("--users", type=int, default=500, help="合成场景的普通用户数量")
+    parser.add_argument("--duration", type=float, default=300.0, help="合成场景的虚拟时长（秒）")
+    parser.add_argument("--interval", type=float, default=20.0, help="普通用户的平均发言间隔（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--record", metavar="PATH", help="把合成的事件流保存为 JSONL")
+    parser.add_argument("--latency", type=float, default=0.01, help="模拟接口的平均延迟（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟网络错误的概率")
+    parser.add_argument("--permanent-failure-rate", type=float, default=0.0, help="模拟业务错误的概率")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="覆盖插件配置，可重复")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="结束后等待发送队列清空的最长时间（秒）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出结果")
+    args = parser.parse_args()
+
+    if args.replay:
+        events = load_jsonl(args.replay)
+    else:
+        events = generate(args.scenario, args.groups, args.users, args.duration, args.interval, args.seed)
+        if args.record:
+            dump_jsonl(events, args.record)
+
+    api = FakeOneBotAPI(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        permanent_failure_rate=args.permanent_failure_rate,
+        seed=args.seed
+    )
+    report = asyncio.run(run(events, api, parse_overrides(args.set), args.drain_timeout))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
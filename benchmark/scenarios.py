@@ -0,0 +1,156 @@
+import heapq
+import json
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# (相对时间戳, 原始 OneBot 事件)
+TimedEvent = Tuple[float, Dict[str, Any]]
+
+_WORDS = ["今天", "吃什么", "哈哈", "好的", "收到", "这个", "怎么", "为什么", "晚上", "开黑",
+          "有人吗", "睡了", "明天", "上班", "图片", "可以", "不行", "谢谢", "大佬", "带带我"]
+_AD_TEXT = "加群免费领取福利，私聊发链接，名额有限先到先得"
+
+
+def _group_event(gid: int, uid: int, segments: List[Dict[str, Any]], message_id: int, t: float) -> Dict[str, Any]:
+    return {
+        "post_type": "message",
+        "message_type": "group",
+        "group_id": gid,
+        "user_id": uid,
+        "message_id": message_id,
+        "message": segments,
+        "sender": {"user_id": uid, "role": "member"},
+        "time": int(t),
+    }
+
+
+def _text(text: str) -> List[Dict[str, Any]]:
+    return [{"type": "text", "data": {"text": text}}]
+
+
+def _chat_text(rng: random.Random) -> str:
+    return "".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 6)))
+
+
+def normal_chat(rng: random.Random, groups: List[int], users: int, duration: float, interval: float) -> Iterator[Tuple[float, int, int, List[Dict[str, Any]]]]:
+    """普通聊天：每个用户按指数分布的间隔发言，平均 interval 秒一条"""
+    heap = []
+    for index in range(users):
+        uid = 100000 + index
+        gid = groups[index % len(groups)]
+        heapq.heappush(heap, (rng.expovariate(1 / interval), uid, gid))
+    while heap:
+        t, uid, gid = heapq.heappop(heap)
+        if t > duration:
+            continue
+        roll = rng.random()
+        if roll < 0.1:
+            segments = [{"type": "image", "data": {"file": f"{uid}.jpg"}}]
+        elif roll < 0.15:
+            segments = [{"type": "at", "data": {"qq": str(100000 + rng.randrange(users))}}] + _text(_chat_text(rng))
+        else:
+            segments = _text(_chat_text(rng))
+        yield t, gid, uid, segments
+        heapq.heappush(heap, (t + rng.expovariate(1 / interval), uid, gid))
+
+
+def flooders(rng: random.Random, groups: List[int], count: int, duration: float) -> Iterator[Tuple[float, int, int, List[Dict[str, Any]]]]:
+    """单人刷屏：每个刷屏用户在随机时刻连续发送 20 条消息，间隔约 0.3 秒"""
+    for index in range(count):
+        uid = 200000 + index
+        gid = groups[index % len(groups)]
+        t = rng.uniform(0, max(duration - 10, 0))
+        for _ in range(20):
+            yield t, gid, uid, _text(_chat_text(rng))
+            t += rng.uniform(0.1, 0.5)
+
+
+def raids(rng: random.Random, groups: List[int], accounts: int, duration: float) -> Iterator[Tuple[float, int, int, List[Dict[str, Any]]]]:
+    """多账号攻击：每个群一次，accounts 个账号在 5 秒内各发送 5 条相同广告"""
+    for gid in groups:
+        start = rng.uniform(0, max(duration - 10, 0))
+        for index in range(accounts):
+            uid = 300000 + index
+            for _ in range(5):
+                yield start + rng.uniform(0, 5), gid, uid, _text(_AD_TEXT)
+
+
+def long_messages(rng: random.Random, groups: List[int], count: int, duration: float) -> Iterator[Tuple[float, int, int, List[Dict[str, Any]]]]:
+    """超长消息：随机用户发送 600 字左右的长文本"""
+    for index in range(count):
+        uid = 400000 + index
+        text = "".join(rng.choice(_WORDS) for _ in range(300))
+        yield rng.uniform(0, duration), groups[index % len(groups)], uid, _text(text)
+
+
+SCENARIOS = ("normal", "flood", "raid", "long", "mixed")
+
+
+def generate(scenario: str,
+             groups: int = 10,
+             users: int = 500,
+             duration: float = 300.0,
+             interval: float = 20.0,
+             seed: int = 0) -> List[TimedEvent]:
+    """生成合成事件流，按时间排序
+
+    所有场景都包含普通聊天作为背景流量，再叠加对应的异常流量。
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"未知场景: {scenario}")
+    rng = random.Random(seed)
+    group_ids = [900000 + index for index in range(max(1, groups))]
+
+    sources: List[Iterable] = [normal_chat(rng, group_ids, users, duration, interval)]
+    if scenario in ("flood", "mixed"):
+        sources.append(flooders(rng, group_ids, max(1, users // 50), duration))
+    if scenario in ("raid", "mixed"):
+        sources.append(raids(rng, group_ids, 20, duration))
+    if scenario in ("long", "mixed"):
+        sources.append(long_messages(rng, group_ids, max(1, users // 20), duration))
+
+    items = sorted((item for source in sources for item in source), key=lambda item: item[0])
+    return [(t, _group_event(gid, uid, segments, message_id, t))
+            for message_id, (t, gid, uid, segments) in enumerate(items, 1)]
+
+
+def load_jsonl(path: str) -> List[TimedEvent]:
+    """读取每行一个原始 OneBot 事件的日志，时间戳取自 time 字段（秒），相对第一条事件计算
+
+    同一秒内的多条事件按出现顺序均匀分布在该秒内。
+    """
+    raw_events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            event = json.loads(line)
+            if isinstance(event, dict):
+                raw_events.append(event)
+    if not raw_events:
+        return []
+
+    # 统计每一秒内的事件数，用于把同一秒内的事件拉开
+    per_second: Dict[int, int] = {}
+    for event in raw_events:
+        second = int(event.get("time", 0))
+        per_second[second] = per_second.get(second, 0) + 1
+
+    base = int(raw_events[0].get("time", 0))
+    seen: Dict[int, int] = {}
+    timed = []
+    for event in raw_events:
+        second = int(event.get("time", 0))
+        index = seen.get(second, 0)
+        seen[second] = index + 1
+        timed.append((second - base + index / per_second[second], event))
+    timed.sort(key=lambda item: item[0])
+    return timed
+
+
+def dump_jsonl(events: List[TimedEvent], path: str):
+    """把事件流写成 JSONL，可用 --replay 重放"""
+    with open(path, "w", encoding="utf-8") as f:
+        for _, event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
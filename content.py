@@ -0,0 +1,146 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .detectors import SlidingWindowLog
+
+_MASK64 = (1 << 64) - 1
+# 去掉空白、标点和符号，只保留文字和数字
+_STRIP_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+# 连续重复的字符压缩为一个，"好好好好" 与 "好好" 视为相同
+_REPEAT_PATTERN = re.compile(r"(.)\1+")
+
+# 参与指纹计算的最大字符数和最大分片数，保证单条消息的计算量有上限
+MAX_TEXT_LENGTH = 512
+MAX_SHINGLES = 32
+SHINGLE_SIZE = 3
+
+# 64 位指纹拆成 4 段，每段 16 位；海明距离不超过 3 的两个指纹至少有一段完全相同
+BAND_COUNT = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_DISTANCE = 3
+
+# 按位投票时计数器的位数，参与计算的分片不超过 2 ** 7 - 1 个
+_COUNTER_BITS = 7
+
+
+def normalize(text: str) -> str:
+    """归一化消息文本：小写、去标点空白、压缩重复字符"""
+    text = _STRIP_PATTERN.sub("", text[:MAX_TEXT_LENGTH].lower())
+    return _REPEAT_PATTERN.sub(r"\1", text)
+
+
+def simhash(text: str) -> int:
+    """计算归一化文本的 64 位 SimHash 指纹
+
+    文本按 3 字符分片，最多均匀抽取 MAX_SHINGLES 个分片参与计算，多数分片为 1 的位在指纹中为 1。
+    64 位的票数用按位切片的计数器统计：counters[i] 保存各位计数的第 i 位，
+    每个分片的哈希作为一次 64 路并行的加一，用整数的位运算完成，不逐位循环。
+    """
+    if len(text) <= SHINGLE_SIZE:
+        return hash(text) & _MASK64
+    count = len(text) - SHINGLE_SIZE + 1
+    step = max(1, count // MAX_SHINGLES)
+    counters = [0] * _COUNTER_BITS
+    shingles = 0
+    for start in range(0, count, step):
+        carry = hash(text[start:start + SHINGLE_SIZE]) & _MASK64
+        i = 0
+        while carry:
+            counter = counters[i]
+            counters[i] = counter ^ carry
+            carry &= counter
+            i += 1
+        shingles += 1
+
+    # 从高位到低位逐位比较，找出计数不小于 shingles // 2 + 1 的位
+    target = shingles // 2 + 1
+    greater = 0
+    equal = _MASK64
+    for i in range(_COUNTER_BITS - 1, -1, -1):
+        counter = counters[i]
+        if target >> i & 1:
+            equal &= counter
+        else:
+            greater |= equal & counter
+            equal &= ~counter
+    return greater | equal
+
+
+class _ContentEntry:
+    __slots__ = ("fingerprint", "window")
+
+    def __init__(self, fingerprint: int, threshold: int, period: float):
+        self.fingerprint = fingerprint
+        self.window = SlidingWindowLog(threshold, period)
+
+
+class ContentTable:
+    """单个群的重复内容检测表
+
+    保存最近出现过的消息指纹，同一指纹（或海明距离不超过 3 的近似指纹）
+    在 period 秒内被任意成员发送 threshold 次即判定为刷屏。
+    指纹数量超过 max_fingerprints 时淘汰最久未出现的指纹，每个群占用的内存固定。
+    刷屏多为原样重复，最近出现过的文本按哈希直接取出指纹，只有新文本才计算 SimHash。
+    """
+
+    def __init__(self, threshold: int, period: float, min_length: int = 6, max_fingerprints: int = 256):
+        self.threshold = threshold
+        self.period = period
+        self.min_length = min_length
+        self.max_fingerprints = max_fingerprints
+        self._entries: "OrderedDict[int, _ContentEntry]" = OrderedDict()
+        # 分段索引: { (段序号, 段值): 指纹 }
+        self._bands: Dict[Tuple[int, int], int] = {}
+        # 最近出现过的文本: { 归一化文本的哈希: 指纹 }，按插入顺序淘汰
+        self._texts: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _find(self, fingerprint: int) -> Optional[_ContentEntry]:
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            return entry
+        for band in range(BAND_COUNT):
+            candidate = self._bands.get((band, fingerprint >> (band * BAND_BITS) & BAND_MASK))
+            if candidate is not None and bin(candidate ^ fingerprint).count("1") <= MAX_DISTANCE:
+                return self._entries.get(candidate)
+        return None
+
+    def _add(self, fingerprint: int) -> _ContentEntry:
+        entry = _ContentEntry(fingerprint, self.threshold, self.period)
+        self._entries[fingerprint] = entry
+        for band in range(BAND_COUNT):
+            self._bands[(band, fingerprint >> (band * BAND_BITS) & BAND_MASK)] = fingerprint
+        while len(self._entries) > self.max_fingerprints:
+            old_fingerprint, _ = self._entries.popitem(last=False)
+            for band in range(BAND_COUNT):
+                band_key = (band, old_fingerprint >> (band * BAND_BITS) & BAND_MASK)
+                if self._bands.get(band_key) == old_fingerprint:
+                    del self._bands[band_key]
+        return entry
+
+    def _fingerprint(self, normalized: str) -> int:
+        key = hash(normalized)
+        fingerprint = self._texts.get(key)
+        if fingerprint is None:
+            fingerprint = simhash(normalized)
+            if len(self._texts) >= self.max_fingerprints:
+                del self._texts[next(iter(self._texts))]
+            self._texts[key] = fingerprint
+        return fingerprint
+
+    def hit(self, text: str, now: float) -> bool:
+        """记录一条消息，返回该内容是否已达到重复刷屏阈值"""
+        normalized = normalize(text)
+        if len(normalized) < self.min_length:
+            return False
+        fingerprint = self._fingerprint(normalized)
+        entry = self._find(fingerprint)
+        if entry is None:
+            entry = self._add(fingerprint)
+        else:
+            self._entries.move_to_end(entry.fingerprint)
+        return entry.window.hit(now)
@@ -0,0 +1,125 @@
+from array import array
+from typing import Dict, Type
+
+
+class FloodDetector:
+    """刷屏检测器基类
+
+    每个被跟踪的用户持有一个检测器实例，只记录时间戳等定长数据，
+    hit 每条消息调用一次，返回是否达到刷屏阈值。
+    """
+
+    __slots__ = ("threshold", "period", "max_cost")
+
+    def __init__(self, threshold: int, period: float):
+        self.threshold = max(1, int(threshold))
+        self.period = max(float(period), 0.001)
+        # 单条消息的开销上限，保证单独一条消息不会直接触发刷屏
+        self.max_cost = max(1.0, self.threshold - 1.0)
+
+    def hit(self, now: float, cost: float = 1.0) -> bool:
+        """记录一条开销为 cost 的消息，返回是否判定为刷屏"""
+        raise NotImplementedError
+
+    def reset(self):
+        """清空检测状态（禁言处理完成后调用）"""
+        raise NotImplementedError
+
+
+class SlidingWindowLog(FloodDetector):
+    """滑动窗口日志：任意连续 period 秒内的消息开销之和达到 threshold 即判定为刷屏
+
+    时间戳和开销存放在长度为 threshold 的 array('d') 环形缓冲区中，并维护窗口内开销之和。
+    每条消息的开销不小于 1，因此窗口内最多只需保留最近 threshold 条记录，
+    每次 hit 只需把过期的记录从队头移出，均摊 O(1)。
+    """
+
+    __slots__ = ("_stamps", "_costs", "_head", "_count", "_total")
+
+    def __init__(self, threshold: int, period: float):
+        super().__init__(threshold, period)
+        self._stamps = array("d", bytes(8 * self.threshold))
+        self._costs = array("d", bytes(8 * self.threshold))
+        self._head = 0
+        self._count = 0
+        self._total = 0.0
+
+    def hit(self, now: float, cost: float = 1.0) -> bool:
+        if cost > self.max_cost:
+            cost = self.max_cost
+        stamps = self._stamps
+        costs = self._costs
+        capacity = self.threshold
+        head = self._head
+        count = self._count
+        total = self._total
+
+        # 移出窗口外的记录；缓冲区已满时移出最早的一条
+        oldest = now - self.period
+        while count and (count == capacity or stamps[head] < oldest):
+            total -= costs[head]
+            head += 1
+            if head == capacity:
+                head = 0
+            count -= 1
+        if not count:
+            # 窗口清空时归零，避免浮点累计误差
+            total = 0.0
+
+        tail = head + count
+        if tail >= capacity:
+            tail -= capacity
+        stamps[tail] = now
+        costs[tail] = cost
+        self._head = head
+        self._count = count + 1
+        self._total = total + cost
+        # 留出浮点误差余量，开销之和恰好等于阈值时也判定为刷屏
+        return self._total >= capacity - 1e-9
+
+    def reset(self):
+        self._head = 0
+        self._count = 0
+        self._total = 0.0
+
+
+class TokenBucket(FloodDetector):
+    """令牌桶：容量为 threshold，每 period 秒补满一次，令牌不足一条时判定为刷屏
+
+    允许短时突发，对匀速发送更宽容，只保存令牌数和上次更新时间。
+    """
+
+    __slots__ = ("_tokens", "_last")
+
+    def __init__(self, threshold: int, period: float):
+        super().__init__(threshold, period)
+        self._tokens = float(self.threshold)
+        self._last = 0.0
+
+    def hit(self, now: float, cost: float = 1.0) -> bool:
+        if self._last:
+            elapsed = now - self._last
+            if elapsed > 0:
+                self._tokens = min(
+                    float(self.threshold),
+                    self._tokens + elapsed * self.threshold / self.period
+                )
+        self._last = now
+        self._tokens -= min(cost, self.max_cost)
+        # 桶内剩余不足一条消息的令牌，说明突发已达到 threshold 条
+        return self._tokens < 1.0
+
+    def reset(self):
+        self._tokens = float(self.threshold)
+        self._last = 0.0
+
+
+DETECTORS: Dict[str, Type[FloodDetector]] = {
+    "sliding_window": SlidingWindowLog,
+    "token_bucket": TokenBucket,
+}
+
+
+def create_detector(kind: str, threshold: int, period: float) -> FloodDetector:
+    """按名称创建检测器，未知名称回退到滑动窗口"""
+    return DETECTORS.get(kind, SlidingWindowLog)(threshold, period)
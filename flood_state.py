@@ -0,0 +1,205 @@
+import itertools
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from .detectors import FloodDetector, SlidingWindowLog
+
+
+class MessageIdRing:
+    """定长环形缓冲区，保存用户最近 capacity 条消息的 message_id
+
+    缓冲区在创建时一次性分配，写满后覆盖最旧的记录。
+    """
+
+    __slots__ = ("_ids", "_next", "_size")
+
+    def __init__(self, capacity: int):
+        self._ids = array("q", bytes(8 * max(1, int(capacity))))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, message_id: Any):
+        """记录一条消息，message_id 不是整数时忽略"""
+        try:
+            self._ids[self._next] = int(message_id)
+        except (TypeError, ValueError, OverflowError):
+            return
+        capacity = len(self._ids)
+        self._next = (self._next + 1) % capacity
+        if self._size < capacity:
+            self._size += 1
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def drain(self) -> List[int]:
+        """按发送顺序取出全部记录并清空"""
+        capacity = len(self._ids)
+        start = (self._next - self._size) % capacity
+        ids = [self._ids[(start + i) % capacity] for i in range(self._size)]
+        self.clear()
+        return ids
+
+
+# 刷屏状态的阶段；没有状态的用户视为空闲
+COUNTING = 0     # 统计消息
+ENFORCING = 1    # 正在处罚，只有触发处罚的那条消息的处理流程拥有该状态
+COOLDOWN = 2     # 处罚后的冷却期，期间的消息直接丢弃
+
+
+class FloodState:
+    """单个用户的刷屏检测状态
+
+    阶段转换：空闲 → COUNTING（创建状态）→ ENFORCING（达到阈值）→ COOLDOWN（处罚完成）
+    → COUNTING（冷却结束后的下一条消息）；状态过期后回到空闲。
+    转换都在事件循环中同步完成，检查和修改之间没有 await，不需要加锁。
+    """
+
+    __slots__ = ("detector", "mentions", "message_ids", "phase", "cooldown_until", "burst", "burst_at")
+
+    def __init__(self, detector: FloodDetector):
+        self.detector = detector
+        # @ 次数滑动窗口，用户第一次发送带 @ 的消息时才创建
+        self.mentions: Optional[SlidingWindowLog] = None
+        # 最近消息的 message_id，只在开启禁言后撤回的群中创建
+        self.message_ids: Optional[MessageIdRing] = None
+        self.phase = COUNTING
+        self.cooldown_until = 0.0
+        # 按时间衰减的消息计数及其更新时间，只在开启自适应阈值的群中更新
+        self.burst = 0.0
+        self.burst_at = 0.0
+
+    @property
+    def is_handling_flood(self) -> bool:
+        return self.phase == ENFORCING
+
+    def begin_enforcement(self) -> bool:
+        """从 COUNTING 进入 ENFORCING，返回调用方是否成为处罚的唯一执行者"""
+        if self.phase != COUNTING:
+            return False
+        self.phase = ENFORCING
+        return True
+
+    def cancel_enforcement(self):
+        """未执行处罚（如对方是管理员），回到 COUNTING"""
+        self.phase = COUNTING
+
+    def enter_cooldown(self, until: float):
+        """处罚完成：清空检测记录，until 之前的消息直接丢弃"""
+        self.detector.reset()
+        self.mentions = None
+        self.burst = 0.0
+        if self.message_ids is not None:
+            self.message_ids.clear()
+        self.phase = COOLDOWN if until > 0 else COUNTING
+        self.cooldown_until = until
+
+    def dropping(self, now: float) -> bool:
+        """处罚中或冷却期内返回 True；冷却期已过时回到 COUNTING"""
+        if self.phase == COUNTING:
+            return False
+        if self.phase == COOLDOWN and now >= self.cooldown_until:
+            self.phase = COUNTING
+            return False
+        return True
+
+
+class FloodStateTable:
+    """有容量上限的刷屏状态表
+
+    按最近活跃顺序排列，超出 max_size 时淘汰最久未活跃且不在处理中的状态。
+    淘汰时跳过的处罚中、冷却期内的状态移到单独的表中，不再参与之后的淘汰扫描，
+    直到下一次被读取（touch）时移回；每个状态被跳过后都要经过一次读取才会再被扫描，
+    因此攻击模式下大部分状态都在处罚中时，淘汰的均摊开销仍为 O(1)。
+    """
+
+    def __init__(self, max_size: int = 50000):
+        self.max_size = max(1, int(max_size))
+        # 可以淘汰的状态，按最近活跃顺序排列
+        self._states: "OrderedDict[str, FloodState]" = OrderedDict()
+        # 淘汰时处于处罚中或冷却期而被跳过的状态
+        self._busy: Dict[str, FloodState] = {}
+
+        # 统计计数
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._states) + len(self._busy)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._states or key in self._busy
+
+    def __iter__(self) -> Iterator[str]:
+        return itertools.chain(self._states, self._busy)
+
+    def get(self, key: str) -> Optional[FloodState]:
+        state = self._states.get(key)
+        if state is None and self._busy:
+            state = self._busy.get(key)
+        return state
+
+    def touch(self, key: str) -> Optional[FloodState]:
+        """读取状态并标记为最近活跃"""
+        state = self._states.get(key)
+        if state is not None:
+            self._states.move_to_end(key)
+        elif self._busy:
+            state = self._busy.pop(key, None)
+            if state is not None:
+                self._states[key] = state
+        return state
+
+    def add(self, key: str, state: FloodState):
+        self._busy.pop(key, None)
+        self._states[key] = state
+
+    def pop(self, key: str) -> Optional[FloodState]:
+        state = self._states.pop(key, None)
+        if state is None:
+            state = self._busy.pop(key, None)
+        return state
+
+    def evict_idle(self) -> Optional[str]:
+        """淘汰一个最久未活跃且处于 COUNTING 阶段的状态，返回其键
+
+        处罚中和冷却期内的状态不淘汰，否则用户的下一条消息会创建新状态并再次触发处罚。
+        """
+        while self._states:
+            key, state = self._states.popitem(last=False)
+            if state.phase == COUNTING:
+                self.evictions += 1
+                return key
+            self._busy[key] = state
+        return None
+
+    def footprint(self) -> int:
+        """估算当前占用的内存（字节）"""
+        total = sys.getsizeof(self._states) + sys.getsizeof(self._busy)
+        for key, state in itertools.chain(self._states.items(), self._busy.items()):
+            total += sys.getsizeof(key) + sys.getsizeof(state)
+            for detector in (state.detector, state.mentions):
+                if detector is None:
+                    continue
+                total += sys.getsizeof(detector)
+                for buffer_name in ("_stamps", "_costs"):
+                    buffer = getattr(detector, buffer_name, None)
+                    if buffer is not None:
+                        total += sys.getsizeof(buffer)
+            if state.message_ids is not None:
+                total += sys.getsizeof(state.message_ids) + sys.getsizeof(state.message_ids._ids)
+        return total
+
+    def stats(self) -> Dict[str, int]:
+        """返回状态表统计信息"""
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "evictions": self.evictions,
+            "footprint": self.footprint(),
+        }
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from astrbot.api import logger
+
+from .keywords import parse_keywords
+from .message_cost import MessageCostModel
+from .penalty import PenaltyLadder
+from .trust import EMPTY_POLICY, TrustPolicy, parse_trust_map, parse_uid_set
+
+
+@dataclass(frozen=True, slots=True)
+class GroupConfig:
+    """编译后的群级别配置（只读）
+
+    由 group_configs 中的一条配置与全局默认值合并而成，
+    缺失或未设置（null、空字符串）的字段使用全局默认值。
+    """
+
+    group_id: str
+    mute_time: int
+    enable_kick: bool
+    kick_threshold: int
+    kick_delay: int
+    enable_long_message_ban: bool
+    long_message_threshold: int
+    cost_model: MessageCostModel
+    # 禁言后撤回用户最近的刷屏消息
+    recall_on_ban: bool = False
+    # 参考用户在其他群的处罚记录（跨群联防）
+    cross_group: bool = False
+    # 按群的发言速度自动计算消息条数阈值
+    adaptive_threshold: bool = False
+    # 违禁词和广告检测，keywords 为归一化后的关键词，已合并全局设置
+    keyword_filter: bool = False
+    keywords: frozenset = frozenset()
+    # 处罚阶梯，为 None 时使用固定的 mute_time 和 kick_threshold
+    penalty_ladder: Optional[PenaltyLadder] = None
+    # 白名单和信任档位，已合并全局设置
+    trust: TrustPolicy = EMPTY_POLICY
+
+
+def _inherit(raw: Dict[str, Any], key: str, default: Any) -> Any:
+    """读取群配置中的字段，缺失或未设置（null、空字符串）时继承全局默认值"""
+    value = raw.get(key)
+    if value is None or value == "":
+        return default
+    return value
+
+
+def _compile_cost_model(raw: Dict[str, Any], defaults: GroupConfig) -> MessageCostModel:
+    """解析群单独设置的消息开销权重，未设置或格式错误时使用默认权重"""
+    spec = str(raw.get("message_cost_weights") or "").strip()
+    if not spec:
+        return defaults.cost_model
+    try:
+        return MessageCostModel.parse(spec)
+    except ValueError as e:
+        logger.warning(f"[刷屏禁言] 群 {raw.get('group_id')} 的消息开销权重无效，使用默认权重: {e}")
+        return defaults.cost_model
+
+
+def _compile_penalty_ladder(raw: Dict[str, Any], defaults: GroupConfig) -> Optional[PenaltyLadder]:
+    """解析群单独设置的处罚阶梯，未设置或格式错误时使用默认阶梯"""
+    spec = str(raw.get("penalty_ladder") or "").strip()
+    if not spec:
+        return defaults.penalty_ladder
+    try:
+        return PenaltyLadder.parse(spec)
+    except ValueError as e:
+        logger.warning(f"[刷屏禁言] 群 {raw.get('group_id')} 的处罚阶梯无效，使用默认设置: {e}")
+        return defaults.penalty_ladder
+
+
+def _compile_trust(raw: Dict[str, Any], defaults: GroupConfig) -> TrustPolicy:
+    """合并群单独设置的白名单和信任用户，格式错误时只使用全局设置"""
+    try:
+        whitelist = parse_uid_set(raw.get("whitelist_users"))
+        trusted = parse_trust_map(raw.get("trusted_users"))
+    except ValueError as e:
+        logger.warning(f"[刷屏禁言] 群 {raw.get('group_id')} 的白名单或信任用户无效，使用全局设置: {e}")
+        return defaults.trust
+    return defaults.trust.merge(whitelist, trusted)
+
+
+def _compile_keywords(raw: Dict[str, Any], defaults: GroupConfig) -> frozenset:
+    """合并群单独设置的关键词，没有时沿用全局关键词集合（同一个对象）"""
+    keywords = parse_keywords(raw.get("blocked_keywords"))
+    if not keywords:
+        return defaults.keywords
+    return defaults.keywords | keywords
+
+
+def compile_group_config(raw: Dict[str, Any], defaults: GroupConfig) -> GroupConfig:
+    """将一条原始群配置与默认配置合并为 GroupConfig"""
+    return GroupConfig(
+        group_id=str(raw.get("group_id", defaults.group_id)),
+        mute_time=int(_inherit(raw, "mute_time", defaults.mute_time)),
+        enable_kick=bool(_inherit(raw, "enable_kick", defaults.enable_kick)),
+        kick_threshold=int(_inherit(raw, "kick_threshold", defaults.kick_threshold)),
+        kick_delay=int(_inherit(raw, "kick_delay", defaults.kick_delay)),
+        enable_long_message_ban=bool(_inherit(raw, "enable_long_message_ban", defaults.enable_long_message_ban)),
+        long_message_threshold=int(_inherit(raw, "long_message_threshold", defaults.long_message_threshold)),
+        cost_model=_compile_cost_model(raw, defaults),
+        recall_on_ban=bool(_inherit(raw, "recall_on_ban", defaults.recall_on_ban)),
+        cross_group=bool(_inherit(raw, "cross_group", defaults.cross_group)),
+        adaptive_threshold=bool(_inherit(raw, "adaptive_threshold", defaults.adaptive_threshold)),
+        keyword_filter=bool(_inherit(raw, "keyword_filter", defaults.keyword_filter)),
+        keywords=_compile_keywords(raw, defaults),
+        penalty_ladder=_compile_penalty_ladder(raw, defaults),
+        trust=_compile_trust(raw, defaults),
+    )
+
+
+def build_config_index(group_configs: Iterable[Dict[str, Any]], defaults: GroupConfig) -> Dict[int, GroupConfig]:
+    """构建 群号 -> GroupConfig 的索引，群号无效或字段类型错误的配置会被跳过"""
+    index: Dict[int, GroupConfig] = {}
+    for raw in group_configs:
+        if not isinstance(raw, dict):
+            continue
+        try:
+            gid = int(str(raw.get("group_id", "")).strip())
+            index[gid] = compile_group_config(raw, defaults)
+        except (TypeError, ValueError):
+            continue
+    return index
@@ -0,0 +1,120 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from .group_config import GroupConfig
+from .message_cost import MessageCostModel
+from .penalty import PenaltyLadder, format_minutes, parse_minutes
+
+# 表示恢复使用全局设置的取值
+_DEFAULT_WORDS = ("默认", "default", "-")
+
+_TRUE_WORDS = ("开", "开启", "是", "on", "true", "yes", "1")
+_FALSE_WORDS = ("关", "关闭", "否", "off", "false", "no", "0")
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in _TRUE_WORDS:
+        return True
+    if lowered in _FALSE_WORDS:
+        return False
+    raise ValueError("请填写 开 或 关")
+
+
+def _parse_optional_bool(value: str):
+    """开关类设置，填写"默认"时清空，恢复使用全局设置"""
+    if value.lower() in _DEFAULT_WORDS:
+        return None
+    return _parse_bool(value)
+
+
+def _parse_mute_time(value: str) -> int:
+    minutes = parse_minutes(value)
+    if minutes is None:
+        raise ValueError("时间格式错误，支持格式：1分、1分钟、1小时、1天、1h、1m、1d")
+    if minutes == 0:
+        raise ValueError("秒单位不支持，请使用分钟、小时或天")
+    return minutes
+
+
+def _int_parser(minimum: int) -> Callable[[str], int]:
+    def parse(value: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            raise ValueError("请输入数字")
+        if number < minimum:
+            raise ValueError(f"不能小于 {minimum}")
+        return number
+    return parse
+
+
+def _spec_parser(compile_spec: Callable[[str], Any]) -> Callable[[str], str]:
+    """校验字符串格式的设置，填写"默认"时清空，恢复使用全局设置"""
+    def parse(value: str) -> str:
+        if value.lower() in _DEFAULT_WORDS:
+            return ""
+        compile_spec(value)
+        return value
+    return parse
+
+
+# 可通过命令修改的群级别设置：名称 -> (group_configs 中的字段, 解析函数)
+GROUP_SETTINGS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "禁言时间": ("mute_time", _parse_mute_time),
+    "踢人": ("enable_kick", _parse_bool),
+    "踢人次数": ("kick_threshold", _int_parser(1)),
+    "踢人延迟": ("kick_delay", _int_parser(0)),
+    "超长消息": ("enable_long_message_ban", _parse_bool),
+    "超长消息阈值": ("long_message_threshold", _int_parser(1)),
+    "撤回": ("recall_on_ban", _parse_optional_bool),
+    "跨群联防": ("cross_group", _parse_optional_bool),
+    "自适应阈值": ("adaptive_threshold", _parse_optional_bool),
+    "关键词检测": ("keyword_filter", _parse_optional_bool),
+    "开销权重": ("message_cost_weights", _spec_parser(MessageCostModel.parse)),
+    "处罚阶梯": ("penalty_ladder", _spec_parser(PenaltyLadder.parse)),
+}
+
+
+def parse_group_settings(text: str) -> Dict[str, Any]:
+    """解析 "禁言时间=10分钟 踢人=开 踢人次数=5" 形式的批量设置
+
+    返回 group_configs 字段 -> 新值；任一项无效时抛出 ValueError，所有设置都不生效。
+    """
+    updates: Dict[str, Any] = {}
+    errors: List[str] = []
+    for item in text.replace("＝", "=").split():
+        name, sep, value = item.partition("=")
+        name, value = name.strip(), value.strip()
+        setting = GROUP_SETTINGS.get(name)
+        if not sep or setting is None:
+            errors.append(f"无法识别 {item}")
+            continue
+        field, parse = setting
+        try:
+            updates[field] = parse(value)
+        except ValueError as e:
+            errors.append(f"{name}：{e}")
+    if errors:
+        raise ValueError("\n".join(errors))
+    if not updates:
+        raise ValueError("没有要修改的设置")
+    return updates
+
+
+def describe_group_config(config: GroupConfig) -> List[str]:
+    """群的生效配置，每项一行"""
+    def on_off(value: bool) -> str:
+        return "开" if value else "关"
+
+    ladder = config.penalty_ladder
+    return [
+        f"禁言时间：{format_minutes(config.mute_time)}",
+        f"踢人：{on_off(config.enable_kick)}，踢人次数：{config.kick_threshold}，踢人延迟：{config.kick_delay} 秒",
+        f"超长消息：{on_off(config.enable_long_message_ban)}，超长消息阈值：{config.long_message_threshold} 字",
+        f"禁言后撤回：{on_off(config.recall_on_ban)}，跨群联防：{on_off(config.cross_group)}，自适应阈值：{on_off(config.adaptive_threshold)}",
+        f"关键词检测：{on_off(config.keyword_filter)}，关键词：{len(config.keywords)} 个",
+        "开销权重：" + ",".join(f"{key}={value:g}" for key, value in config.cost_model.weights.items()),
+        f"处罚阶梯：{ladder.describe() if ladder else '未开启'}",
+        f"白名单：{len(config.trust.whitelist)} 人，信任用户：{len(config.trust.trusted)} 人"
+        + (f"，群等级档位：{len(config.trust.levels)} 档" if config.trust.levels else ""),
+    ]
@@ -0,0 +1,169 @@
+import re
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern
+
+# 去掉空白、标点和符号后再匹配，"加 群"、"加-群" 与 "加群" 视为相同
+_STRIP_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+
+# 参与匹配的最大字符数，保证单条消息的扫描量有上限
+MAX_TEXT_LENGTH = 4096
+
+# 内置广告规则：名称 -> 正则，在原始文本（转小写）上匹配
+AD_PATTERNS: Dict[str, str] = {
+    # QQ 号、微信号
+    "qq": r"(?:qq|扣扣|企鹅|微信|vx|wx)[^\d\n]{0,4}\d{5,12}",
+    # 加群、进群邀请后跟群号
+    "group": r"(?:加|进|入)[^\d\n]{0,2}(?:群|裙|君羊)[^\d\n]{0,4}\d{5,12}",
+    # 网址
+    "link": r"(?:https?://|www\.)\S+|t\.me/\w+",
+}
+
+
+def normalize_keyword(text: str) -> str:
+    """归一化关键词或消息文本：小写、去标点空白"""
+    return _STRIP_PATTERN.sub("", text[:MAX_TEXT_LENGTH].lower())
+
+
+def parse_keywords(value: Any) -> FrozenSet[str]:
+    """解析关键词列表，既可以是列表也可以是逗号分隔的字符串；归一化后为空的词被忽略"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    else:
+        items = str(value or "").replace("，", ",").split(",")
+    keywords = set()
+    for item in items:
+        keyword = normalize_keyword(str(item))
+        if keyword:
+            keywords.add(keyword)
+    return frozenset(keywords)
+
+
+def compile_ad_patterns(value: Any) -> Optional[Pattern]:
+    """把启用的内置广告规则合并为一个正则，未知名称抛出 ValueError，都未启用时返回 None"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        names = [str(name).strip() for name in value]
+    else:
+        names = str(value or "").replace("，", ",").split(",")
+    parts = []
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        pattern = AD_PATTERNS.get(name)
+        if pattern is None:
+            raise ValueError(f"未知的广告规则 {name}，可选：" + "、".join(AD_PATTERNS))
+        parts.append(f"(?P<{name}>{pattern})")
+    if not parts:
+        return None
+    return re.compile("|".join(parts))
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 自动机，对归一化后的文本做一次线性扫描，找出任意一个关键词
+
+    节点以下标表示：_goto 为子节点表，_fail 为失配指针，_match 为到达该节点时命中的关键词
+    （自身是词尾，或失配链上有词尾）。添加、删除关键词时只修改字典树上对应的路径，
+    失配指针在下一次匹配前统一重新计算；删除的节点积累较多时整体重建一次。
+    """
+
+    __slots__ = ("source", "_terms", "_goto", "_fail", "_match", "_ends", "_dirty", "_removed")
+
+    def __init__(self, keywords: Iterable[str] = ()):
+        # 构建时使用的关键词集合，调用方据此判断是否需要同步
+        self.source: FrozenSet[str] = frozenset()
+        self._terms = set()
+        self._reset()
+        self.sync(frozenset(keywords))
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __bool__(self) -> bool:
+        return bool(self._terms)
+
+    def _reset(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._match: List[Optional[str]] = [None]
+        # 以该节点结尾的关键词
+        self._ends: List[Optional[str]] = [None]
+        self._dirty = False
+        self._removed = 0
+
+    def add(self, keyword: str):
+        if not keyword or keyword in self._terms:
+            return
+        self._terms.add(keyword)
+        node = 0
+        for ch in keyword:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][ch] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._match.append(None)
+                self._ends.append(None)
+            node = child
+        self._ends[node] = keyword
+        self._dirty = True
+
+    def remove(self, keyword: str):
+        if keyword not in self._terms:
+            return
+        self._terms.discard(keyword)
+        node = 0
+        for ch in keyword:
+            node = self._goto[node][ch]
+        self._ends[node] = None
+        self._removed += 1
+        self._dirty = True
+
+    def sync(self, keywords: FrozenSet[str]):
+        """按新的关键词集合增删差异部分"""
+        if self._removed + len(self._terms - keywords) > len(keywords):
+            # 删除的词多于保留的词时整体重建，回收不再使用的节点
+            self._terms = set()
+            self._reset()
+        for keyword in self._terms - keywords:
+            self.remove(keyword)
+        for keyword in keywords - self._terms:
+            self.add(keyword)
+        self.source = keywords
+
+    def _link(self):
+        """按广度优先顺序重新计算失配指针和命中关键词"""
+        goto, fail, match, ends = self._goto, self._fail, self._match, self._ends
+        match[0] = None
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            match[child] = ends[child]
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                match[child] = ends[child] or match[fail[child]]
+                queue.append(child)
+        self._dirty = False
+
+    def search(self, text: str) -> Optional[str]:
+        """返回文本中出现的第一个关键词，文本需已归一化"""
+        if not self._terms:
+            return None
+        if self._dirty:
+            self._link()
+        goto, fail, match = self._goto, self._fail, self._match
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if match[node] is not None:
+                return match[node]
+        return None
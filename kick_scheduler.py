@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from astrbot.api import logger
+
+
+class KickScheduler:
+    """持久化的延迟踢人队列
+
+    待执行的踢人记录（含截止时间）保存在插件 KV 存储中，由一个后台循环统一执行，
+    消息处理协程不再为踢人延迟而挂起。插件重启后会恢复未执行的踢人，已过期的立即执行。
+    """
+
+    KV_KEY = "pending_kicks"
+
+    def __init__(self,
+                 load: Callable[[str, Any], Awaitable[Any]],
+                 save: Callable[[str, Any], Awaitable[None]],
+                 execute: Callable[[int, str, int], Awaitable[bool]],
+                 retry_interval: float = 5.0):
+        """
+        Args:
+            load: 读取 KV 的协程函数 (key, default) -> value
+            save: 写入 KV 的协程函数 (key, value)
+            execute: 执行踢人的协程函数 (gid, uid, count) -> 是否已处理完毕；
+                返回 False 表示暂时无法执行（如机器人未连接），稍后重试
+            retry_interval: 暂时无法执行时的重试间隔（秒）
+        """
+        self._load = load
+        self._save = save
+        self._execute = execute
+        self.retry_interval = retry_interval
+
+        # 待执行的踢人: { "gid:uid": {"gid": int, "uid": str, "count": int, "due": 时间戳} }
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loaded = False
+
+    async def start(self):
+        """从 KV 恢复待执行的踢人并启动后台循环"""
+        if self._task is not None and not self._task.done():
+            return
+        if not self._loaded:
+            self._loaded = True
+            try:
+                stored = await self._load(self.KV_KEY, {})
+                if isinstance(stored, dict):
+                    # 内存中已有的记录比持久化的更新
+                    stored.update(self.pending)
+                    self.pending = stored
+                if self.pending:
+                    logger.info(f"[刷屏禁言] 恢复 {len(self.pending)} 个待执行的踢人")
+            except Exception as e:
+                logger.error(f"[刷屏禁言] 读取待执行踢人失败: {e}")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台循环，待执行的踢人保留在 KV 中"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def schedule(self, gid: int, uid: str, count: int, delay: float):
+        """登记一个 delay 秒后执行的踢人"""
+        key = f"{gid}:{uid}"
+        self.pending[key] = {"gid": gid, "uid": uid, "count": count, "due": time.time() + delay}
+        await self._persist()
+        await self.start()
+        self._wakeup.set()
+
+    async def cancel(self, gid: int, uid: str) -> bool:
+        """取消待执行的踢人，返回是否存在该踢人"""
+        if self.pending.pop(f"{gid}:{uid}", None) is None:
+            return False
+        await self._persist()
+        return True
+
+    async def _persist(self):
+        try:
+            await self._save(self.KV_KEY, self.pending)
+        except Exception as e:
+            logger.error(f"[刷屏禁言] 保存待执行踢人失败: {e}")
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            changed = False
+            deferred = False
+            for key in [key for key, entry in self.pending.items() if entry["due"] <= now]:
+                entry = self.pending[key]
+                try:
+                    done = await self._execute(entry["gid"], entry["uid"], entry["count"])
+                except Exception as e:
+                    logger.error(f"[刷屏禁言] 踢人失败: {e}")
+                    done = True
+                if not done:
+                    deferred = True
+                    continue
+                # 执行期间可能被取消或重新登记
+                if self.pending.get(key) is entry:
+                    del self.pending[key]
+                    changed = True
+            if changed:
+                await self._persist()
+
+            timeout = None
+            if self.pending:
+                timeout = max(0.0, min(entry["due"] for entry in self.pending.values()) - time.time())
+                if deferred:
+                    timeout = max(timeout, self.retry_interval)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
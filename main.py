@@ -2,12 +2,73 @@ import asyncio
 import json
 import os
 import re
-from typing import Dict, Any, Optional
+import time
+import zlib
+from typing import Dict, Any, Optional, Tuple
 
 from astrbot.api import logger
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 
+from .action_queue import ActionScheduler, PRIORITY_BAN, PRIORITY_KICK, PRIORITY_MESSAGE, PRIORITY_RECALL
+from .adaptive import TrafficBaseline, decayed_burst
+from .content import ContentTable
+from .detectors import SlidingWindowLog, create_detector
+from .flood_state import COOLDOWN, COUNTING, ENFORCING, FloodState, FloodStateTable, MessageIdRing
+from .group_config import GroupConfig, build_config_index
+from .group_settings import GROUP_SETTINGS, describe_group_config, parse_group_settings
+from .keywords import MAX_TEXT_LENGTH, KeywordAutomaton, compile_ad_patterns, normalize_keyword, parse_keywords
+from .kick_scheduler import KickScheduler
+from .message_cost import DEFAULT_COST_MODEL, MessageCostModel
+from .metrics import PluginMetrics, write_metrics_file
+from .offense_store import OffenseStore
+from .penalty import PenaltyLadder, parse_minutes
+from .raid import RaidMonitor
+from .reputation import ReputationIndex
+from .role_cache import RoleCache
+from .state_backend import MemoryBackend, create_state_backend
+from .templates import TEMPLATE_FIELDS, MessageTemplate
+from .timing_wheel import TimingWheel
+from .trust import EMPTY_POLICY, TrustPolicy, format_trust_map, parse_level_tiers, parse_multiplier, parse_trust_map, parse_uid_set
+
+
+class CommandContext:
+    """管理员群命令的上下文：群号、发送者和去掉命令名后的参数"""
+
+    __slots__ = ("raw", "gid", "uid", "args")
+
+    def __init__(self, raw: Dict[str, Any], gid: int, uid: str, args: str):
+        self.raw = raw
+        self.gid = gid
+        self.uid = uid
+        self.args = args
+
+
+def group_admin_command(name: str):
+    """注册仅限群主和管理员在 QQ 群中使用的命令
+
+    统一完成平台和消息类型判断、权限检查（机器人自身的成员信息走缓存）和参数提取，
+    被装饰的处理函数接收 (event, ctx)，只需处理命令本身。
+    """
+    def decorator(handler):
+        async def wrapper(self, event: AstrMessageEvent):
+            ctx = await self._resolve_command_context(event, name)
+            if ctx is None:
+                return
+            if isinstance(ctx, str):
+                yield event.plain_result(ctx)
+                return
+            async for result in handler(self, event, ctx):
+                yield result
+
+        # 不使用 functools.wraps：AstrBot 按处理函数的签名解析命令参数，wrapper 只接收 event
+        wrapper.__name__ = handler.__name__
+        wrapper.__qualname__ = handler.__qualname__
+        wrapper.__doc__ = handler.__doc__
+        wrapper.__module__ = handler.__module__
+        return filter.command(name)(wrapper)
+    return decorator
+
 
 @register(
     "ban_flooding_the_screen",
@@ -21,11 +82,31 @@ class BanFloodingTheScreenPlugin(Star):
         self.context = context
         self.config = config or {}
         
-        # 刷屏状态管理: { "gid:uid": {"timer": asyncio.Task, "messages": [], "delete": callable} }
-        self.flood_states: Dict[str, Dict[str, Any]] = {}
+        # 刷屏状态管理: { "gid:uid": FloodState }，容量上限在读取配置后设置
+        self.flood_states = FloodStateTable()
+        
+        # 检测窗口过期管理：由单个后台任务驱动时间轮批量清理 flood_states
+        self.expiry_wheel = TimingWheel(tick=0.5, slots=64, max_expire_per_tick=2000)
+        self._sweeper_task: Optional[asyncio.Task] = None
+        
+        # 持久化的延迟踢人队列，由后台循环统一执行
+        self.kick_scheduler = KickScheduler(self.get_kv_data, self.put_kv_data, self._execute_kick)
+        # 最近一次消息事件中的机器人实例，供后台任务调用接口
+        self._bot = None
+        
+        # 重复内容检测状态管理: { gid: ContentTable }
+        self.content_tables: Dict[int, ContentTable] = {}
+        
+        # 攻击模式状态管理: { gid: RaidMonitor }，以及处于攻击模式的群号集合
+        self.raid_monitors: Dict[int, RaidMonitor] = {}
+        self._active_raids = set()
+        
+        # 自适应阈值的发言速率基线: { gid: TrafficBaseline }
+        self.traffic_baselines: Dict[int, TrafficBaseline] = {}
+        
+        # 违禁词自动机: { gid: KeywordAutomaton }，没有单独设置违禁词的群共用键 0 的全局自动机
+        self.keyword_automatons: Dict[int, KeywordAutomaton] = {}
         
-        # 累计触发次数管理: { "gid:uid": count }
-        self.offense_counts: Dict[str, int] = {}
         
         # 从配置文件 schema 读取默认值
         schema_path = os.path.join(os.path.dirname(__file__), "_conf_schema.json")
@@ -41,16 +122,99 @@ class BanFloodingTheScreenPlugin(Star):
         # 从配置文件读取配置，如果不存在则使用 schema 中的默认值
         try:
             self.enabled_groups = self.config.get("enabled_groups", schema_defaults.get("enabled_groups", []))
+            self.disabled_groups = self.config.get("disabled_groups", schema_defaults.get("disabled_groups", []))
+            self.group_scope = self.config.get("group_scope", schema_defaults.get("group_scope", "auto"))
+            self.whitelist_users = self.config.get("whitelist_users", schema_defaults.get("whitelist_users", []))
+            self.trusted_users = self.config.get("trusted_users", schema_defaults.get("trusted_users", []))
+            self.trust_level_tiers = self.config.get("trust_level_tiers", schema_defaults.get("trust_level_tiers", ""))
             self.detection_period = self.config.get("detection_period", schema_defaults.get("detection_period", 4))
             self.message_threshold = self.config.get("message_threshold", schema_defaults.get("message_threshold", 4))
+            self.detector_type = self.config.get("detector_type", schema_defaults.get("detector_type", "sliding_window"))
+            self.enable_adaptive_threshold = self.config.get("enable_adaptive_threshold", schema_defaults.get("enable_adaptive_threshold", False))
+            self.adaptive_quantile = self.config.get("adaptive_quantile", schema_defaults.get("adaptive_quantile", 0.99))
+            self.adaptive_headroom = self.config.get("adaptive_headroom", schema_defaults.get("adaptive_headroom", 1.0))
+            self.adaptive_min_threshold = self.config.get("adaptive_min_threshold", schema_defaults.get("adaptive_min_threshold", 3))
+            self.adaptive_max_threshold = self.config.get("adaptive_max_threshold", schema_defaults.get("adaptive_max_threshold", 20))
+            self.adaptive_window = self.config.get("adaptive_window", schema_defaults.get("adaptive_window", 2000))
+            self.message_cost_weights = self.config.get("message_cost_weights", schema_defaults.get("message_cost_weights", ""))
+            self.post_ban_cooldown = self.config.get("post_ban_cooldown", schema_defaults.get("post_ban_cooldown", 10))
             self.mute_message = self.config.get("mute_message", schema_defaults.get("mute_message", "检测到刷屏，已自动禁言，如有异议请联系管理员"))
+            
+            # 处罚阶梯配置
+            self.enable_penalty_ladder = self.config.get("enable_penalty_ladder", schema_defaults.get("enable_penalty_ladder", False))
+            self.penalty_ladder = self.config.get("penalty_ladder", schema_defaults.get("penalty_ladder", "1m,10m,1h,1d,kick"))
+            self.penalty_half_life_hours = self.config.get("penalty_half_life_hours", schema_defaults.get("penalty_half_life_hours", 24))
             self.kick_message = self.config.get("kick_message", schema_defaults.get("kick_message", "{at_user} 你已累计触发刷屏禁言 {count} 次，已被请出本群。"))
             
+            # 重复内容检测配置
+            self.enable_content_detection = self.config.get("enable_content_detection", schema_defaults.get("enable_content_detection", False))
+            self.content_repeat_threshold = self.config.get("content_repeat_threshold", schema_defaults.get("content_repeat_threshold", 5))
+            self.content_detection_period = self.config.get("content_detection_period", schema_defaults.get("content_detection_period", 60))
+            self.content_min_length = self.config.get("content_min_length", schema_defaults.get("content_min_length", 6))
+            
+            # @刷屏检测配置
+            self.enable_mention_detection = self.config.get("enable_mention_detection", schema_defaults.get("enable_mention_detection", False))
+            self.mention_threshold = self.config.get("mention_threshold", schema_defaults.get("mention_threshold", 10))
+            self.mention_detection_period = self.config.get("mention_detection_period", schema_defaults.get("mention_detection_period", 60))
+            self.mention_ban_at_all = self.config.get("mention_ban_at_all", schema_defaults.get("mention_ban_at_all", True))
+            self.mention_mute_message = self.config.get("mention_mute_message", schema_defaults.get("mention_mute_message", "{at_user} 短时间内 @ 的成员过多，已自动禁言，如有异议请联系管理员。"))
+            
+            # 违禁词和广告检测配置
+            self.enable_keyword_filter = self.config.get("enable_keyword_filter", schema_defaults.get("enable_keyword_filter", False))
+            self.blocked_keywords = self.config.get("blocked_keywords", schema_defaults.get("blocked_keywords", []))
+            self.ad_patterns = self.config.get("ad_patterns", schema_defaults.get("ad_patterns", "qq,group"))
+            self.keyword_mute_message = self.config.get("keyword_mute_message", schema_defaults.get("keyword_mute_message", "{at_user} 消息包含广告或违禁内容，已自动禁言，如有异议请联系管理员。"))
+            
             # 超长消息配置
             self.enable_long_message_ban = self.config.get("enable_long_message_ban", schema_defaults.get("enable_long_message_ban", False))
             self.long_message_threshold = self.config.get("long_message_threshold", schema_defaults.get("long_message_threshold", 500))
             self.long_message_mute_message = self.config.get("long_message_mute_message", schema_defaults.get("long_message_mute_message", "{at_user} 你的消息字数超过{threshold}字，构成刷屏，已自动禁言，发送长文本建议合并转发形式发送，如有异议或者误判请联系管理员。"))
             
+            # 禁言后撤回配置
+            self.recall_on_ban = self.config.get("recall_on_ban", schema_defaults.get("recall_on_ban", False))
+            self.recall_message_count = self.config.get("recall_message_count", schema_defaults.get("recall_message_count", 10))
+            
+            # 攻击模式配置
+            self.enable_raid_mode = self.config.get("enable_raid_mode", schema_defaults.get("enable_raid_mode", False))
+            self.raid_message_threshold = self.config.get("raid_message_threshold", schema_defaults.get("raid_message_threshold", 30))
+            self.raid_detection_period = self.config.get("raid_detection_period", schema_defaults.get("raid_detection_period", 5))
+            self.raid_cooldown = self.config.get("raid_cooldown", schema_defaults.get("raid_cooldown", 30))
+            self.raid_batch_interval = self.config.get("raid_batch_interval", schema_defaults.get("raid_batch_interval", 2))
+            self.raid_whole_ban = self.config.get("raid_whole_ban", schema_defaults.get("raid_whole_ban", False))
+            self.raid_summary_message = self.config.get("raid_summary_message", schema_defaults.get("raid_summary_message", "检测到多人刷屏，已禁言以下 {count} 人 {mute_time} 分钟：{users}"))
+            
+            # 跨群联防配置
+            self.enable_cross_group = self.config.get("enable_cross_group", schema_defaults.get("enable_cross_group", False))
+            self.cross_group_half_life = self.config.get("cross_group_half_life", schema_defaults.get("cross_group_half_life", 600))
+            self.cross_group_threshold_factor = self.config.get("cross_group_threshold_factor", schema_defaults.get("cross_group_threshold_factor", 0.5))
+            self.cross_group_ban_score = self.config.get("cross_group_ban_score", schema_defaults.get("cross_group_ban_score", 1.5))
+            self.cross_group_max_users = self.config.get("cross_group_max_users", schema_defaults.get("cross_group_max_users", 10000))
+            
+            # 刷屏状态容量上限
+            self.max_tracked_users = self.config.get("max_tracked_users", schema_defaults.get("max_tracked_users", 50000))
+            
+            # 累计次数存储配置
+            self.offense_flush_interval = self.config.get("offense_flush_interval", schema_defaults.get("offense_flush_interval", 10))
+            self.offense_expire_days = self.config.get("offense_expire_days", schema_defaults.get("offense_expire_days", 0))
+            
+            # 动作发送队列配置
+            self.action_rate_per_group = self.config.get("action_rate_per_group", schema_defaults.get("action_rate_per_group", 2))
+            self.action_burst_per_group = self.config.get("action_burst_per_group", schema_defaults.get("action_burst_per_group", 5))
+            self.action_max_retries = self.config.get("action_max_retries", schema_defaults.get("action_max_retries", 3))
+            
+            # 群成员信息缓存配置
+            self.role_cache_ttl = self.config.get("role_cache_ttl", schema_defaults.get("role_cache_ttl", 300))
+            self.role_cache_size = self.config.get("role_cache_size", schema_defaults.get("role_cache_size", 5000))
+            
+            # 运行指标导出配置
+            self.metrics_dump_path = self.config.get("metrics_dump_path", schema_defaults.get("metrics_dump_path", ""))
+            self.metrics_dump_format = self.config.get("metrics_dump_format", schema_defaults.get("metrics_dump_format", "prometheus"))
+            self.metrics_dump_interval = self.config.get("metrics_dump_interval", schema_defaults.get("metrics_dump_interval", 30))
+            
+            # 多实例共享状态配置
+            self.state_backend_type = self.config.get("state_backend", schema_defaults.get("state_backend", "memory"))
+            self.state_backend_path = self.config.get("state_backend_path", schema_defaults.get("state_backend_path", ""))
+            
             # 默认值（用于群配置的默认值）
             self.mute_time = 10
             self.enable_kick_repeat_offender = True
@@ -65,15 +229,96 @@ class BanFloodingTheScreenPlugin(Star):
             self.group_configs = group_configs_raw
         except Exception:
             self.enabled_groups = schema_defaults.get("enabled_groups", [])
+            self.disabled_groups = schema_defaults.get("disabled_groups", [])
+            self.group_scope = schema_defaults.get("group_scope", "auto")
+            self.whitelist_users = schema_defaults.get("whitelist_users", [])
+            self.trusted_users = schema_defaults.get("trusted_users", [])
+            self.trust_level_tiers = schema_defaults.get("trust_level_tiers", "")
             self.detection_period = schema_defaults.get("detection_period", 4)
             self.message_threshold = schema_defaults.get("message_threshold", 4)
+            self.detector_type = schema_defaults.get("detector_type", "sliding_window")
+            self.enable_adaptive_threshold = schema_defaults.get("enable_adaptive_threshold", False)
+            self.adaptive_quantile = schema_defaults.get("adaptive_quantile", 0.99)
+            self.adaptive_headroom = schema_defaults.get("adaptive_headroom", 1.0)
+            self.adaptive_min_threshold = schema_defaults.get("adaptive_min_threshold", 3)
+            self.adaptive_max_threshold = schema_defaults.get("adaptive_max_threshold", 20)
+            self.adaptive_window = schema_defaults.get("adaptive_window", 2000)
+            self.message_cost_weights = schema_defaults.get("message_cost_weights", "")
+            self.post_ban_cooldown = schema_defaults.get("post_ban_cooldown", 10)
             self.mute_message = schema_defaults.get("mute_message", "检测到刷屏，已自动禁言，如有异议请联系管理员")
+            
+            # 处罚阶梯配置
+            self.enable_penalty_ladder = schema_defaults.get("enable_penalty_ladder", False)
+            self.penalty_ladder = schema_defaults.get("penalty_ladder", "1m,10m,1h,1d,kick")
+            self.penalty_half_life_hours = schema_defaults.get("penalty_half_life_hours", 24)
             self.kick_message = schema_defaults.get("kick_message", "{at_user} 你已累计触发刷屏禁言 {count} 次，已被请出本群。")
             
+            # 重复内容检测配置
+            self.enable_content_detection = schema_defaults.get("enable_content_detection", False)
+            self.content_repeat_threshold = schema_defaults.get("content_repeat_threshold", 5)
+            self.content_detection_period = schema_defaults.get("content_detection_period", 60)
+            self.content_min_length = schema_defaults.get("content_min_length", 6)
+            
+            # @刷屏检测配置
+            self.enable_mention_detection = schema_defaults.get("enable_mention_detection", False)
+            self.mention_threshold = schema_defaults.get("mention_threshold", 10)
+            self.mention_detection_period = schema_defaults.get("mention_detection_period", 60)
+            self.mention_ban_at_all = schema_defaults.get("mention_ban_at_all", True)
+            self.mention_mute_message = schema_defaults.get("mention_mute_message", "{at_user} 短时间内 @ 的成员过多，已自动禁言，如有异议请联系管理员。")
+            
+            # 违禁词和广告检测配置
+            self.enable_keyword_filter = schema_defaults.get("enable_keyword_filter", False)
+            self.blocked_keywords = schema_defaults.get("blocked_keywords", [])
+            self.ad_patterns = schema_defaults.get("ad_patterns", "qq,group")
+            self.keyword_mute_message = schema_defaults.get("keyword_mute_message", "{at_user} 消息包含广告或违禁内容，已自动禁言，如有异议请联系管理员。")
+            
             # 超长消息配置
             self.enable_long_message_ban = schema_defaults.get("enable_long_message_ban", False)
             self.long_message_threshold = schema_defaults.get("long_message_threshold", 500)
             self.long_message_mute_message = schema_defaults.get("long_message_mute_message", "{at_user} 你的消息字数超过{threshold}字，构成刷屏，已自动禁言，发送长文本建议合并转发形式发送，如有异议或者误判请联系管理员。")
+            self.recall_on_ban = schema_defaults.get("recall_on_ban", False)
+            self.recall_message_count = schema_defaults.get("recall_message_count", 10)
+            
+            # 攻击模式配置
+            self.enable_raid_mode = schema_defaults.get("enable_raid_mode", False)
+            self.raid_message_threshold = schema_defaults.get("raid_message_threshold", 30)
+            self.raid_detection_period = schema_defaults.get("raid_detection_period", 5)
+            self.raid_cooldown = schema_defaults.get("raid_cooldown", 30)
+            self.raid_batch_interval = schema_defaults.get("raid_batch_interval", 2)
+            self.raid_whole_ban = schema_defaults.get("raid_whole_ban", False)
+            self.raid_summary_message = schema_defaults.get("raid_summary_message", "检测到多人刷屏，已禁言以下 {count} 人 {mute_time} 分钟：{users}")
+            
+            # 跨群联防配置
+            self.enable_cross_group = schema_defaults.get("enable_cross_group", False)
+            self.cross_group_half_life = schema_defaults.get("cross_group_half_life", 600)
+            self.cross_group_threshold_factor = schema_defaults.get("cross_group_threshold_factor", 0.5)
+            self.cross_group_ban_score = schema_defaults.get("cross_group_ban_score", 1.5)
+            self.cross_group_max_users = schema_defaults.get("cross_group_max_users", 10000)
+            
+            # 刷屏状态容量上限
+            self.max_tracked_users = schema_defaults.get("max_tracked_users", 50000)
+            
+            # 累计次数存储配置
+            self.offense_flush_interval = schema_defaults.get("offense_flush_interval", 10)
+            self.offense_expire_days = schema_defaults.get("offense_expire_days", 0)
+            
+            # 动作发送队列配置
+            self.action_rate_per_group = schema_defaults.get("action_rate_per_group", 2)
+            self.action_burst_per_group = schema_defaults.get("action_burst_per_group", 5)
+            self.action_max_retries = schema_defaults.get("action_max_retries", 3)
+            
+            # 群成员信息缓存配置
+            self.role_cache_ttl = schema_defaults.get("role_cache_ttl", 300)
+            self.role_cache_size = schema_defaults.get("role_cache_size", 5000)
+            
+            # 运行指标导出配置
+            self.metrics_dump_path = schema_defaults.get("metrics_dump_path", "")
+            self.metrics_dump_format = schema_defaults.get("metrics_dump_format", "prometheus")
+            self.metrics_dump_interval = schema_defaults.get("metrics_dump_interval", 30)
+            
+            # 多实例共享状态配置
+            self.state_backend_type = schema_defaults.get("state_backend", "memory")
+            self.state_backend_path = schema_defaults.get("state_backend_path", "")
             
             # 默认值（用于群配置的默认值）
             self.mute_time = 10
@@ -81,21 +326,305 @@ class BanFloodingTheScreenPlugin(Star):
             self.kick_threshold = 5
             self.kick_delay = 3
             self.group_configs = []
+        
+        self.flood_states.max_size = max(1, int(self.max_tracked_users))
+        
+        # 跨群信誉索引：最近被处罚的用户及其衰减分数，供开启跨群联防的群读取
+        self.reputation = ReputationIndex(self.cross_group_half_life, self.cross_group_max_users)
+        
+        # 群成员角色缓存: { (gid, uid): (过期时间, member_info) }
+        self.role_cache = RoleCache(ttl=self.role_cache_ttl, maxsize=self.role_cache_size)
+        
+        # 累计触发次数管理：首次访问时从 KV 懒加载，定时批量写回
+        self.offense_store = OffenseStore(
+            self.get_kv_data,
+            self.put_kv_data,
+            self.delete_kv_data,
+            flush_interval=self.offense_flush_interval,
+            expire_seconds=self.offense_expire_days * 86400
+        )
+        
+        # 状态存储后端：多个实例共享检测窗口、累计次数和去重标记
+        try:
+            self.state_backend = create_state_backend(self.state_backend_type, self.state_backend_path)
+        except Exception as e:
+            logger.error(f"[刷屏禁言] 创建状态存储后端失败，使用进程内存储: {e}")
+            self.state_backend = MemoryBackend()
+        # 去重标记的有效期（秒），与发送队列合并重复禁言的时间窗口一致
+        self.claim_ttl = 10.0
+        # 同一秒内相同消息的出现次数，用于生成跨实例一致的消息标识
+        self._identity_second = None
+        self._identity_counts: Dict[str, int] = {}
+        
+        # 运行指标：消息处理和接口调用耗时、禁言踢人次数，以及定时导出任务
+        self.metrics = PluginMetrics()
+        self._metrics_task: Optional[asyncio.Task] = None
+        
+        # 汇总撤回结果的后台任务，持有引用避免被回收
+        self._recall_tasks = set()
+        # 执行处罚的后台任务
+        self._enforcement_tasks = set()
+        # 冷却期内有待撤回消息的用户: { state_key: (bot, gid) }，由清理任务每个刻度按群合并撤回
+        self._cooldown_recalls: Dict[str, Tuple[Any, int]] = {}
+        
+        # 延迟写入配置文件的任务，连续修改多项设置时合并为一次写入
+        self._config_write_task: Optional[asyncio.Task] = None
+        
+        # OneBot 动作发送队列：按群限速、按优先级发送、失败重试
+        self.action_scheduler = ActionScheduler(
+            rate=self.action_rate_per_group,
+            burst=self.action_burst_per_group,
+            max_retries=self.action_max_retries,
+            coalesce_window=self.claim_ttl,
+            metrics=self.metrics
+        )
+        
+        # 编译后的群配置索引: { gid: GroupConfig }，以及启用群号集合
+        self._default_group_config: GroupConfig = None
+        self._group_config_index: Dict[int, GroupConfig] = {}
+        self._enabled_gids: frozenset = frozenset()
+        self._disabled_gids: frozenset = frozenset()
+        # 是否对所有群生效（disabled_groups 中的群除外），由 group_scope 决定
+        self._all_groups_enabled = False
+        self._cross_group_any = False
+        # 合并后的内置广告规则正则，都未启用时为 None
+        self._ad_pattern = None
+        # 编译后的提示语模板: { 配置项名: MessageTemplate }
+        self._schema_defaults = schema_defaults
+        self._templates: Dict[str, MessageTemplate] = {}
+        self._rebuild_config_index()
+
+    def _compile_templates(self) -> Dict[str, MessageTemplate]:
+        """编译所有提示语模板，无效的模板记录错误并使用默认模板"""
+        templates = {}
+        for name, fields in TEMPLATE_FIELDS.items():
+            try:
+                templates[name] = MessageTemplate.compile(getattr(self, name), fields)
+            except ValueError as e:
+                logger.error(f"[刷屏禁言] 提示语 {name} 无效，使用默认提示语: {e}")
+                templates[name] = MessageTemplate.compile(self._schema_defaults.get(name) or "", fields)
+        return templates
+
+    def _rebuild_config_index(self):
+        """根据当前配置重建群配置索引
+
+        新索引构建完成后整体替换旧索引，消息处理过程中不会读到半成品。
+        """
+        cost_model = DEFAULT_COST_MODEL
+        if self.message_cost_weights:
+            try:
+                cost_model = MessageCostModel.parse(self.message_cost_weights)
+            except ValueError as e:
+                logger.warning(f"[刷屏禁言] 消息开销权重无效，使用默认权重: {e}")
+        
+        penalty_ladder = None
+        if self.enable_penalty_ladder:
+            try:
+                penalty_ladder = PenaltyLadder.parse(self.penalty_ladder)
+            except ValueError as e:
+                logger.warning(f"[刷屏禁言] 处罚阶梯无效，使用固定禁言时长: {e}")
+        
+        try:
+            trust = TrustPolicy(
+                parse_uid_set(self.whitelist_users),
+                parse_trust_map(self.trusted_users),
+                parse_level_tiers(self.trust_level_tiers)
+            )
+        except ValueError as e:
+            logger.warning(f"[刷屏禁言] 白名单或信任档位无效，不启用: {e}")
+            trust = EMPTY_POLICY
+        
+        default_config = GroupConfig(
+            group_id="",
+            mute_time=self.mute_time,
+            enable_kick=self.enable_kick_repeat_offender,
+            kick_threshold=self.kick_threshold,
+            kick_delay=self.kick_delay,
+            enable_long_message_ban=self.enable_long_message_ban,
+            long_message_threshold=self.long_message_threshold,
+            cost_model=cost_model,
+            recall_on_ban=bool(self.recall_on_ban),
+            cross_group=bool(self.enable_cross_group),
+            adaptive_threshold=bool(self.enable_adaptive_threshold),
+            keyword_filter=bool(self.enable_keyword_filter),
+            keywords=parse_keywords(self.blocked_keywords),
+            penalty_ladder=penalty_ladder,
+            trust=trust
+        )
+        group_configs_list = self.group_configs if isinstance(self.group_configs, list) else []
+        index = build_config_index(group_configs_list, default_config)
+        
+        self._default_group_config = default_config
+        self._group_config_index = index
+        # 有群开启跨群联防时才记录处罚到信誉索引
+        self._cross_group_any = default_config.cross_group or any(config.cross_group for config in index.values())
+        try:
+            self._ad_pattern = compile_ad_patterns(self.ad_patterns)
+        except ValueError as e:
+            logger.warning(f"[刷屏禁言] 内置广告规则无效，不启用: {e}")
+            self._ad_pattern = None
+        # 不再单独设置违禁词的群改用全局自动机，其余自动机在下次匹配时按差异增量更新
+        for gid in [gid for gid in self.keyword_automatons if gid and (gid not in index or index[gid].keywords is default_config.keywords)]:
+            del self.keyword_automatons[gid]
+        self._templates = self._compile_templates()
+        self._enabled_gids = self._parse_gids(self.enabled_groups, "启用")
+        self._disabled_gids = self._parse_gids(self.disabled_groups, "关闭")
+        # auto：启用群列表为空时对所有群生效；listed：只对启用群列表生效；all：对所有群生效
+        if self.group_scope == "all":
+            self._all_groups_enabled = True
+        elif self.group_scope == "listed":
+            self._all_groups_enabled = False
+        else:
+            self._all_groups_enabled = not self._enabled_gids
+
+    @staticmethod
+    def _parse_gids(groups, kind: str) -> frozenset:
+        """将配置中的群号列表转换为整数集合，忽略无效群号"""
+        gids = set()
+        for gid_str in groups if isinstance(groups, list) else []:
+            try:
+                gids.add(int(str(gid_str).strip()))
+            except ValueError:
+                logger.warning(f"[刷屏禁言] 忽略无效的{kind}群号: {gid_str}")
+        return frozenset(gids)
+
+    # 修改设置后延迟写入配置文件的时间（秒），期间的其他修改合并为一次写入
+    CONFIG_WRITE_DELAY = 2.0
 
     def _save_config(self):
-        """保存配置到磁盘"""
+        """应用配置修改，并安排写入磁盘
+
+        修改立即生效；写入延迟 CONFIG_WRITE_DELAY 秒执行，期间的多次修改只写一次文件。
+        没有运行中的事件循环时立即写入。
+        """
+        self._rebuild_config_index()
+        self._sync_config()
+        if self._config_write_task is not None and not self._config_write_task.done():
+            return
+        try:
+            self._config_write_task = asyncio.get_running_loop().create_task(self._delayed_write_config())
+        except RuntimeError:
+            self._write_config()
+
+    async def _delayed_write_config(self):
+        await asyncio.sleep(self.CONFIG_WRITE_DELAY)
+        self._write_config()
+
+    def _flush_config(self):
+        """立即写入尚未写入的配置修改"""
+        task = self._config_write_task
+        if task is not None and not task.done():
+            task.cancel()
+            self._write_config()
+        self._config_write_task = None
+
+    def _write_config(self):
+        try:
+            self.config.save_config()
+            logger.info("[刷屏禁言] 配置已保存到文件")
+        except Exception as e:
+            logger.error(f"[刷屏禁言] 保存配置失败: {e}")
+
+    def _sync_config(self):
+        """把当前设置写回配置对象"""
         try:
             self.config["enabled_groups"] = self.enabled_groups
+            self.config["disabled_groups"] = self.disabled_groups
+            self.config["group_scope"] = self.group_scope
+            
+            # 白名单和信任档位配置
+            self.config["whitelist_users"] = self.whitelist_users
+            self.config["trusted_users"] = self.trusted_users
+            self.config["trust_level_tiers"] = self.trust_level_tiers
+            
             self.config["detection_period"] = self.detection_period
             self.config["message_threshold"] = self.message_threshold
+            self.config["detector_type"] = self.detector_type
+            self.config["enable_adaptive_threshold"] = self.enable_adaptive_threshold
+            self.config["adaptive_quantile"] = self.adaptive_quantile
+            self.config["adaptive_headroom"] = self.adaptive_headroom
+            self.config["adaptive_min_threshold"] = self.adaptive_min_threshold
+            self.config["adaptive_max_threshold"] = self.adaptive_max_threshold
+            self.config["adaptive_window"] = self.adaptive_window
+            self.config["message_cost_weights"] = self.message_cost_weights
+            self.config["post_ban_cooldown"] = self.post_ban_cooldown
             self.config["mute_message"] = self.mute_message
+            
+            # 处罚阶梯配置
+            self.config["enable_penalty_ladder"] = self.enable_penalty_ladder
+            self.config["penalty_ladder"] = self.penalty_ladder
+            self.config["penalty_half_life_hours"] = self.penalty_half_life_hours
             self.config["kick_message"] = self.kick_message
             
+            # 重复内容检测配置
+            self.config["enable_content_detection"] = self.enable_content_detection
+            self.config["content_repeat_threshold"] = self.content_repeat_threshold
+            self.config["content_detection_period"] = self.content_detection_period
+            self.config["content_min_length"] = self.content_min_length
+            
+            # @刷屏检测配置
+            self.config["enable_mention_detection"] = self.enable_mention_detection
+            self.config["mention_threshold"] = self.mention_threshold
+            self.config["mention_detection_period"] = self.mention_detection_period
+            self.config["mention_ban_at_all"] = self.mention_ban_at_all
+            self.config["mention_mute_message"] = self.mention_mute_message
+            
+            # 违禁词和广告检测配置
+            self.config["enable_keyword_filter"] = self.enable_keyword_filter
+            self.config["blocked_keywords"] = self.blocked_keywords
+            self.config["ad_patterns"] = self.ad_patterns
+            self.config["keyword_mute_message"] = self.keyword_mute_message
+            
             # 超长消息配置
             self.config["enable_long_message_ban"] = self.enable_long_message_ban
             self.config["long_message_threshold"] = self.long_message_threshold
             self.config["long_message_mute_message"] = self.long_message_mute_message
             
+            # 禁言后撤回配置
+            self.config["recall_on_ban"] = self.recall_on_ban
+            self.config["recall_message_count"] = self.recall_message_count
+            
+            # 攻击模式配置
+            self.config["enable_raid_mode"] = self.enable_raid_mode
+            self.config["raid_message_threshold"] = self.raid_message_threshold
+            self.config["raid_detection_period"] = self.raid_detection_period
+            self.config["raid_cooldown"] = self.raid_cooldown
+            self.config["raid_batch_interval"] = self.raid_batch_interval
+            self.config["raid_whole_ban"] = self.raid_whole_ban
+            self.config["raid_summary_message"] = self.raid_summary_message
+            
+            # 跨群联防配置
+            self.config["enable_cross_group"] = self.enable_cross_group
+            self.config["cross_group_half_life"] = self.cross_group_half_life
+            self.config["cross_group_threshold_factor"] = self.cross_group_threshold_factor
+            self.config["cross_group_ban_score"] = self.cross_group_ban_score
+            self.config["cross_group_max_users"] = self.cross_group_max_users
+            
+            # 刷屏状态容量上限
+            self.config["max_tracked_users"] = self.max_tracked_users
+            
+            # 累计次数存储配置
+            self.config["offense_flush_interval"] = self.offense_flush_interval
+            self.config["offense_expire_days"] = self.offense_expire_days
+            
+            # 动作发送队列配置
+            self.config["action_rate_per_group"] = self.action_rate_per_group
+            self.config["action_burst_per_group"] = self.action_burst_per_group
+            self.config["action_max_retries"] = self.action_max_retries
+            
+            # 群成员信息缓存配置
+            self.config["role_cache_ttl"] = self.role_cache_ttl
+            self.config["role_cache_size"] = self.role_cache_size
+            
+            # 运行指标导出配置
+            self.config["metrics_dump_path"] = self.metrics_dump_path
+            self.config["metrics_dump_format"] = self.metrics_dump_format
+            self.config["metrics_dump_interval"] = self.metrics_dump_interval
+            
+            # 多实例共享状态配置
+            self.config["state_backend"] = self.state_backend_type
+            self.config["state_backend_path"] = self.state_backend_path
+            
             # 确保 group_configs 是列表格式
             if not isinstance(self.group_configs, list):
                 # 如果是旧的字典格式，转换为新的列表格式
@@ -103,9 +632,6 @@ class BanFloodingTheScreenPlugin(Star):
                 # 这里可以添加转换逻辑，如果需要的话
             
             self.config["group_configs"] = self.group_configs
-            
-            self.config.save_config()
-            logger.info("[刷屏禁言] 配置已保存到文件")
         except Exception as e:
             logger.error(f"[刷屏禁言] 更新配置失败: {e}")
 
@@ -122,26 +648,7 @@ class BanFloodingTheScreenPlugin(Star):
         - 1s, 1S -> 0分钟（秒不支持，返回0）
         - 纯数字 -> 视为分钟
         """
-        time_str = time_str.strip().lower()
-        
-        # 匹配数字+单位格式
-        match = re.match(r'^(\d+)\s*([天小时分秒天hmds]+)?$', time_str)
-        if not match:
-            return None
-        
-        num = int(match.group(1))
-        unit = match.group(2) or ""
-        
-        if not unit or unit in ["分", "分钟", "m"]:
-            return num
-        elif unit in ["小时", "h"]:
-            return num * 60
-        elif unit in ["天", "d"]:
-            return num * 1440
-        elif unit in ["秒", "s"]:
-            return 0
-        
-        return None
+        return parse_minutes(time_str)
 
     async def _check_permission(self, event: AstrMessageEvent) -> tuple[bool, str]:
         """检查用户权限和机器人权限
@@ -157,7 +664,7 @@ class BanFloodingTheScreenPlugin(Star):
         
         # 检查机器人权限
         try:
-            bot_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(event.get_self_id()))
+            bot_info = await self._get_member_info(event, gid, event.get_self_id())
             bot_role = bot_info.get("role")
             if bot_role not in ["admin", "owner"]:
                 return (False, "bot权限不足，需要管理员权限")
@@ -172,31 +679,76 @@ class BanFloodingTheScreenPlugin(Star):
         
         return (True, "")
 
-    def _get_group_config(self, gid: int) -> Dict[str, Any]:
-        """获取群级别配置"""
-        gid_str = str(gid)
-        
-        # 从 template_list 格式的 group_configs 中查找群配置
-        group_configs_list = self.group_configs if isinstance(self.group_configs, list) else []
+    async def _resolve_command_context(self, event: AstrMessageEvent, name: str):
+        """解析管理员群命令的上下文
+
+        返回:
+            None: 不是 QQ 群消息，忽略
+            str: 权限不足时的提示
+            CommandContext: 可以执行命令
+        """
+        if event.get_platform_name() != "aiocqhttp":
+            return None
+
+        raw = event.message_obj.raw_message
+        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
+            return None
+
+        has_permission, error_msg = await self._check_permission(event)
+        if not has_permission:
+            return error_msg
+
+        # 移除命令部分
+        args = event.message_str.strip().replace(name, "", 1).strip()
+        return CommandContext(raw, int(raw.get("group_id")), str(raw.get("user_id")), args)
+
+    async def _get_member_info(self, event: AstrMessageEvent, gid: int, uid) -> Dict[str, Any]:
+        """获取群成员信息，优先使用缓存
+
+        调用失败时抛出异常，由调用方处理。
+        """
+        gid = int(gid)
+        uid = int(uid)
+        now = time.monotonic()
+        member_info = self.role_cache.get(gid, uid, now)
+        if member_info is None:
+            started = time.perf_counter()
+            try:
+                member_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=uid)
+            except Exception:
+                self.metrics.observe_action("get_group_member_info", time.perf_counter() - started, error=True)
+                raise
+            self.metrics.observe_action("get_group_member_info", time.perf_counter() - started)
+            self.role_cache.put(gid, uid, member_info, now)
+        return member_info
+
+    def _handle_notice(self, raw: Dict[str, Any]):
+        """处理群通知事件，失效受影响的成员信息缓存"""
+        notice_type = raw.get("notice_type")
+        if notice_type not in ("group_admin", "group_decrease"):
+            return
         
-        # 查找匹配的群配置
-        for config in group_configs_list:
-            if config.get("group_id") == gid_str:
-                # 添加 enabled 字段（从 enabled_groups 列表中检查）
-                config["enabled"] = gid_str in self.enabled_groups
-                return config
+        try:
+            gid = int(raw.get("group_id"))
+            uid = int(raw.get("user_id"))
+        except (TypeError, ValueError):
+            return
         
-        # 如果没有找到，返回默认配置
-        return {
-            "group_id": gid_str,
-            "enabled": gid_str in self.enabled_groups,
-            "mute_time": self.mute_time,
-            "enable_kick": self.enable_kick_repeat_offender,
-            "kick_threshold": self.kick_threshold,
-            "kick_delay": self.kick_delay,
-            "enable_long_message_ban": self.enable_long_message_ban,
-            "long_message_threshold": self.long_message_threshold
-        }
+        # 机器人自己被移出群，整个群的缓存都不再可信
+        if notice_type == "group_decrease" and str(uid) == str(raw.get("self_id")):
+            self.role_cache.invalidate_group(gid)
+        else:
+            self.role_cache.invalidate(gid, uid)
+
+    def _get_group_config(self, gid: int) -> GroupConfig:
+        """获取群级别配置，没有单独配置的群共用默认配置"""
+        return self._group_config_index.get(gid, self._default_group_config)
+
+    def _is_group_enabled(self, gid: int) -> bool:
+        """检查群是否启用了刷屏检测"""
+        if self._all_groups_enabled:
+            return gid not in self._disabled_gids
+        return gid in self._enabled_gids
 
     def _update_group_config(self, gid: int, updates: Dict[str, Any]):
         """更新群配置
@@ -230,300 +782,834 @@ class BanFloodingTheScreenPlugin(Star):
             }
             new_config.update(updates)
             self.group_configs.append(new_config)
+        
+        self._rebuild_config_index()
 
     @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
     @filter.platform_adapter_type(filter.PlatformAdapterType.AIOCQHTTP)
     async def handle_group_message(self, event: AstrMessageEvent):
         """处理群消息，检测刷屏和超长消息"""
-
         raw = event.message_obj.raw_message
         
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
+        # 群管理员变动、成员退群等通知用于失效成员信息缓存，未启用的群也要处理，
+        # 否则机器人在未启用的群成为管理员后，开启功能时仍会读到缓存中的旧角色
+        if raw.get("post_type") == "notice":
+            self._handle_notice(raw)
             return
-
+        
+        # 未启用的群最先排除，不做任何其他处理（包括计时）
         gid = raw.get("group_id")
-        uid = str(raw.get("user_id"))
+        if self._all_groups_enabled:
+            if gid in self._disabled_gids:
+                return
+        elif gid not in self._enabled_gids:
+            return
+        
+        started = time.perf_counter()
+        try:
+            await self._process_group_message(event, raw, gid)
+        finally:
+            self.metrics.messages.observe(time.perf_counter() - started)
+
+    async def _process_group_message(self, event: AstrMessageEvent, raw: Dict[str, Any], gid: int):
+        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
+            return
         
         # 获取群级别配置
         config = self._get_group_config(gid)
         
-        # 检查群是否启用了刷屏检测
-        if not config.get("enabled", False):
+        # 白名单用户在创建任何状态之前直接返回
+        user_id = raw.get("user_id")
+        trust = config.trust
+        if user_id in trust.whitelist:
+            return
+        # 信任用户按倍数放宽阈值
+        multiplier = trust.multiplier(user_id, raw.get("sender"))
+        uid = str(user_id)
+        state_key = f"{gid}:{uid}"
+        now = time.monotonic()
+        
+        # 正在处罚或处罚后冷却期内的用户，消息直接丢弃（开启撤回时一并撤回）
+        flood_state = self.flood_states.get(state_key)
+        if flood_state is not None and flood_state.dropping(now):
+            if config.recall_on_ban and flood_state.phase == COOLDOWN:
+                self._queue_cooldown_recall(event.bot, gid, state_key, flood_state, raw.get("message_id"))
             return
+        if state_key in self._cooldown_recalls:
+            # 冷却期刚结束，先撤回冷却期内的消息，避免和之后的正常消息混在一起
+            self._flush_cooldown_recalls([state_key])
+        
+        # 最近在其他群被处罚过的用户收紧阈值
+        reputation = 0.0
+        if config.cross_group and self.reputation:
+            reputation = self.reputation.score(user_id, now, exclude_gid=gid)
+            if reputation >= self.reputation.RECENT_SCORE:
+                multiplier *= min(1.0, max(0.1, float(self.cross_group_threshold_factor)))
+        
+        # 单次遍历消息段，计算消息开销和文字长度
+        cost, text_length, _, at_count, at_all = config.cost_model.measure(raw.get("message"))
         
-        # 先检测超长消息
-        if config.get("enable_long_message_ban", False):
-            await self._handle_long_message(event, gid, uid, config)
+        self._bot = event.bot
+        self._ensure_sweeper()
+        
+        # 先检测超长消息（信任用户按倍数放宽阈值），处罚在后台任务中执行，期间用户状态处于 ENFORCING
+        if config.enable_long_message_ban:
+            threshold = int(config.long_message_threshold * multiplier)
+            if text_length > threshold:
+                flood_state = self._get_flood_state(state_key, gid, config, multiplier)
+                if flood_state.begin_enforcement():
+                    self._start_enforcement(
+                        state_key, flood_state,
+                        self._enforce_long_message(event, gid, uid, state_key, flood_state, config, threshold)
+                    )
+                    return
         
         # 然后检测刷屏
+        
+        # 统计全群消息速率，检测多人同时刷屏
+        if self.enable_raid_mode:
+            monitor = self._get_raid_monitor(gid)
+            if monitor.record(now):
+                await self._enter_raid(event, gid, monitor)
+        
         # 获取用户的刷屏状态
-        state_key = f"{gid}:{uid}"
-        flood_state = self._get_flood_state(state_key)
+        flood_state = self._get_flood_state(state_key, gid, config, multiplier)
         
-        # 添加消息到列表
-        flood_state["messages"].append(event.message_str)
+        # 开启禁言后撤回的群记录最近的 message_id
+        if config.recall_on_ban:
+            if flood_state.message_ids is None:
+                flood_state.message_ids = MessageIdRing(self.recall_message_count)
+            flood_state.message_ids.push(raw.get("message_id"))
         
-        # 检查是否达到阈值且未在处理刷屏禁言
-        if len(flood_state["messages"]) >= self.message_threshold and not flood_state["is_handling_flood"]:
-            flood_state["is_handling_flood"] = True
-            await self._handle_flooding(event, gid, uid, state_key, config)
+        # 按消息开销记录并检查是否达到阈值，共享模式下由所有实例共同计数
+        if self.state_backend.shared:
+            flooding = await self._hit_shared_window(event, gid, uid, flood_state, cost, now)
         else:
-            # 如果没有达到阈值，设置定时器
-            if not flood_state["timer"] or flood_state["timer"].cancelled():
-                flood_state["timer"] = asyncio.create_task(self._reset_flood_state(state_key))
-
-    async def _handle_long_message(self, event: AstrMessageEvent, gid: int, uid: str, config: Dict[str, Any]):
-        """处理超长消息事件"""
-        # 获取消息长度
-        message_length = len(event.message_str.strip())
+            flooding = flood_state.detector.hit(now, cost)
         
-        # 获取超长消息阈值
-        threshold = config.get("long_message_threshold", self.long_message_threshold)
+        # 检测多人或慢速重复发送相同/相近内容
+        if self.enable_content_detection and self._get_content_table(gid).hit(event.message_str, now):
+            if not flooding:
+                logger.info(f"[刷屏禁言] 用户 {uid} 在群 {gid} 发送的内容重复次数达到阈值")
+            flooding = True
         
-        # 检查消息长度是否超过阈值
-        if message_length <= threshold:
-            return
+        # 检测短时间内 @ 过多成员，不带 @ 的消息直接跳过
+        template = None
+        if at_count and self.enable_mention_detection and self._hit_mentions(flood_state, at_count, at_all, now, multiplier):
+            if not flooding:
+                logger.info(f"[刷屏禁言] 用户 {uid} 在群 {gid} @ 成员过多")
+                template = self._templates["mention_mute_message"]
+            flooding = True
         
-        # 检查机器人是否有权限
+        # 检测违禁词和广告：一次线性扫描匹配全部关键词，再匹配合并后的内置广告规则
+        if not flooding and config.keyword_filter:
+            keyword = self._match_keywords(gid, config, event.message_str)
+            if keyword:
+                logger.info(f"[刷屏禁言] 用户 {uid} 在群 {gid} 发送的消息包含违禁内容: {keyword}")
+                template = self._templates["keyword_mute_message"]
+                flooding = True
+        
+        # 短时间内在多个群被处罚的用户直接处罚
+        if not flooding and self.cross_group_ban_score > 0 and reputation >= self.cross_group_ban_score:
+            logger.info(f"[刷屏禁言] 用户 {uid} 近期在其他群多次被处罚（分数 {reputation:.1f}），在群 {gid} 直接处罚")
+            flooding = True
+        
+        # 达到阈值：同步切换到 ENFORCING，本次处理流程成为唯一的处罚执行者
+        if flooding and flood_state.begin_enforcement():
+            self._handle_flooding(event, gid, uid, state_key, flood_state, config, template)
+        elif not flooding:
+            # 如果没有达到阈值，检测窗口在最后一条消息后 detection_period 秒过期；
+            # 有 @ 记录时保留到 @ 检测窗口结束。本消息处理中等待期间，其他消息可能已使状态进入
+            # 处罚中或冷却期，此时过期时间由处罚流程负责，不能重新登记，否则状态可能在处罚中途被清理
+            if flood_state.phase == COUNTING:
+                expire_after = self.detection_period
+                if flood_state.mentions is not None:
+                    expire_after = max(expire_after, self.mention_detection_period)
+                self.expiry_wheel.schedule(state_key, now + expire_after)
+            # 未触发处罚的消息计入群的发言速率基线
+            if config.adaptive_threshold:
+                self._observe_traffic(gid, flood_state, cost, now)
+
+    def _message_identity(self, event: AstrMessageEvent, gid: int, uid: str) -> str:
+        """生成跨实例一致的消息标识
+
+        各个机器人收到的 message_id 不同，这里用发送时间、群号、发送者和内容摘要标识一条消息，
+        同一秒内重复发送的相同内容按出现顺序编号区分。
+        """
+        raw = event.message_obj.raw_message
+        second = raw.get("time")
+        if second != self._identity_second or len(self._identity_counts) > 4096:
+            self._identity_second = second
+            self._identity_counts.clear()
+        base = f"{gid}:{uid}:{second}:{zlib.crc32(event.message_str.encode('utf-8'))}"
+        occurrence = self._identity_counts.get(base, 0)
+        self._identity_counts[base] = occurrence + 1
+        return f"{base}:{occurrence}"
+
+    async def _hit_shared_window(self, event: AstrMessageEvent, gid: int, uid: str, flood_state: FloodState, cost: float, now: float) -> bool:
+        """在共享存储中记录消息开销，返回是否达到阈值
+
+        每条消息只由第一个收到它的实例计数；共享存储不可用时退回本地检测。
+        """
+        backend = self.state_backend
         try:
-            group_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(event.get_self_id()))
-            bot_role = group_info.get("role")
-            if bot_role not in ["admin", "owner"]:
-                logger.warning(f"[刷屏禁言] 机器人在群 {gid} 没有管理员权限，无法禁言")
-                return
+            if not await backend.acquire(f"msg:{self._message_identity(event, gid, uid)}", self.detection_period * 2):
+                return False
+            total = await backend.add_to_window(f"window:{gid}:{uid}", min(cost, flood_state.detector.max_cost), self.detection_period)
         except Exception as e:
-            logger.error(f"[刷屏禁言] 检查机器人权限失败: {e}")
-            return
-        
-        # 检查用户角色
+            logger.error(f"[刷屏禁言] 访问共享状态失败，使用本地检测: {e}")
+            return flood_state.detector.hit(now, cost)
+        # 检测器的阈值已按信任倍数放宽
+        return total >= flood_state.detector.threshold
+
+    async def _claim(self, kind: str, gid: int, uid: str = "", ttl: float = None) -> bool:
+        """设置去重标记，返回本实例是否应执行该处罚
+
+        多个实例同时检测到同一个用户时，只有第一个设置成功的实例禁言和发送提示。
+        单实例模式或共享存储不可用时按本实例执行处理。
+        """
+        if not self.state_backend.shared:
+            return True
         try:
-            member_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(uid))
-            user_role = member_info.get("role")
-            if user_role == "owner":
-                logger.info(f"[刷屏禁言] 用户 {uid} 是群主，跳过超长消息禁言")
-                return
-            if user_role == "admin" and bot_role != "owner":
-                logger.info(f"[刷屏禁言] 用户 {uid} 是管理员，机器人不是群主，跳过超长消息禁言")
-                return
+            return await self.state_backend.acquire(f"{kind}:{gid}:{uid}", ttl or self.claim_ttl)
         except Exception as e:
-            logger.error(f"[刷屏禁言] 检查用户角色失败: {e}")
-            return
+            logger.error(f"[刷屏禁言] 访问共享状态失败: {e}")
+            return True
+
+    def _hit_mentions(self, flood_state: FloodState, at_count: int, at_all: bool, now: float, multiplier: float = 1.0) -> bool:
+        """记录一条消息中的 @ 人数，返回是否判定为 @ 刷屏"""
+        if at_all and self.mention_ban_at_all:
+            return True
+        threshold = max(1, int(self.mention_threshold * multiplier))
+        if at_count >= threshold:
+            return True
+        if flood_state.mentions is None:
+            flood_state.mentions = SlidingWindowLog(threshold, self.mention_detection_period)
+        return flood_state.mentions.hit(now, at_count)
+
+    async def _enforce_long_message(self, event: AstrMessageEvent, gid: int, uid: str, state_key: str, flood_state: FloodState, config: GroupConfig, threshold: int):
+        """处罚超长消息，已处罚时进入冷却期，未处罚（如对方是管理员）时回到 COUNTING"""
+        if await self._handle_long_message(event, gid, uid, config, threshold):
+            self._enter_cooldown(state_key)
+        elif self.flood_states.get(state_key) is flood_state:
+            flood_state.cancel_enforcement()
+            self.expiry_wheel.schedule(state_key, time.monotonic() + self.detection_period)
+
+    async def _handle_long_message(self, event: AstrMessageEvent, gid: int, uid: str, config: GroupConfig, threshold: int) -> bool:
+        """处理超过 threshold 字的超长消息，返回是否已处罚（包括由其他实例处罚）"""
+        # 检查机器人权限和用户角色
+        member_info = await self._check_target(event, gid, uid, "超长消息禁言")
+        if member_info is None:
+            return False
+        
+        # 其他实例已处理
+        if not await self._claim("long", gid, uid):
+            return True
         
         # 获取禁言时间
-        mute_time = config.get("mute_time", self.mute_time)
+        mute_time = config.mute_time
         
         # 执行禁言
-        try:
-            await event.bot.api.call_action(
-                "set_group_ban",
-                group_id=gid,
-                user_id=int(uid),
-                duration=mute_time * 60
-            )
-            logger.info(f"[刷屏禁言] 已禁言用户 {uid}（超长消息），时长 {mute_time} 分钟")
-        except Exception as e:
-            logger.error(f"[刷屏禁言] 禁言失败（超长消息）: {e}")
-            return
+        self._submit_ban(event, gid, uid, mute_time)
+        logger.info(f"[刷屏禁言] 已禁言用户 {uid}（超长消息），时长 {mute_time} 分钟")
+        
+        # 撤回这条超长消息
+        if config.recall_on_ban:
+            self._recall_messages(event.bot, gid, [event.message_obj.raw_message.get("message_id")])
         
         # 发送禁言消息
-        if self.long_message_mute_message:
+        template = self._templates["long_message_mute_message"]
+        if template:
             try:
-                at_user = f"[CQ:at,qq={uid}]"
                 nickname = member_info.get("card") or member_info.get("nickname") or uid
-                message = self.long_message_mute_message.format(
-                    at_user=at_user,
-                    nickname=nickname,
-                    threshold=threshold,
-                    mute_time=mute_time
-                )
-                
-                await event.bot.api.call_action("send_group_msg", group_id=gid, message=message)
+                message = template.render(at_user=uid, nickname=nickname, threshold=threshold, mute_time=mute_time)
+                self.action_scheduler.submit(event.bot, "send_group_msg", gid, PRIORITY_MESSAGE, group_id=gid, message=message)
             except Exception as e:
                 logger.error(f"[刷屏禁言] 发送超长消息禁言消息失败: {e}")
+        return True
+
+    def _submit_ban(self, event: AstrMessageEvent, gid: int, uid: str, mute_time: int) -> asyncio.Future:
+        """提交禁言动作，不等待结果"""
+        self.metrics.record_ban(gid)
+        if self._cross_group_any:
+            self.reputation.record(int(uid), gid, time.monotonic())
+        return self.action_scheduler.submit(
+            event.bot,
+            "set_group_ban",
+            gid,
+            PRIORITY_BAN,
+            group_id=gid,
+            user_id=int(uid),
+            duration=mute_time * 60
+        )
 
-    async def _handle_flooding(self, event: AstrMessageEvent, gid: int, uid: str, state_key: str, config: Dict[str, Any]):
-        """处理刷屏事件"""
-        # 取消定时器
+    def _take_message_ids(self, state_key: str) -> list:
+        """取出用户最近消息的 message_id，未记录时返回空列表"""
         flood_state = self.flood_states.get(state_key)
-        if flood_state and flood_state.get("timer") and not flood_state["timer"].cancelled():
-            flood_state["timer"].cancel()
-        
+        if flood_state is None or flood_state.message_ids is None:
+            return []
+        return flood_state.message_ids.drain()
+
+    def _recall_messages(self, bot: Any, gid: int, message_ids: list):
+        """撤回消息
+
+        撤回动作以最低优先级进入发送队列，与禁言共用群的限速和并发上限，
+        排在同一个群的禁言和提示消息之后；结果由后台任务汇总，不阻塞调用方。
+        """
+        message_ids = [message_id for message_id in message_ids if message_id is not None]
+        if not message_ids:
+            return
+        futures = [
+            self.action_scheduler.submit(bot, "delete_msg", gid, PRIORITY_RECALL, message_id=message_id)
+            for message_id in message_ids
+        ]
+        task = asyncio.create_task(self._log_recall(gid, futures))
+        self._recall_tasks.add(task)
+        task.add_done_callback(self._recall_tasks.discard)
+
+    def _queue_cooldown_recall(self, bot: Any, gid: int, state_key: str, flood_state: FloodState, message_id: Any):
+        """记录冷却期内丢弃的消息，等待清理任务合并撤回
+
+        每个用户每个刻度最多撤回 recall_message_count 条，超出时覆盖最旧的记录，
+        持续刷屏的用户不会在发送队列中积压大量撤回动作。
+        """
+        if flood_state.message_ids is None:
+            flood_state.message_ids = MessageIdRing(self.recall_message_count)
+        flood_state.message_ids.push(message_id)
+        self._cooldown_recalls[state_key] = (bot, gid)
+        self._ensure_sweeper()
+
+    def _flush_cooldown_recalls(self, state_keys: Optional[list] = None):
+        """撤回冷却期内丢弃的消息，同一个群的消息合并为一批，只汇总一次结果"""
+        if state_keys is None:
+            state_keys = list(self._cooldown_recalls)
+        batches: Dict[int, Tuple[Any, list]] = {}
+        for state_key in state_keys:
+            bot, gid = self._cooldown_recalls.pop(state_key)
+            message_ids = self._take_message_ids(state_key)
+            if message_ids:
+                batches.setdefault(gid, (bot, []))[1].extend(message_ids)
+        for gid, (bot, message_ids) in batches.items():
+            self._recall_messages(bot, gid, message_ids)
+
+    async def _log_recall(self, gid: int, futures: list):
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        failed = sum(1 for result in results if isinstance(result, BaseException))
+        if failed:
+            logger.warning(f"[刷屏禁言] 群 {gid} 撤回刷屏消息 {len(results)} 条，其中 {failed} 条失败（可能已超过撤回时限）")
+        else:
+            logger.info(f"[刷屏禁言] 群 {gid} 已撤回刷屏消息 {len(results)} 条")
+
+    async def _check_target(self, event: AstrMessageEvent, gid: int, uid: str, action: str = "禁言") -> Optional[Dict[str, Any]]:
+        """检查机器人是否有权限处罚该用户
+
+        返回:
+            用户的群成员信息；机器人权限不足、用户是群主/管理员或查询失败时返回 None
+        """
         # 检查机器人是否有权限
         try:
-            group_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(event.get_self_id()))
+            group_info = await self._get_member_info(event, gid, event.get_self_id())
             bot_role = group_info.get("role")
             if bot_role not in ["admin", "owner"]:
                 logger.warning(f"[刷屏禁言] 机器人在群 {gid} 没有管理员权限，无法禁言")
-                flood_state["delete"]()
-                return
+                return None
         except Exception as e:
             logger.error(f"[刷屏禁言] 检查机器人权限失败: {e}")
-            flood_state["delete"]()
-            return
+            return None
         
         # 检查用户角色
         try:
-            member_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(uid))
+            member_info = await self._get_member_info(event, gid, uid)
             user_role = member_info.get("role")
             if user_role == "owner":
-                logger.info(f"[刷屏禁言] 用户 {uid} 是群主，跳过禁言")
-                flood_state["delete"]()
-                return
+                logger.info(f"[刷屏禁言] 用户 {uid} 是群主，跳过{action}")
+                return None
             if user_role == "admin" and bot_role != "owner":
-                logger.info(f"[刷屏禁言] 用户 {uid} 是管理员，机器人不是群主，跳过禁言")
-                flood_state["delete"]()
-                return
+                logger.info(f"[刷屏禁言] 用户 {uid} 是管理员，机器人不是群主，跳过{action}")
+                return None
         except Exception as e:
             logger.error(f"[刷屏禁言] 检查用户角色失败: {e}")
-            flood_state["delete"]()
-            return
+            return None
         
-        # 获取群级别配置的禁言时间
-        mute_time = config.get("mute_time", self.mute_time)
+        return member_info
+
+    async def _record_offense(self, state_key: str) -> Tuple[int, float]:
+        """记录一次触发，返回 (累计次数, 衰减后的触发分数)
+
+        共享模式下次数和分数存放在共享存储中，否则由 offense_store 定时写回 KV；两种模式的分数衰减方式相同。
+        """
+        if self.state_backend.shared:
+            ttl = self.offense_expire_days * 86400
+            try:
+                count = int(await self.state_backend.incr(f"offense:{state_key}", 1, ttl, refresh=True))
+                score = await self.state_backend.incr_decayed(
+                    f"offense_score:{state_key}", 1, self.penalty_half_life_hours * 3600, ttl
+                )
+                return count, score
+            except Exception as e:
+                logger.error(f"[刷屏禁言] 访问共享状态失败，使用本地累计次数: {e}")
+        record = await self.offense_store.record(state_key, self.penalty_half_life_hours * 3600)
+        return record.count, record.score
+
+    def _decide_penalty(self, config: GroupConfig, count: int, score: float) -> Tuple[int, bool, str]:
+        """根据触发记录选择处罚
+
+        返回:
+            (禁言分钟数, 是否踢出, 附加在禁言提示后的说明)
+        """
+        ladder = config.penalty_ladder
+        if ladder is None:
+            kick = config.enable_kick and count >= config.kick_threshold
+            note = ""
+            if config.enable_kick:
+                note = f"\n\n你已触犯 {count} 次，如果次数达到 {config.kick_threshold} 次，你会被移出群。"
+            return config.mute_time, kick, note
         
-        # 执行禁言
-        try:
-            await event.bot.api.call_action(
-                "set_group_ban",
-                group_id=gid,
-                user_id=int(uid),
-                duration=mute_time * 60
-            )
-            logger.info(f"[刷屏禁言] 已禁言用户 {uid}，时长 {mute_time} 分钟")
-        except Exception as e:
-            logger.error(f"[刷屏禁言] 禁言失败: {e}")
-            flood_state["delete"]()
+        # 踢出一级同时按阶梯中最长的禁言时长禁言；本群关闭踢人时只禁言
+        mute_time, kick, level = ladder.decide(score, config.mute_time)
+        note = f"\n\n你已触犯 {count} 次，当前处罚等级 {level + 1}/{len(ladder)}（{ladder.describe()}），继续刷屏处罚将逐级加重。"
+        return mute_time, kick and config.enable_kick, note
+
+    async def _reset_offense(self, state_key: str) -> int:
+        """清除累计次数，返回原次数"""
+        old_count = await self.offense_store.reset(state_key)
+        if self.state_backend.shared:
+            try:
+                key = f"offense:{state_key}"
+                old_count = max(old_count, int(await self.state_backend.get(key)))
+                await self.state_backend.delete(key)
+                await self.state_backend.delete(f"offense_score:{state_key}")
+            except Exception as e:
+                logger.error(f"[刷屏禁言] 清除共享累计次数失败: {e}")
+        return old_count
+
+    def _handle_flooding(self, event: AstrMessageEvent, gid: int, uid: str, state_key: str, flood_state: FloodState, config: GroupConfig, template: MessageTemplate = None):
+        """处理刷屏事件：攻击模式下加入批量禁言队列，否则在后台任务中处罚，消息处理协程不等待
+
+        Args:
+            template: 禁言提示语模板，为空时使用 mute_message 配置
+        """
+        # 攻击模式下排队批量禁言
+        monitor = self.raid_monitors.get(gid)
+        if monitor and monitor.active:
+            try:
+                self._queue_raid_ban(event, gid, uid, config, monitor)
+            finally:
+                self._enter_cooldown(state_key)
+            return
+        self._start_enforcement(state_key, flood_state, self._punish_flooding(event, gid, uid, state_key, config, template))
+
+    async def _punish_flooding(self, event: AstrMessageEvent, gid: int, uid: str, state_key: str, config: GroupConfig, template: MessageTemplate = None):
+        """检查权限、记录触发次数并禁言，屡犯时登记踢人"""
+        # 检查机器人权限和用户角色
+        member_info = await self._check_target(event, gid, uid)
+        if member_info is None:
+            self._drop_flood_state(state_key)
+            return
+        
+        # 其他实例已处理
+        if not await self._claim("ban", gid, uid):
+            self._enter_cooldown(state_key)
             return
         
-        # 获取当前累计次数
-        current_offense_count = self.offense_counts.get(state_key, 0)
+        # 更新累计触发次数，并按触发记录选择禁言时长和是否踢出
+        new_offense_count, score = await self._record_offense(state_key)
+        mute_time, kick, note = self._decide_penalty(config, new_offense_count, score)
         
-        # 发送禁言消息
-        if self.mute_message:
+        # 执行禁言，随后撤回刷屏消息
+        self._submit_ban(event, gid, uid, mute_time)
+        logger.info(f"[刷屏禁言] 已禁言用户 {uid}，时长 {mute_time} 分钟")
+        self._recall_messages(event.bot, gid, self._take_message_ids(state_key))
+        
+        # 发送禁言消息，附加累计次数或处罚等级提示
+        template = template or self._templates["mute_message"]
+        if template:
             try:
-                at_user = f"[CQ:at,qq={uid}]"
                 nickname = member_info.get("card") or member_info.get("nickname") or uid
-                message = self.mute_message.format(
-                    at_user=at_user,
-                    nickname=nickname,
-                    mute_time=mute_time
-                )
-                
-                # 如果启用了累计踢人，添加累计次数提示
-                enable_kick = config.get("enable_kick", self.enable_kick_repeat_offender)
-                kick_threshold = config.get("kick_threshold", self.kick_threshold)
-                if enable_kick:
-                    message += f"\n\n你已触犯 {current_offense_count + 1} 次，如果次数达到 {kick_threshold} 次，你会被移出群。"
-                
-                await event.bot.api.call_action("send_group_msg", group_id=gid, message=message)
+                message = template.render(note, at_user=uid, nickname=nickname, mute_time=mute_time)
+                self.action_scheduler.submit(event.bot, "send_group_msg", gid, PRIORITY_MESSAGE, group_id=gid, message=message)
             except Exception as e:
                 logger.error(f"[刷屏禁言] 发送禁言消息失败: {e}")
         
-        # 更新累计触发次数
-        new_offense_count = current_offense_count + 1
-        self.offense_counts[state_key] = new_offense_count
+        # 检查是否需要踢人
+        if kick:
+            await self._kick_user(event, gid, uid, new_offense_count, config.kick_delay)
         
-        # 持久化存储累计次数
-        try:
-            await self.put_kv_data(state_key, new_offense_count)
-        except Exception as e:
-            logger.error(f"[刷屏禁言] 存储累计次数失败: {e}")
+        # 重置刷屏状态，保留累计次数但清空检测记录和重置处理标志
+        self._enter_cooldown(state_key)
+
+    def _get_content_table(self, gid: int) -> ContentTable:
+        """获取或创建群的重复内容检测表"""
+        table = self.content_tables.get(gid)
+        if table is None:
+            table = ContentTable(self.content_repeat_threshold, self.content_detection_period, self.content_min_length)
+            self.content_tables[gid] = table
+        return table
+
+    def _message_threshold(self, gid: int, config: GroupConfig) -> int:
+        """群当前生效的消息条数阈值：开启自适应且样本充足时按基线计算，否则使用 message_threshold"""
+        if config.adaptive_threshold:
+            baseline = self.traffic_baselines.get(gid)
+            if baseline is not None:
+                threshold = baseline.threshold(
+                    float(self.adaptive_headroom),
+                    int(self.adaptive_min_threshold),
+                    int(self.adaptive_max_threshold)
+                )
+                if threshold is not None:
+                    return threshold
+        return self.message_threshold
+
+    def _observe_traffic(self, gid: int, flood_state: FloodState, cost: float, now: float):
+        """更新用户的衰减消息计数并记录到群的发言速率基线，攻击模式期间不记录"""
+        flood_state.burst = decayed_burst(
+            flood_state.burst, now - flood_state.burst_at, self.detection_period,
+            min(cost, flood_state.detector.max_cost)
+        )
+        flood_state.burst_at = now
+        if gid in self._active_raids:
+            return
+        baseline = self.traffic_baselines.get(gid)
+        if baseline is None:
+            baseline = TrafficBaseline(self.adaptive_quantile, self.adaptive_window, self.detection_period)
+            self.traffic_baselines[gid] = baseline
+        baseline.observe(flood_state.burst)
+
+    def _match_keywords(self, gid: int, config: GroupConfig, text: str) -> Optional[str]:
+        """返回消息命中的违禁词或广告规则，没有命中时返回 None"""
+        if not text:
+            return None
+        if config.keywords:
+            key = 0 if config.keywords is self._default_group_config.keywords else gid
+            automaton = self.keyword_automatons.get(key)
+            if automaton is None:
+                automaton = KeywordAutomaton(config.keywords)
+                self.keyword_automatons[key] = automaton
+            elif automaton.source is not config.keywords:
+                automaton.sync(config.keywords)
+            keyword = automaton.search(normalize_keyword(text))
+            if keyword:
+                return keyword
+        if self._ad_pattern is not None:
+            match = self._ad_pattern.search(text[:MAX_TEXT_LENGTH].lower())
+            if match:
+                return f"{match.lastgroup}:{match.group()}"
+        return None
+
+    def _get_raid_monitor(self, gid: int) -> RaidMonitor:
+        """获取或创建群的攻击检测状态"""
+        monitor = self.raid_monitors.get(gid)
+        if monitor is None:
+            monitor = RaidMonitor(self.raid_message_threshold, self.raid_detection_period, self.raid_cooldown)
+            self.raid_monitors[gid] = monitor
+        return monitor
+
+    async def _enter_raid(self, event: AstrMessageEvent, gid: int, monitor: RaidMonitor):
+        """进入攻击模式"""
+        logger.warning(f"[刷屏禁言] 群 {gid} 检测到多人刷屏，进入攻击模式")
+        monitor.bot = event.bot
+        self._active_raids.add(gid)
         
-        # 检查是否需要踢人
-        enable_kick = config.get("enable_kick", self.enable_kick_repeat_offender)
-        kick_threshold = config.get("kick_threshold", self.kick_threshold)
-        kick_delay = config.get("kick_delay", self.kick_delay)
-        if enable_kick and new_offense_count >= kick_threshold:
-            await self._kick_user(event, gid, uid, new_offense_count, kick_delay)
-        
-        # 重置刷屏状态，保留累计次数但清空消息列表和重置处理标志
-        flood_state["messages"] = []
-        flood_state["is_handling_flood"] = False
-        if flood_state.get("timer") and not flood_state["timer"].cancelled():
-            flood_state["timer"].cancel()
-            flood_state["timer"] = None
-
-    async def _kick_user(self, event: AstrMessageEvent, gid: int, uid: str, count: int, kick_delay: int = None):
-        """踢出屡犯用户"""
+        # 全员禁言只由一个实例开启和解除；提交后不等待结果，消息处理不受发送队列限速影响
+        if self.raid_whole_ban and await self._claim("whole_ban", gid, ttl=max(self.raid_cooldown, self.claim_ttl)):
+            future = self.action_scheduler.submit(event.bot, "set_group_whole_ban", gid, PRIORITY_BAN, group_id=gid, enable=True)
+            future.add_done_callback(lambda f: self._on_whole_ban(f, event.bot, gid, monitor))
+
+    def _on_whole_ban(self, future: asyncio.Future, bot, gid: int, monitor: RaidMonitor):
+        """开启全员禁言的结果回调；攻击模式已先一步结束时立即解除"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"[刷屏禁言] 开启全员禁言失败: {error}")
+            return
+        if monitor.active:
+            monitor.whole_ban = True
+            logger.info(f"[刷屏禁言] 群 {gid} 已开启全员禁言")
+            return
+        self.action_scheduler.submit(bot, "set_group_whole_ban", gid, PRIORITY_BAN, group_id=gid, enable=False)
+        logger.info(f"[刷屏禁言] 群 {gid} 攻击模式已结束，解除刚开启的全员禁言")
+
+    async def _exit_raid(self, gid: int, monitor: RaidMonitor):
+        """退出攻击模式，解除由攻击模式开启的全员禁言"""
+        if monitor.whole_ban and monitor.bot is not None:
+            try:
+                await self.action_scheduler.submit(monitor.bot, "set_group_whole_ban", gid, PRIORITY_BAN, group_id=gid, enable=False)
+                logger.info(f"[刷屏禁言] 群 {gid} 已解除全员禁言")
+            except Exception as e:
+                logger.error(f"[刷屏禁言] 解除全员禁言失败: {e}")
+        monitor.exit()
+        logger.info(f"[刷屏禁言] 群 {gid} 已退出攻击模式")
+
+    def _queue_raid_ban(self, event: AstrMessageEvent, gid: int, uid: str, config: GroupConfig, monitor: RaidMonitor):
+        """攻击模式下将刷屏用户加入批量禁言队列，检测状态随后会被重置，要撤回的消息一并暂存"""
+        monitor.pending.setdefault(uid, []).extend(self._take_message_ids(f"{gid}:{uid}"))
+        if monitor.flush_task is None or monitor.flush_task.done():
+            monitor.flush_task = asyncio.create_task(self._flush_raid_bans(event, gid, config, monitor))
+
+    async def _flush_raid_bans(self, event: AstrMessageEvent, gid: int, config: GroupConfig, monitor: RaidMonitor):
+        """批量禁言攻击模式下累积的刷屏用户
+
+        处理一批时会等待接口调用，期间新加入队列的用户看到本任务仍在运行，不会另起任务，
+        因此循环处理直到队列为空。
+        """
+        await asyncio.sleep(self.raid_batch_interval)
+        while monitor.pending:
+            pending, monitor.pending = monitor.pending, {}
+            await self._ban_raid_batch(event, gid, config, pending)
+
+    async def _ban_raid_batch(self, event: AstrMessageEvent, gid: int, config: GroupConfig, pending: Dict[str, list]):
+        """禁言一批刷屏用户，并合并发送一条提示消息"""
+        # 提示消息中显示本批次最长的禁言时长
+        mute_time = 0
+        banned = []
+        kicked = []
+        for uid, message_ids in pending.items():
+            member_info = await self._check_target(event, gid, uid)
+            if member_info is None or not await self._claim("ban", gid, uid):
+                continue
+            
+            new_offense_count, score = await self._record_offense(f"{gid}:{uid}")
+            user_mute_time, kick, _ = self._decide_penalty(config, new_offense_count, score)
+            self._submit_ban(event, gid, uid, user_mute_time)
+            self._recall_messages(event.bot, gid, message_ids)
+            banned.append(uid)
+            mute_time = max(mute_time, user_mute_time)
+            if kick:
+                kicked.append((uid, new_offense_count))
+        
+        if not banned:
+            return
+        logger.info(f"[刷屏禁言] 群 {gid} 攻击模式批量禁言 {len(banned)} 人，时长最长 {mute_time} 分钟")
+        
+        # 合并发送一条提示消息
+        template = self._templates["raid_summary_message"]
+        if template:
+            try:
+                note = f"\n\n其中 {len(kicked)} 人累计触发次数过多，将被移出群。" if kicked else ""
+                message = template.render(note, count=len(banned), users=banned, mute_time=mute_time)
+                self.action_scheduler.submit(event.bot, "send_group_msg", gid, PRIORITY_MESSAGE, group_id=gid, message=message)
+            except Exception as e:
+                logger.error(f"[刷屏禁言] 发送攻击模式禁言消息失败: {e}")
+        
+        for uid, count in kicked:
+            await self._kick_user(event, gid, uid, count, config.kick_delay, announce=False)
+
+    async def _kick_user(self, event: AstrMessageEvent, gid: int, uid: str, count: int, kick_delay: int = None, announce: bool = True):
+        """踢出屡犯用户：发送提示后登记到踢人队列，延迟到期后由后台执行"""
         if kick_delay is None:
             kick_delay = self.kick_delay
         
         try:
             # 发送踢人消息
-            if self.kick_message:
-                at_user = f"[CQ:at,qq={uid}]"
-                message = self.kick_message.format(at_user=at_user, count=count)
-                await event.bot.api.call_action("send_group_msg", group_id=gid, message=message)
-            
-            # 延迟踢人
-            await asyncio.sleep(kick_delay)
+            template = self._templates["kick_message"]
+            if announce and template:
+                message = template.render(at_user=uid, count=count)
+                self.action_scheduler.submit(event.bot, "send_group_msg", gid, PRIORITY_MESSAGE, group_id=gid, message=message)
             
-            # 执行踢人
-            await event.bot.api.call_action(
+            # 登记延迟踢人
+            await self.kick_scheduler.schedule(gid, uid, count, kick_delay)
+        except Exception as e:
+            logger.error(f"[刷屏禁言] 踢人失败: {e}")
+
+    async def _execute_kick(self, gid: int, uid: str, count: int) -> bool:
+        """执行到期的踢人，机器人未连接时返回 False 稍后重试"""
+        bot = self._get_bot_client()
+        if bot is None:
+            return False
+        
+        try:
+            await self.action_scheduler.submit(
+                bot,
                 "set_group_kick",
+                gid,
+                PRIORITY_KICK,
                 group_id=gid,
                 user_id=int(uid),
                 reject_add_request=False
             )
-            
-            logger.info(f"[刷屏禁言] 已踢出用户 {uid}，累计触发 {count} 次")
-            
-            # 清除累计次数
-            state_key = f"{gid}:{uid}"
-            self.offense_counts.pop(state_key, None)
-            try:
-                await self.delete_kv_data(state_key)
-            except Exception as e:
-                logger.error(f"[刷屏禁言] 删除累计次数失败: {e}")
         except Exception as e:
             logger.error(f"[刷屏禁言] 踢人失败: {e}")
+            return True
+        
+        logger.info(f"[刷屏禁言] 已踢出用户 {uid}，累计触发 {count} 次")
+        self.metrics.record_kick(gid)
+        
+        # 清除累计次数
+        await self._reset_offense(f"{gid}:{uid}")
+        return True
+
+    def _get_bot_client(self):
+        """获取 aiocqhttp 机器人客户端，优先使用最近一次消息事件中的实例"""
+        if self._bot is not None:
+            return self._bot
+        try:
+            platform = self.context.get_platform(filter.PlatformAdapterType.AIOCQHTTP)
+            if platform is not None:
+                return platform.get_client()
+        except Exception as e:
+            logger.debug(f"[刷屏禁言] 获取 aiocqhttp 客户端失败: {e}")
+        return None
 
-    async def _reset_flood_state(self, state_key: str):
-        """重置刷屏状态"""
-        await asyncio.sleep(self.detection_period)
+    def _ensure_sweeper(self):
+        """确保窗口过期清理任务在运行"""
+        if self._sweeper_task is None or self._sweeper_task.done():
+            self._sweeper_task = asyncio.create_task(self._sweep_flood_states())
+
+    async def _sweep_flood_states(self):
+        """后台推进时间轮，批量清理过期的刷屏状态，并检查攻击模式是否可以退出"""
+        while True:
+            await asyncio.sleep(self.expiry_wheel.tick)
+            now = time.monotonic()
+            # 在冷却期结束、状态过期之前撤回冷却期内的消息
+            if self._cooldown_recalls:
+                self._flush_cooldown_recalls()
+            try:
+                for state_key in self.expiry_wheel.advance(now):
+                    self.flood_states.pop(state_key)
+            except Exception as e:
+                logger.error(f"[刷屏禁言] 清理刷屏状态失败: {e}")
+            
+            for gid in [gid for gid in self._active_raids if self.raid_monitors[gid].should_exit(now)]:
+                self._active_raids.discard(gid)
+                asyncio.create_task(self._exit_raid(gid, self.raid_monitors[gid]))
+
+    def _enter_cooldown(self, state_key: str):
+        """处罚完成后清空检测记录并进入冷却期，冷却期内该用户的消息直接丢弃
+
+        冷却期结束时状态过期；post_ban_cooldown 为 0 时立即重新开始统计。
+        """
         flood_state = self.flood_states.get(state_key)
-        if flood_state:
-            # 重置刷屏处理标志
-            flood_state["is_handling_flood"] = False
-            flood_state["delete"]()
-
-    def _get_flood_state(self, state_key: str) -> Dict[str, Any]:
-        """获取或创建用户的刷屏状态"""
-        if state_key not in self.flood_states:
-            self.flood_states[state_key] = {
-                "messages": [],
-                "timer": None,
-                "is_handling_flood": False,  # 标记是否正在处理刷屏禁言
-                "delete": lambda: self.flood_states.pop(state_key, None)
-            }
-        return self.flood_states[state_key]
+        if flood_state is not None:
+            now = time.monotonic()
+            if self.post_ban_cooldown > 0:
+                until = now + self.post_ban_cooldown
+                flood_state.enter_cooldown(until)
+                self.expiry_wheel.schedule(state_key, until)
+            else:
+                flood_state.enter_cooldown(0)
+                self.expiry_wheel.schedule(state_key, now + self.detection_period)
 
-    @filter.command("开启刷屏禁言")
-    async def enable_ban(self, event: AstrMessageEvent):
-        """开启刷屏禁言功能"""
-        if event.get_platform_name() != "aiocqhttp":
-            return
+    def _start_enforcement(self, state_key: str, flood_state: FloodState, coro):
+        """在后台任务中执行处罚
 
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
-            return
+        权限检查、累计次数读写和踢人登记都可能等待网络或存储，放到任务中执行，
+        消息处理协程只负责提交。处罚期间暂停窗口过期，任务结束后（包括异常退出）状态一定离开 ENFORCING。
+        """
+        self.expiry_wheel.cancel(state_key)
+        task = asyncio.create_task(coro)
+        self._enforcement_tasks.add(task)
+        task.add_done_callback(lambda task: self._on_enforcement_done(task, state_key, flood_state))
 
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
-            return
+    def _on_enforcement_done(self, task: asyncio.Task, state_key: str, flood_state: FloodState):
+        self._enforcement_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[刷屏禁言] 处罚用户失败（{state_key}）: {task.exception()}")
+        self._finish_enforcement(state_key, flood_state)
 
-        gid = raw.get("group_id")
+    def _finish_enforcement(self, state_key: str, flood_state: FloodState):
+        """处罚流程结束后仍处于 ENFORCING（处理中抛出异常）时进入冷却期
+
+        处罚可能已经提交，按已处罚处理；冷却期结束后状态照常过期，该用户的消息不会一直被丢弃。
+        """
+        if flood_state.phase == ENFORCING and self.flood_states.get(state_key) is flood_state:
+            self._enter_cooldown(state_key)
+
+    def _drop_flood_state(self, state_key: str):
+        """移除用户的刷屏状态"""
+        self._cooldown_recalls.pop(state_key, None)
+        self.expiry_wheel.cancel(state_key)
+        self.flood_states.pop(state_key)
+
+    def _get_flood_state(self, state_key: str, gid: int, config: GroupConfig, multiplier: float = 1.0) -> FloodState:
+        """获取或创建用户的刷屏状态，超出容量时淘汰最久未活跃的状态
+
+        群的消息条数阈值和信任用户的阈值倍数只在创建状态时生效。
+        """
+        flood_state = self.flood_states.touch(state_key)
+        if flood_state is None:
+            threshold = max(1, int(self._message_threshold(gid, config) * multiplier))
+            flood_state = FloodState(create_detector(self.detector_type, threshold, self.detection_period))
+            self.flood_states.add(state_key, flood_state)
+            while len(self.flood_states) > self.flood_states.max_size:
+                evicted = self.flood_states.evict_idle()
+                if evicted is None:
+                    break
+                self.expiry_wheel.cancel(evicted)
+        return flood_state
+
+    async def initialize(self):
+        """插件加载后恢复重启前未执行的踢人，并启动指标导出"""
+        await self.kick_scheduler.start()
+        if self.metrics_dump_path:
+            self._metrics_task = asyncio.create_task(self._dump_metrics_loop())
+
+    def _metrics_gauges(self) -> Dict[str, float]:
+        """各组件的当前状态，随指标一起导出"""
+        role_stats = self.role_cache.stats()
+        wheel_stats = self.expiry_wheel.stats()
+        return {
+            "flood_states": len(self.flood_states),
+            "pending_timers": wheel_stats["live"],
+            "timers_expired_last_tick": wheel_stats["last_expired"],
+            "timers_expired_total": wheel_stats["total_expired"],
+            "pending_kicks": len(self.kick_scheduler.pending),
+            "action_queue_pending": self.action_scheduler.pending,
+            "action_failed_total": self.action_scheduler.failed,
+            "action_retried_total": self.action_scheduler.retried,
+            "role_cache_hits_total": role_stats["hits"],
+            "role_cache_misses_total": role_stats["misses"],
+            "offense_dirty": self.offense_store.dirty,
+            "reputation_users": len(self.reputation),
+            "traffic_baselines": len(self.traffic_baselines),
+        }
+
+    def _dump_metrics(self):
+        try:
+            write_metrics_file(self.metrics_dump_path, self.metrics, self._metrics_gauges(), self.metrics_dump_format)
+        except Exception as e:
+            logger.error(f"[刷屏禁言] 导出运行指标失败: {e}")
+
+    async def _dump_metrics_loop(self):
+        """定时把运行指标写入 metrics_dump_path"""
+        while True:
+            await asyncio.sleep(max(1, self.metrics_dump_interval))
+            self._dump_metrics()
+
+    async def terminate(self):
+        """插件卸载时停止后台任务并退出攻击模式"""
+        if self._sweeper_task and not self._sweeper_task.done():
+            self._sweeper_task.cancel()
+        if self._metrics_task and not self._metrics_task.done():
+            self._metrics_task.cancel()
+            self._dump_metrics()
+        
+        # 解除由攻击模式开启的全员禁言
+        for gid in list(self._active_raids):
+            self._active_raids.discard(gid)
+            await self._exit_raid(gid, self.raid_monitors[gid])
+        
+        self._flush_config()
+        await self.kick_scheduler.stop()
+        await self.action_scheduler.stop()
+        await self.offense_store.stop()
+        await self.state_backend.close()
+
+    @group_admin_command("开启刷屏禁言")
+    async def enable_ban(self, event: AstrMessageEvent, ctx: CommandContext):
+        """开启刷屏禁言功能"""
+        gid = ctx.gid
         gid_str = str(gid)
         
         # 检查是否已经开启
-        if gid_str in self.enabled_groups:
+        if self._is_group_enabled(gid):
             yield event.plain_result("已经开启啦")
             return
         
-        # 添加到启用列表
-        if gid_str not in self.enabled_groups:
+        # 从关闭列表中移除；只对指定群生效时添加到启用列表
+        if gid_str in self.disabled_groups:
+            self.disabled_groups.remove(gid_str)
+        if not self._all_groups_enabled and gid_str not in self.enabled_groups:
             self.enabled_groups.append(gid_str)
         
         self._save_config()
@@ -531,55 +1617,31 @@ class BanFloodingTheScreenPlugin(Star):
         logger.info(f"[刷屏禁言] 群 {gid} 已开启刷屏禁言")
         yield event.plain_result("已开启刷屏禁言功能")
 
-    @filter.command("关闭刷屏禁言")
-    async def disable_ban(self, event: AstrMessageEvent):
+    @group_admin_command("关闭刷屏禁言")
+    async def disable_ban(self, event: AstrMessageEvent, ctx: CommandContext):
         """关闭刷屏禁言功能"""
-        if event.get_platform_name() != "aiocqhttp":
-            return
-
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
-            return
-
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
-            return
-
-        gid = raw.get("group_id")
+        gid = ctx.gid
         gid_str = str(gid)
         
-        # 从启用列表中移除
+        # 只对启用群列表生效时固定为 listed，关闭最后一个群后列表为空也不会变成对所有群生效
+        if not self._all_groups_enabled:
+            self.group_scope = "listed"
+        
+        # 从启用列表中移除，并加入关闭列表（对所有群生效时以关闭列表为准）
         if gid_str in self.enabled_groups:
             self.enabled_groups.remove(gid_str)
+        if gid_str not in self.disabled_groups:
+            self.disabled_groups.append(gid_str)
         
         self._save_config()
 
         logger.info(f"[刷屏禁言] 群 {gid} 已关闭刷屏禁言")
         yield event.plain_result("已关闭刷屏禁言功能")
 
-    @filter.command("设置刷屏禁言时间")
-    async def set_mute_time(self, event: AstrMessageEvent):
+    @group_admin_command("设置刷屏禁言时间")
+    async def set_mute_time(self, event: AstrMessageEvent, ctx: CommandContext):
         """设置刷屏禁言时间"""
-        if event.get_platform_name() != "aiocqhttp":
-            return
-
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
-            return
-
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
-            return
-
-        # 提取时间参数
-        message_str = event.message_str.strip()
-        # 移除命令部分
-        time_str = message_str.replace("设置刷屏禁言时间", "").strip()
-        
+        time_str = ctx.args
         if not time_str:
             yield event.plain_result("请指定禁言时间，例如：/设置刷屏禁言时间 10分钟")
             return
@@ -594,87 +1656,76 @@ class BanFloodingTheScreenPlugin(Star):
             yield event.plain_result("秒单位不支持，请使用分钟、小时或天")
             return
 
-        gid = raw.get("group_id")
-        self._update_group_config(gid, {"mute_time": mute_time})
+        self._update_group_config(ctx.gid, {"mute_time": mute_time})
         self._save_config()
 
-        logger.info(f"[刷屏禁言] 群 {gid} 禁言时间已设置为 {mute_time} 分钟")
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 禁言时间已设置为 {mute_time} 分钟")
         yield event.plain_result(f"禁言时间已设置为 {mute_time} 分钟")
 
-    @filter.command("开启刷屏踢人")
-    async def enable_kick(self, event: AstrMessageEvent):
-        """开启刷屏踢人功能"""
-        if event.get_platform_name() != "aiocqhttp":
-            return
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("设置刷屏提示语")
+    async def set_template(self, event: AstrMessageEvent):
+        """设置提示语模板（全局生效，仅限机器人管理员），模板无效时不保存"""
+        names = {
+            "禁言": "mute_message",
+            "踢人": "kick_message",
+            "超长消息": "long_message_mute_message",
+            "攻击模式": "raid_summary_message",
+            "@刷屏": "mention_mute_message",
+            "违禁词": "keyword_mute_message",
+        }
+        usage = "用法：/设置刷屏提示语 <类型> <模板>，类型可选：" + "、".join(names)
 
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
+        args = event.message_str.strip().replace("设置刷屏提示语", "", 1).strip()
+        kind, _, source = args.partition(" ")
+        name = names.get(kind)
+        source = source.strip()
+        if name is None or not source:
+            yield event.plain_result(usage)
             return
 
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
+        fields = TEMPLATE_FIELDS[name]
+        try:
+            MessageTemplate.compile(source, fields)
+        except ValueError as e:
+            yield event.plain_result(f"提示语无效，未保存：{e}")
             return
 
-        gid = raw.get("group_id")
-        self._update_group_config(gid, {"enable_kick": True})
+        setattr(self, name, source)
         self._save_config()
 
-        logger.info(f"[刷屏禁言] 群 {gid} 已开启刷屏踢人")
-        yield event.plain_result("已开启刷屏踢人功能")
+        logger.info(f"[刷屏禁言] {kind}提示语已设置为: {source}")
+        yield event.plain_result(f"{kind}提示语已更新，可用变量：" + "、".join(f"{{{field}}}" for field in fields))
 
-    @filter.command("关闭刷屏踢人")
-    async def disable_kick(self, event: AstrMessageEvent):
-        """关闭刷屏踢人功能"""
-        if event.get_platform_name() != "aiocqhttp":
-            return
-
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
-            return
+    @group_admin_command("开启刷屏踢人")
+    async def enable_kick(self, event: AstrMessageEvent, ctx: CommandContext):
+        """开启刷屏踢人功能"""
+        self._update_group_config(ctx.gid, {"enable_kick": True})
+        self._save_config()
 
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
-            return
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 已开启刷屏踢人")
+        yield event.plain_result("已开启刷屏踢人功能")
 
-        gid = raw.get("group_id")
-        config = self._get_group_config(gid)
+    @group_admin_command("关闭刷屏踢人")
+    async def disable_kick(self, event: AstrMessageEvent, ctx: CommandContext):
+        """关闭刷屏踢人功能"""
+        config = self._get_group_config(ctx.gid)
         
         # 检查是否已经关闭
-        if not config.get("enable_kick", False):
+        if not config.enable_kick:
             yield event.plain_result("已经关闭啦")
             return
         
-        self._update_group_config(gid, {"enable_kick": False})
+        self._update_group_config(ctx.gid, {"enable_kick": False})
         self._save_config()
 
-        logger.info(f"[刷屏禁言] 群 {gid} 已关闭刷屏踢人")
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 已关闭刷屏踢人")
         yield event.plain_result("已关闭刷屏踢人功能")
 
-    @filter.command("设置刷屏踢人次数")
-    async def set_kick_threshold(self, event: AstrMessageEvent):
+    @group_admin_command("设置刷屏踢人次数")
+    async def set_kick_threshold(self, event: AstrMessageEvent, ctx: CommandContext):
         """设置刷屏踢人次数"""
-        if event.get_platform_name() != "aiocqhttp":
-            return
-
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
-            return
-
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
-            return
-
-        # 提取次数参数
-        message_str = event.message_str.strip()
-        # 移除命令部分
-        count_str = message_str.replace("设置刷屏踢人次数", "").strip()
-        
+        count_str = ctx.args
         if not count_str:
             yield event.plain_result("请指定踢人次数，例如：/设置刷屏踢人次数 5")
             return
@@ -689,31 +1740,236 @@ class BanFloodingTheScreenPlugin(Star):
             yield event.plain_result("次数格式错误，请输入数字")
             return
 
-        gid = raw.get("group_id")
-        self._update_group_config(gid, {"kick_threshold": count})
+        self._update_group_config(ctx.gid, {"kick_threshold": count})
         self._save_config()
 
-        logger.info(f"[刷屏禁言] 群 {gid} 踢人次数已设置为 {count} 次")
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 踢人次数已设置为 {count} 次")
         yield event.plain_result(f"踢人次数已设置为 {count} 次")
 
-    @filter.command("重置刷屏次数")
-    async def reset_offense_count(self, event: AstrMessageEvent):
-        """重置用户的刷屏累计次数"""
-        if event.get_platform_name() != "aiocqhttp":
+    @group_admin_command("刷屏设置")
+    async def set_group_settings(self, event: AstrMessageEvent, ctx: CommandContext):
+        """一次修改当前群的多项设置"""
+        if not ctx.args:
+            yield event.plain_result(
+                "用法：/刷屏设置 名称=值 [名称=值 ...]，例如：/刷屏设置 禁言时间=10分钟 踢人=开 踢人次数=5\n"
+                "可修改：" + "、".join(GROUP_SETTINGS) + "\n开销权重、处罚阶梯填写\"默认\"时使用全局设置"
+            )
             return
 
-        raw = event.message_obj.raw_message
-        if raw.get("post_type") != "message" or raw.get("message_type") != "group":
+        try:
+            updates = parse_group_settings(ctx.args)
+        except ValueError as e:
+            yield event.plain_result(f"设置无效，未做任何修改：\n{e}")
             return
 
-        # 检查权限
-        has_permission, error_msg = await self._check_permission(event)
-        if not has_permission:
-            yield event.plain_result(error_msg)
+        self._update_group_config(ctx.gid, updates)
+        self._save_config()
+
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 设置已更新: {updates}")
+        lines = ["设置已更新，当前生效配置："]
+        lines.extend(describe_group_config(self._get_group_config(ctx.gid)))
+        yield event.plain_result("\n".join(lines))
+
+    @group_admin_command("刷屏配置")
+    async def show_group_config(self, event: AstrMessageEvent, ctx: CommandContext):
+        """查看当前群生效的刷屏禁言配置"""
+        gid = ctx.gid
+        config = self._get_group_config(gid)
+        source = "本群单独配置" if gid in self._group_config_index else "全局默认配置"
+        lines = [
+            f"本群刷屏禁言：{'开启' if self._is_group_enabled(gid) else '关闭'}（{source}）",
+            f"检测：{self.detection_period} 秒内 {self._message_threshold(gid, config)} 条"
+            f"（{self.detector_type}{'，自适应' if config.adaptive_threshold else ''}）",
+        ]
+        lines.extend(describe_group_config(config))
+        if self.enable_content_detection:
+            lines.append(f"重复内容：{self.content_detection_period} 秒内 {self.content_repeat_threshold} 次")
+        if self.enable_mention_detection:
+            lines.append(f"@刷屏：{self.mention_detection_period} 秒内 {self.mention_threshold} 个 @")
+        if self.enable_raid_mode:
+            lines.append(f"攻击模式：{self.raid_detection_period} 秒内全群 {self.raid_message_threshold} 条")
+        yield event.plain_result("\n".join(lines))
+
+    @group_admin_command("刷屏阈值")
+    async def show_adaptive_threshold(self, event: AstrMessageEvent, ctx: CommandContext):
+        """查看当前群生效的消息条数阈值和发言速率基线"""
+        config = self._get_group_config(ctx.gid)
+        threshold = self._message_threshold(ctx.gid, config)
+        if not config.adaptive_threshold:
+            yield event.plain_result(
+                f"本群刷屏阈值：{self.detection_period} 秒内 {threshold} 条（固定）\n"
+                "未开启自适应阈值，可使用 /刷屏设置 自适应阈值=开 开启"
+            )
+            return
+
+        baseline = self.traffic_baselines.get(ctx.gid)
+        stats = baseline.stats() if baseline is not None else None
+        tail = stats["tail"] if stats else None
+        source = "自适应" if tail is not None else "样本不足，暂用固定阈值"
+        lines = [f"本群刷屏阈值：{self.detection_period} 秒内 {threshold} 条（{source}）"]
+        if stats:
+            lines.append(f"已统计 {stats['samples']} 条消息，发言者的平均速度 {stats['rate']:.2f} 条/秒")
+            lines.append(f"每人 {self.detection_period} 秒内的消息开销：平均 {stats['mean']:.2f}" + (
+                f"，{self.adaptive_quantile:.0%} 分位 {tail:.2f}" if tail is not None else ""
+            ))
+        else:
+            lines.append("暂无统计数据")
+        lines.append(
+            f"计算方式：分位数 + {float(self.adaptive_headroom):g} ×（分位数 - 平均值），"
+            f"限制在 {self.adaptive_min_threshold}~{self.adaptive_max_threshold} 条，"
+            f"每轮至少 {TrafficBaseline.MIN_SAMPLES} 条消息"
+        )
+        yield event.plain_result("\n".join(lines))
+
+    def _command_targets(self, ctx: CommandContext, args) -> list:
+        """命令中 @ 的用户，没有 @ 时使用参数中的 QQ 号"""
+        targets = []
+        for seg in ctx.raw.get("message", []):
+            if isinstance(seg, dict) and seg.get("type") == "at":
+                qq = str(seg.get("data", {}).get("qq"))
+                if qq.isdigit() and int(qq) not in targets:
+                    targets.append(int(qq))
+        if not targets:
+            targets = [int(arg) for arg in args if arg.isdigit() and len(arg) >= 5]
+        return targets
+
+    def _group_config_entry(self, gid: int) -> Dict[str, Any]:
+        """群单独配置的原始数据，没有时返回空字典"""
+        gid_str = str(gid)
+        for config in self.group_configs if isinstance(self.group_configs, list) else []:
+            if config.get("group_id") == gid_str:
+                return config
+        return {}
+
+    @group_admin_command("刷屏白名单")
+    async def manage_whitelist(self, event: AstrMessageEvent, ctx: CommandContext):
+        """管理本群白名单，白名单用户不做任何检测"""
+        args = ctx.args.split()
+        action = args[0] if args else ""
+        try:
+            whitelist = set(parse_uid_set(self._group_config_entry(ctx.gid).get("whitelist_users")))
+        except ValueError:
+            whitelist = set()
+
+        if action not in ("添加", "删除"):
+            global_count = len(self._default_group_config.trust.whitelist)
+            members = "、".join(str(uid) for uid in sorted(whitelist)) or "无"
+            yield event.plain_result(
+                f"本群白名单：{members}\n全局白名单：{global_count} 人\n"
+                "用法：/刷屏白名单 添加 @用户 或 /刷屏白名单 删除 @用户，也可以直接填写 QQ 号"
+            )
+            return
+
+        targets = self._command_targets(ctx, args[1:])
+        if not targets:
+            yield event.plain_result(f"请@要{action}的用户，例如：/刷屏白名单 {action} @用户")
+            return
+
+        if action == "添加":
+            whitelist.update(targets)
+        else:
+            whitelist.difference_update(targets)
+        self._update_group_config(ctx.gid, {"whitelist_users": ",".join(str(uid) for uid in sorted(whitelist))})
+        self._save_config()
+
+        # 加入白名单的用户不再检测，清除已有的检测状态
+        if action == "添加":
+            for uid in targets:
+                self._drop_flood_state(f"{ctx.gid}:{uid}")
+
+        names = "、".join(str(uid) for uid in targets)
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 白名单已{action}: {names}")
+        yield event.plain_result(f"已{action}白名单：{names}")
+
+    @group_admin_command("刷屏关键词")
+    async def manage_keywords(self, event: AstrMessageEvent, ctx: CommandContext):
+        """管理本群违禁词，修改后只增量更新本群的自动机"""
+        args = ctx.args.split()
+        action = args[0] if args else ""
+        keywords = set(parse_keywords(self._group_config_entry(ctx.gid).get("blocked_keywords")))
+        config = self._get_group_config(ctx.gid)
+
+        if action not in ("添加", "删除"):
+            global_count = len(self._default_group_config.keywords)
+            lines = [
+                f"本群违禁词：{'、'.join(sorted(keywords)) or '无'}",
+                f"全局违禁词：{global_count} 个，内置广告规则：{self.ad_patterns or '未启用'}",
+                "用法：/刷屏关键词 添加 词1 词2 或 /刷屏关键词 删除 词1，匹配时忽略大小写、空白和标点",
+            ]
+            if not config.keyword_filter:
+                lines.append("本群未开启违禁词检测，可使用 /刷屏设置 关键词检测=开 开启")
+            yield event.plain_result("\n".join(lines))
+            return
+
+        terms = parse_keywords(args[1:])
+        if not terms:
+            yield event.plain_result(f"请填写要{action}的违禁词，例如：/刷屏关键词 {action} 加群")
+            return
+
+        changed = terms - keywords if action == "添加" else terms & keywords
+        if not changed:
+            yield event.plain_result(f"本群违禁词{'已包含' if action == '添加' else '中没有'}：{'、'.join(sorted(terms))}")
+            return
+        if action == "添加":
+            keywords.update(changed)
+        else:
+            keywords.difference_update(changed)
+        self._update_group_config(ctx.gid, {"blocked_keywords": ",".join(sorted(keywords))})
+        self._save_config()
+
+        names = "、".join(sorted(changed))
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 违禁词已{action}: {names}")
+        reply = f"已{action}违禁词：{names}"
+        if not self._get_group_config(ctx.gid).keyword_filter:
+            reply += "\n本群未开启违禁词检测，可使用 /刷屏设置 关键词检测=开 开启"
+        yield event.plain_result(reply)
+
+    @group_admin_command("刷屏信任")
+    async def set_trusted_user(self, event: AstrMessageEvent, ctx: CommandContext):
+        """设置本群信任用户的阈值倍数，倍数为 1 时取消信任"""
+        args = ctx.args.split()
+        try:
+            trusted = parse_trust_map(self._group_config_entry(ctx.gid).get("trusted_users"))
+        except ValueError:
+            trusted = {}
+
+        targets = self._command_targets(ctx, args[:-1])
+        if not args or not targets:
+            members = "、".join(f"{uid}（{multiplier:g} 倍）" for uid, multiplier in trusted.items()) or "无"
+            yield event.plain_result(
+                f"本群信任用户：{members}\n"
+                "用法：/刷屏信任 @用户 倍数，例如 /刷屏信任 @用户 2 表示该用户的检测阈值放宽到 2 倍，倍数为 1 时取消信任"
+            )
             return
 
+        try:
+            multiplier = parse_multiplier(args[-1])
+        except ValueError as e:
+            yield event.plain_result(str(e))
+            return
+
+        for uid in targets:
+            if multiplier == 1.0:
+                trusted.pop(uid, None)
+            else:
+                trusted[uid] = multiplier
+            # 阈值在创建检测状态时确定，清除已有状态使新倍数立即生效
+            self._drop_flood_state(f"{ctx.gid}:{uid}")
+        self._update_group_config(ctx.gid, {"trusted_users": format_trust_map(trusted)})
+        self._save_config()
+
+        names = "、".join(str(uid) for uid in targets)
+        logger.info(f"[刷屏禁言] 群 {ctx.gid} 信任用户 {names} 的阈值倍数已设置为 {multiplier:g}")
+        if multiplier == 1.0:
+            yield event.plain_result(f"已取消信任：{names}")
+        else:
+            yield event.plain_result(f"已将 {names} 的检测阈值放宽到 {multiplier:g} 倍")
+
+    @group_admin_command("重置刷屏次数")
+    async def reset_offense_count(self, event: AstrMessageEvent, ctx: CommandContext):
+        """重置用户的刷屏累计次数"""
         # 解析消息中的@用户 - 使用更可靠的方法
-        message = raw.get("message", [])
+        message = ctx.raw.get("message", [])
         target_uid = None
         
         # 方法1: 从消息段中查找at类型的消息段
@@ -724,7 +1980,7 @@ class BanFloodingTheScreenPlugin(Star):
         
         # 方法2: 如果方法1失败，尝试从原始消息字符串中提取
         if not target_uid:
-            message_raw = str(event.message_obj.raw_message.get("message", ""))
+            message_raw = str(ctx.raw.get("message", ""))
             match = re.search(r'\[CQ:at,qq=(\d+)\]', message_raw)
             if match:
                 target_uid = match.group(1)
@@ -733,24 +1989,67 @@ class BanFloodingTheScreenPlugin(Star):
             yield event.plain_result("请@要重置次数的用户，例如：/重置刷屏次数 @用户")
             return
 
-        gid = raw.get("group_id")
+        gid = ctx.gid
         state_key = f"{gid}:{target_uid}"
         
-        # 清除内存中的累计次数
-        old_count = self.offense_counts.pop(state_key, 0)
+        # 清除累计次数（持久化存储由 offense_store 写回时删除）
+        old_count = await self._reset_offense(state_key)
         
-        # 清除持久化存储
-        try:
-            await self.delete_kv_data(state_key)
-        except Exception as e:
-            logger.error(f"[刷屏禁言] 删除累计次数失败: {e}")
+        # 取消尚未执行的踢人
+        kick_cancelled = await self.kick_scheduler.cancel(gid, target_uid)
+        kick_note = "，并已取消待执行的踢人" if kick_cancelled else ""
         
-        logger.info(f"[刷屏禁言] 已重置用户 {target_uid} 的刷屏累计次数（原次数: {old_count}）")
+        logger.info(f"[刷屏禁言] 已重置用户 {target_uid} 的刷屏累计次数（原次数: {old_count}）{kick_note}")
         
         # 获取用户信息
         try:
-            member_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(target_uid))
+            member_info = await self._get_member_info(event, gid, target_uid)
             nickname = member_info.get("card") or member_info.get("nickname") or target_uid
-            yield event.plain_result(f"已重置用户 {nickname}({target_uid}) 的刷屏累计次数（原次数: {old_count}）")
+            yield event.plain_result(f"已重置用户 {nickname}({target_uid}) 的刷屏累计次数（原次数: {old_count}）{kick_note}")
         except Exception:
-            yield event.plain_result(f"已重置用户 {target_uid} 的刷屏累计次数（原次数: {old_count}）")
+            yield event.plain_result(f"已重置用户 {target_uid} 的刷屏累计次数（原次数: {old_count}）{kick_note}")
+
+    @group_admin_command("刷屏缓存统计")
+    async def role_cache_stats(self, event: AstrMessageEvent, ctx: CommandContext):
+        """查看群成员信息缓存的命中统计和刷屏状态占用"""
+        stats = self.role_cache.stats()
+        flood_stats = self.flood_states.stats()
+        wheel_stats = self.expiry_wheel.stats()
+        yield event.plain_result(
+            "成员信息缓存统计：\n"
+            f"缓存条目：{stats['size']}/{stats['maxsize']}（有效期 {stats['ttl']} 秒）\n"
+            f"命中：{stats['hits']} 次，未命中：{stats['misses']} 次，命中率：{stats['hit_rate']:.1%}\n"
+            f"淘汰：{stats['evictions']} 次，失效：{stats['invalidations']} 次\n\n"
+            "刷屏状态统计：\n"
+            f"跟踪用户：{flood_stats['size']}/{flood_stats['max_size']}\n"
+            f"淘汰：{flood_stats['evictions']} 次，占用内存约 {flood_stats['footprint'] / 1024:.1f} KB\n"
+            f"检测窗口：{wheel_stats['live']} 个，上次清理过期 {wheel_stats['last_expired']} 个，累计过期 {wheel_stats['total_expired']} 个"
+        )
+
+    @group_admin_command("刷屏统计")
+    async def plugin_stats(self, event: AstrMessageEvent, ctx: CommandContext):
+        """查看插件运行指标"""
+        gid = ctx.gid
+        metrics = self.metrics
+        messages = metrics.messages
+        gauges = self._metrics_gauges()
+        lookups = gauges["role_cache_hits_total"] + gauges["role_cache_misses_total"]
+        hit_rate = gauges["role_cache_hits_total"] / lookups if lookups else 0.0
+
+        lines = [
+            "刷屏禁言运行统计：",
+            f"处理消息：{messages.count} 条，耗时 p50 ≤{messages.quantile(0.5) * 1000:g} ms，p99 ≤{messages.quantile(0.99) * 1000:g} ms",
+            f"本群禁言：{metrics.bans.get(gid, 0)} 次，踢人：{metrics.kicks.get(gid, 0)} 次",
+            f"全部禁言：{sum(metrics.bans.values())} 次，踢人：{sum(metrics.kicks.values())} 次",
+            f"跟踪用户：{gauges['flood_states']}，检测窗口：{gauges['pending_timers']}，待踢人：{gauges['pending_kicks']}",
+            f"发送队列：排队 {gauges['action_queue_pending']}，重试 {gauges['action_retried_total']} 次，失败 {gauges['action_failed_total']} 次",
+            f"成员信息缓存命中率：{hit_rate:.1%}",
+        ]
+        if metrics.actions:
+            lines.append("\n接口调用：")
+            for action, histogram in sorted(metrics.actions.items()):
+                errors = metrics.action_errors.get(action, 0)
+                lines.append(
+                    f"{action}：{histogram.count} 次，p99 ≤{histogram.quantile(0.99) * 1000:g} ms，出错 {errors} 次"
+                )
+        yield event.plain_result("\n".join(lines))
@@ -0,0 +1,102 @@
+from typing import Any, Dict, Tuple
+
+# 可配置的权重项及默认值
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "char": 0.002,    # 每个文字
+    "line": 0.2,      # 每个换行
+    "image": 0.5,     # 每张图片/表情包
+    "face": 0.2,      # 每个 QQ 表情
+    "at": 0.2,        # 每个 @
+    "forward": 2.0,   # 每条合并转发
+    "card": 1.0,      # 每张 json/xml 卡片
+}
+
+# 消息段类型 -> 权重项
+_SEGMENT_WEIGHT_KEYS = {
+    "image": "image",
+    "mface": "image",
+    "face": "face",
+    "at": "at",
+    "forward": "forward",
+    "node": "forward",
+    "json": "card",
+    "xml": "card",
+}
+
+
+class MessageCostModel:
+    """消息开销模型
+
+    每条消息的基础开销为 1，再按消息段类型累加权重：
+    文字按字数和换行数计，图片、表情、@、合并转发、卡片按个数计。
+    刷屏检测按开销而不是条数消耗额度，纯文本短消息的开销约等于 1。
+    """
+
+    __slots__ = ("weights", "char", "line", "_segment_weights")
+
+    def __init__(self, weights: Dict[str, float] = None):
+        merged = dict(DEFAULT_WEIGHTS)
+        if weights:
+            merged.update(weights)
+        self.weights = {key: float(value) for key, value in merged.items()}
+        self.char = self.weights["char"]
+        self.line = self.weights["line"]
+        # 消息段类型 -> 权重，遍历时直接查表
+        self._segment_weights = {
+            seg_type: self.weights[key] for seg_type, key in _SEGMENT_WEIGHT_KEYS.items()
+        }
+
+    @classmethod
+    def parse(cls, spec: str) -> "MessageCostModel":
+        """从 "image=1,face=0.5" 形式的字符串解析权重，未列出的项使用默认值
+
+        格式错误或包含未知项时抛出 ValueError。
+        """
+        weights: Dict[str, float] = {}
+        for item in (spec or "").replace("，", ",").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            key, sep, value = item.partition("=")
+            key = key.strip()
+            if not sep or key not in DEFAULT_WEIGHTS:
+                raise ValueError(f"无效的开销权重项: {item}")
+            weight = float(value)
+            if weight < 0:
+                raise ValueError(f"开销权重不能为负数: {item}")
+            weights[key] = weight
+        return cls(weights)
+
+    def measure(self, segments: Any) -> Tuple[float, int, int, int, bool]:
+        """单次遍历消息段，计算开销
+
+        返回:
+            (开销, 文字数, 换行数, @ 个数, 是否 @全体成员)
+        """
+        if isinstance(segments, str):
+            return (1.0 + len(segments) * self.char + segments.count("\n") * self.line,
+                    len(segments), segments.count("\n"), 0, False)
+
+        segment_weights = self._segment_weights
+        cost = 1.0
+        text_length = 0
+        line_count = 0
+        at_count = 0
+        at_all = False
+        for seg in segments or ():
+            seg_type = seg.get("type")
+            if seg_type == "text":
+                text = seg.get("data", {}).get("text", "")
+                text_length += len(text)
+                line_count += text.count("\n")
+                continue
+            if seg_type == "at":
+                at_count += 1
+                if str(seg.get("data", {}).get("qq")) == "all":
+                    at_all = True
+            cost += segment_weights.get(seg_type, 0.0)
+        cost += text_length * self.char + line_count * self.line
+        return cost, text_length, line_count, at_count, at_all
+
+
+DEFAULT_COST_MODEL = MessageCostModel()
@@ -0,0 +1,143 @@
+import json
+import os
+from bisect import bisect_left
+from typing import Any, Dict, Tuple
+
+# 延迟直方图的桶上限（秒），覆盖 0.1 毫秒到 5 秒
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+METRIC_PREFIX = "ban_flooding"
+
+
+class Histogram:
+    """固定分桶的延迟直方图
+
+    桶在创建时一次性分配，observe 只做一次二分查找和几次整数加法，不分配新对象。
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        # 最后一个桶存放超过最大上限的值
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数，返回所在桶的上限；超过最大上限时返回最大上限"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return self.bounds[min(index, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class PluginMetrics:
+    """插件运行指标
+
+    - 消息处理延迟、每种 OneBot 接口的调用延迟（直方图）
+    - 每种接口的调用失败次数
+    - 每个群的禁言、踢人次数
+
+    缓存命中率、刷屏状态数等由各组件自己统计，导出时作为 gauges 传入。
+    """
+
+    def __init__(self):
+        self.messages = Histogram()
+        # 每种接口一个直方图，首次调用该接口时创建
+        self.actions: Dict[str, Histogram] = {}
+        self.action_errors: Dict[str, int] = {}
+        self.bans: Dict[int, int] = {}
+        self.kicks: Dict[int, int] = {}
+
+    def observe_action(self, action: str, seconds: float, error: bool = False):
+        histogram = self.actions.get(action)
+        if histogram is None:
+            histogram = self.actions[action] = Histogram()
+        histogram.observe(seconds)
+        if error:
+            self.action_errors[action] = self.action_errors.get(action, 0) + 1
+
+    def record_ban(self, gid: int):
+        self.bans[gid] = self.bans.get(gid, 0) + 1
+
+    def record_kick(self, gid: int):
+        self.kicks[gid] = self.kicks.get(gid, 0) + 1
+
+    def to_dict(self, gauges: Dict[str, float] = None) -> Dict[str, Any]:
+        return {
+            "messages": self.messages.to_dict(),
+            "actions": {action: histogram.to_dict() for action, histogram in self.actions.items()},
+            "action_errors": dict(self.action_errors),
+            "bans": {str(gid): count for gid, count in self.bans.items()},
+            "kicks": {str(gid): count for gid, count in self.kicks.items()},
+            "gauges": dict(gauges or {}),
+        }
+
+    def render_prometheus(self, gauges: Dict[str, float] = None) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        _render_histogram(lines, f"{METRIC_PREFIX}_message_seconds", "消息处理耗时", {"": self.messages}, None)
+        _render_histogram(lines, f"{METRIC_PREFIX}_action_seconds", "OneBot 接口调用耗时", self.actions, "action")
+        _render_counter(lines, f"{METRIC_PREFIX}_action_errors_total", "OneBot 接口调用失败次数", self.action_errors, "action")
+        _render_counter(lines, f"{METRIC_PREFIX}_bans_total", "禁言次数", self.bans, "group_id")
+        _render_counter(lines, f"{METRIC_PREFIX}_kicks_total", "踢人次数", self.kicks, "group_id")
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines: list, name: str, help_text: str, histograms: Dict[str, Histogram], label: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in histograms.items():
+        prefix = f'{label}="{key}",' if label else ""
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        labels = f"{{{prefix.rstrip(',')}}}" if label else ""
+        lines.append(f"{name}_sum{labels} {histogram.total}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+
+def _render_counter(lines: list, name: str, help_text: str, values: Dict[Any, int], label: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in values.items():
+        lines.append(f'{name}{{{label}="{key}"}} {value}')
+
+
+def write_metrics_file(path: str, metrics: PluginMetrics, gauges: Dict[str, float], fmt: str = "prometheus"):
+    """把指标写入文件，先写临时文件再替换，读取方不会读到写了一半的内容"""
+    if fmt == "json":
+        content = json.dumps(metrics.to_dict(gauges), ensure_ascii=False, indent=2)
+    else:
+        content = metrics.render_prometheus(gauges)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
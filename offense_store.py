@@ -0,0 +1,228 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from astrbot.api import logger
+
+
+# 每个用户保留的最近触发时间数量
+HISTORY_SIZE = 16
+
+
+class OffenseRecord:
+    """单个用户的累计触发记录"""
+
+    __slots__ = ("count", "last", "score", "history")
+
+    def __init__(self, count: int = 0, last: float = 0.0, score: float = None, history=()):
+        self.count = count
+        # 最近一次触发的时间戳
+        self.last = last
+        # 按半衰期衰减的触发分数，记录时刻为 last；旧数据没有分数时按次数计
+        self.score = float(count) if score is None else score
+        # 最近的触发时间
+        self.history = deque(history, maxlen=HISTORY_SIZE)
+
+    def add(self, now: float, half_life: float = 0):
+        """记录一次触发，分数先按距上次触发的时间衰减再加一，O(1)"""
+        if half_life > 0 and self.last and now > self.last:
+            self.score *= 0.5 ** ((now - self.last) / half_life)
+        self.score += 1.0
+        self.count += 1
+        self.last = now
+        self.history.append(now)
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "last": self.last, "score": self.score, "history": list(self.history)}
+
+    @classmethod
+    def from_stored(cls, value: Any, now: float) -> "OffenseRecord":
+        """从 KV 中的值还原，兼容旧版本直接存储的整数次数"""
+        if isinstance(value, dict):
+            score = value.get("score")
+            return cls(
+                int(value.get("count", 0)),
+                float(value.get("last", now)),
+                float(score) if score is not None else None,
+                value.get("history") or ()
+            )
+        if isinstance(value, (int, float)):
+            return cls(int(value), now)
+        return cls()
+
+
+class OffenseStore:
+    """累计触发次数存储
+
+    - 首次访问某个键时从 KV 懒加载，之后直接读内存
+    - 修改只标记为脏数据，由后台定时批量写回 KV，插件卸载时再写回一次
+    - expire_seconds 大于 0 时，超过该时长没有再触发的记录视为过期并清零
+    - 内存中最多保留 max_cached 条记录，超出时淘汰最久未访问的已落盘记录
+    """
+
+    def __init__(self,
+                 load: Callable[[str, Any], Awaitable[Any]],
+                 save: Callable[[str, Any], Awaitable[None]],
+                 delete: Callable[[str], Awaitable[None]],
+                 flush_interval: float = 10.0,
+                 expire_seconds: float = 0,
+                 max_cached: int = 10000):
+        self._load = load
+        self._save = save
+        self._delete = delete
+        self.flush_interval = flush_interval
+        self.expire_seconds = expire_seconds
+        self.max_cached = max_cached
+
+        self._records: "OrderedDict[str, OffenseRecord]" = OrderedDict()
+        # 待写回和待删除的键
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        # 正在写回中的删除，期间不能从 KV 读到旧值
+        self._deleting: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计计数
+        self.loads = 0
+        self.flushes = 0
+        self.writes = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def dirty(self) -> int:
+        """待写回的键数"""
+        return len(self._dirty) + len(self._deleted)
+
+    def _expired(self, record: OffenseRecord, now: float) -> bool:
+        return self.expire_seconds > 0 and record.count > 0 and now - record.last > self.expire_seconds
+
+    async def _get_record(self, key: str, now: float) -> OffenseRecord:
+        record = self._records.get(key)
+        if record is None:
+            record = OffenseRecord()
+            if key not in self._deleted and key not in self._deleting:
+                try:
+                    stored = await self._load(key, None)
+                    self.loads += 1
+                    if stored is not None:
+                        record = OffenseRecord.from_stored(stored, now)
+                except Exception as e:
+                    logger.error(f"[刷屏禁言] 读取累计次数失败: {e}")
+            # 加载期间可能已被其他协程写入
+            existing = self._records.get(key)
+            if existing is not None:
+                record = existing
+            else:
+                self._records[key] = record
+                self._evict()
+        else:
+            self._records.move_to_end(key)
+
+        if self._expired(record, now):
+            # 过期的记录清零，并从 KV 中删除
+            record = OffenseRecord()
+            self._records[key] = record
+            self._dirty.discard(key)
+            self._deleted.add(key)
+            self._ensure_flusher()
+        return record
+
+    def _evict(self):
+        """淘汰最久未访问的已落盘记录"""
+        if len(self._records) <= self.max_cached:
+            return
+        for key in list(self._records):
+            if len(self._records) <= self.max_cached:
+                break
+            if key not in self._dirty:
+                del self._records[key]
+
+    async def get(self, key: str) -> int:
+        """读取累计次数"""
+        record = await self._get_record(key, time.time())
+        return record.count
+
+    async def increment(self, key: str) -> int:
+        """累计次数加一，返回新的次数"""
+        record = await self.record(key)
+        return record.count
+
+    async def record(self, key: str, half_life: float = 0) -> OffenseRecord:
+        """记录一次触发，返回更新后的记录
+
+        Args:
+            half_life: 触发分数的半衰期（秒），0 表示不衰减
+        """
+        now = time.time()
+        record = await self._get_record(key, now)
+        record.add(now, half_life)
+        self._deleted.discard(key)
+        self._dirty.add(key)
+        self._ensure_flusher()
+        return record
+
+    async def reset(self, key: str) -> int:
+        """清除累计次数，返回原次数"""
+        record = await self._get_record(key, time.time())
+        old_count = record.count
+        self._records.pop(key, None)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        self._ensure_flusher()
+        return old_count
+
+    def _ensure_flusher(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """将脏数据批量写回 KV"""
+        if not self._dirty and not self._deleted:
+            return
+        dirty, self._dirty = self._dirty, set()
+        deleted, self._deleted = self._deleted, set()
+        self._deleting = deleted
+
+        jobs = []
+        keys = []
+        for key in dirty:
+            record = self._records.get(key)
+            if record is not None:
+                jobs.append(self._save(key, record.to_dict()))
+                keys.append(key)
+        for key in deleted:
+            jobs.append(self._delete(key))
+            keys.append(key)
+
+        try:
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+        finally:
+            self._deleting = set()
+        failed = 0
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                failed += 1
+                # 写回失败的键留到下次重试
+                if key in deleted:
+                    if key not in self._dirty:
+                        self._deleted.add(key)
+                elif key not in self._deleted:
+                    self._dirty.add(key)
+        self.flushes += 1
+        self.writes += len(keys) - failed
+        if failed:
+            logger.error(f"[刷屏禁言] 写回累计次数失败 {failed} 条，稍后重试")
+
+    async def stop(self):
+        """停止定时写回并写回剩余脏数据"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        await self.flush()
@@ -0,0 +1,110 @@
+import re
+from typing import Optional, Tuple
+
+# 阶梯中表示踢出群的步骤
+KICK = "kick"
+
+_TIME_PATTERN = re.compile(r'^(\d+)\s*([天小时分秒天hmds]+)?$')
+
+
+def parse_minutes(time_str: str) -> Optional[int]:
+    """解析时间字符串，返回分钟数
+
+    支持格式：
+    - 1分, 1分钟 -> 1分钟
+    - 1小时 -> 60分钟
+    - 1天 -> 1440分钟
+    - 1h, 1H -> 60分钟
+    - 1m, 1M -> 1分钟
+    - 1d, 1D -> 1440分钟
+    - 1s, 1S -> 0分钟（秒不支持，返回0）
+    - 纯数字 -> 视为分钟
+    """
+    time_str = time_str.strip().lower()
+
+    # 匹配数字+单位格式
+    match = _TIME_PATTERN.match(time_str)
+    if not match:
+        return None
+
+    num = int(match.group(1))
+    unit = match.group(2) or ""
+
+    if not unit or unit in ["分", "分钟", "m"]:
+        return num
+    elif unit in ["小时", "h"]:
+        return num * 60
+    elif unit in ["天", "d"]:
+        return num * 1440
+    elif unit in ["秒", "s"]:
+        return 0
+
+    return None
+
+
+def format_minutes(minutes: int) -> str:
+    """把分钟数格式化为易读的时长"""
+    if minutes and minutes % 1440 == 0:
+        return f"{minutes // 1440} 天"
+    if minutes and minutes % 60 == 0:
+        return f"{minutes // 60} 小时"
+    return f"{minutes} 分钟"
+
+
+class PenaltyLadder:
+    """逐级加重的处罚阶梯
+
+    由 "1m,10m,1h,1d,kick" 形式的字符串解析而来，每一步是禁言分钟数或踢出群。
+    按用户的衰减触发分数（四舍五入）选择处罚：分数为 1 时使用第一步，分数每增加 1 升一级，超出阶梯时停在最后一步。
+    """
+
+    __slots__ = ("steps", "spec")
+
+    def __init__(self, steps: Tuple, spec: str = ""):
+        self.steps = steps
+        self.spec = spec
+
+    @classmethod
+    def parse(cls, spec: str) -> "PenaltyLadder":
+        """解析处罚阶梯，格式错误时抛出 ValueError"""
+        steps = []
+        for item in (spec or "").replace("，", ",").replace("→", ",").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if item.lower() in (KICK, "踢出", "踢"):
+                steps.append(KICK)
+                continue
+            minutes = parse_minutes(item)
+            if not minutes:
+                raise ValueError(f"无效的处罚步骤: {item}")
+            steps.append(minutes)
+        if not steps:
+            raise ValueError("处罚阶梯不能为空")
+        if KICK in steps[:-1]:
+            raise ValueError("踢出只能作为处罚阶梯的最后一步")
+        return cls(tuple(steps), spec)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def level(self, score: float) -> int:
+        """根据衰减分数返回处罚等级（从 0 开始）"""
+        # 分数四舍五入，刚衰减了一点的分数仍算作完整的一次
+        return max(0, min(int(score + 0.5) - 1, len(self.steps) - 1))
+
+    def decide(self, score: float, default_mute: int) -> Tuple[int, bool, int]:
+        """选择处罚
+
+        返回:
+            (禁言分钟数, 是否踢出, 处罚等级)；踢出时同时按阶梯中最长的禁言时长禁言，直到踢人执行
+        """
+        level = self.level(score)
+        step = self.steps[level]
+        if step == KICK:
+            mutes = [minutes for minutes in self.steps if minutes != KICK]
+            return (max(mutes) if mutes else default_mute), True, level
+        return step, False, level
+
+    def describe(self) -> str:
+        return " → ".join("踢出" if step == KICK else format_minutes(step) for step in self.steps)
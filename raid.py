@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Optional
+
+from .detectors import SlidingWindowLog
+
+
+class RaidMonitor:
+    """单个群的刷屏攻击（多人同时刷屏）检测
+
+    统计全群所有成员的消息速率，任意连续 period 秒内的消息数达到 threshold 条即进入攻击模式；
+    持续 cooldown 秒没有再达到该速率后自动退出。
+    攻击模式下待禁言的用户暂存在 pending 中，由插件批量执行并合并提示消息。
+    """
+
+    __slots__ = ("_window", "cooldown", "active", "last_hot", "whole_ban", "bot", "pending", "flush_task")
+
+    def __init__(self, threshold: int, period: float, cooldown: float):
+        self._window = SlidingWindowLog(threshold, period)
+        self.cooldown = cooldown
+        self.active = False
+        self.last_hot = 0.0
+        # 是否由攻击模式开启了全员禁言
+        self.whole_ban = False
+        # 进入攻击模式时的机器人实例，用于退出时解除全员禁言
+        self.bot: Any = None
+        # 待批量禁言的用户（按加入顺序去重）及禁言后要撤回的消息: { uid: [message_id] }
+        self.pending: Dict[str, List[int]] = {}
+        self.flush_task: Optional[Any] = None
+
+    def record(self, now: float) -> bool:
+        """记录一条群消息，刚进入攻击模式时返回 True"""
+        if not self._window.hit(now):
+            return False
+        self.last_hot = now
+        if self.active:
+            return False
+        self.active = True
+        return True
+
+    def should_exit(self, now: float) -> bool:
+        """攻击模式下持续 cooldown 秒未达到阈值速率即可退出"""
+        return self.active and now - self.last_hot >= self.cooldown
+
+    def exit(self):
+        """退出攻击模式"""
+        self.active = False
+        self.whole_ban = False
+        self.bot = None
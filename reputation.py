@@ -0,0 +1,85 @@
+import math
+from collections import OrderedDict
+from typing import Dict
+
+
+class ReputationIndex:
+    """跨群的用户信誉索引
+
+    以 QQ 号为键记录最近被处罚的用户，按群分别计分：每次处罚该群的分数加 1，分数按半衰期随时间衰减。
+    查询时排除当前群自己的处罚，只统计用户在其他群的分数。
+    容量有上限，超出时淘汰最久没有再被处罚的用户；查询不改变淘汰顺序。
+    """
+
+    # 衰减到该分数以下的记录视为已失效
+    MIN_SCORE = 0.05
+    # 分数不低于该值表示一个半衰期内被处罚过
+    RECENT_SCORE = 0.5
+    # 每个用户最多记录的群数，超出时丢弃最久没有处罚的群
+    MAX_GROUPS = 16
+
+    def __init__(self, half_life: float = 600.0, max_size: int = 10000):
+        self.half_life = max(float(half_life), 1.0)
+        self.max_size = max(1, int(max_size))
+        # { uid: { gid: [分数, 最后一次处罚时间] } }，按最后一次处罚时间排列
+        self._entries: "OrderedDict[int, Dict[int, list]]" = OrderedDict()
+
+        # 统计计数
+        self.records = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * math.pow(0.5, max(0.0, now - entry[1]) / self.half_life)
+
+    def record(self, uid: int, gid: int, now: float, weight: float = 1.0) -> float:
+        """记录用户在群 gid 的一次处罚，返回该群衰减后的新分数"""
+        groups = self._entries.get(uid)
+        if groups is None:
+            groups = self._entries[uid] = {}
+        else:
+            self._entries.move_to_end(uid)
+        entry = groups.pop(gid, None) or [0.0, now]
+        entry[0] = self._decayed(entry, now) + weight
+        entry[1] = now
+        # 按处罚时间排列，超出上限时丢弃最早的群
+        groups[gid] = entry
+        if len(groups) > self.MAX_GROUPS:
+            del groups[next(iter(groups))]
+        self.records += 1
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry[0]
+
+    def score(self, uid: int, now: float, exclude_gid: int = None) -> float:
+        """用户在 exclude_gid 以外各群的衰减分数之和，没有记录时为 0"""
+        groups = self._entries.get(uid)
+        if groups is None:
+            return 0.0
+        total = 0.0
+        expired = []
+        for gid, entry in groups.items():
+            score = self._decayed(entry, now)
+            if score < self.MIN_SCORE:
+                expired.append(gid)
+            elif gid != exclude_gid:
+                total += score
+        for gid in expired:
+            del groups[gid]
+        if not groups:
+            del self._entries[uid]
+        return total
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "records": self.records,
+            "evictions": self.evictions,
+        }
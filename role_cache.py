@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class RoleCache:
+    """群成员信息缓存（get_group_member_info 的结果）
+
+    以 (gid, uid) 为键，条目超过 ttl 秒失效，超过 maxsize 时淘汰最久未使用的条目。
+    群管理员变动、成员退群等通知事件到达时由插件主动失效对应条目。
+    """
+
+    def __init__(self, ttl: float = 300, maxsize: int = 5000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, gid: int, uid: int, now: float) -> Optional[Dict[str, Any]]:
+        """读取缓存，未命中或已过期返回 None"""
+        key = (gid, uid)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, info = entry
+        if expires_at <= now:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return info
+
+    def put(self, gid: int, uid: int, info: Dict[str, Any], now: float):
+        """写入缓存"""
+        key = (gid, uid)
+        self._entries[key] = (now + self.ttl, info)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, gid: int, uid: int):
+        """失效单个成员的缓存"""
+        if self._entries.pop((gid, uid), None) is not None:
+            self.invalidations += 1
+
+    def invalidate_group(self, gid: int):
+        """失效整个群的缓存（例如机器人被移出群）"""
+        keys = [key for key in self._entries if key[0] == gid]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
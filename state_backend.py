@@ -0,0 +1,305 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+# 共享滑动窗口划分的子桶数
+WINDOW_BUCKETS = 10
+
+
+def window_buckets(key: str, now: float, period: float) -> Tuple[List[str], List[float], float]:
+    """滑动窗口的子桶键及其权重
+
+    窗口 period 秒分为 WINDOW_BUCKETS 个子桶，每个子桶一个键，当前子桶排在最后。
+    最旧的子桶只有一部分仍在窗口内，按该比例计入（假设子桶内的消息均匀分布），
+    其余子桶全部计入，因此窗口随时间连续滑动，误差不超过一个子桶。
+
+    返回:
+        (子桶键列表, 对应权重, 子桶键的过期时长)
+    """
+    width = period / WINDOW_BUCKETS
+    index = int(now // width)
+    elapsed = now / width - index
+    keys = [f"{key}:{i}" for i in range(index - WINDOW_BUCKETS, index + 1)]
+    weights = [1.0 - elapsed] + [1.0] * WINDOW_BUCKETS
+    return keys, weights, period + 2 * width
+
+
+def decay(value: float, last: float, now: float, half_life: float) -> float:
+    """按半衰期把 last 时刻的分数衰减到 now"""
+    if half_life > 0 and last and now > last:
+        return value * 0.5 ** ((now - last) / half_life)
+    return value
+
+
+class StateBackend:
+    """状态存储后端
+
+    提供带过期时间的原子计数和去重标记，供多个插件实例共享检测窗口、累计次数和"已处理"标记。
+    所有时间均为 time.time() 的墙上时间，以便跨进程比较。
+    """
+
+    # 是否在多个实例之间共享
+    shared = False
+
+    async def incr(self, key: str, amount: float = 1.0, ttl: float = 0, refresh: bool = False) -> float:
+        """原子地增加计数并返回新值
+
+        Args:
+            ttl: 大于 0 时计数在 ttl 秒后过期，过期后从 0 重新计数
+            refresh: 为 True 时每次增加都重新计算过期时间，否则只在创建时设置（固定窗口）
+        """
+        raise NotImplementedError
+
+    async def get(self, key: str) -> float:
+        """读取计数，不存在或已过期时返回 0"""
+        raise NotImplementedError
+
+    async def add_to_window(self, key: str, amount: float, period: float) -> float:
+        """在滑动窗口中记录 amount，原子地返回最近 period 秒内的总量
+
+        窗口由子桶近似，见 window_buckets。
+        """
+        raise NotImplementedError
+
+    async def incr_decayed(self, key: str, amount: float, half_life: float, ttl: float = 0) -> float:
+        """原子地把按半衰期衰减的分数加上 amount 并返回新值
+
+        Args:
+            half_life: 半衰期（秒），0 表示不衰减
+            ttl: 大于 0 时分数在最后一次增加 ttl 秒后过期
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        """设置一个 ttl 秒后过期的标记，标记已存在时返回 False
+
+        用于多个实例之间的去重：只有第一个设置成功的实例去执行对应操作。
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """进程内存储，只在当前实例内生效"""
+
+    # 过期条目的清理间隔（操作次数）
+    PURGE_EVERY = 1024
+
+    def __init__(self):
+        # { key: (value, expires) }，expires 为 0 表示不过期
+        self._data: Dict[str, Tuple[float, float]] = {}
+        self._ops = 0
+
+    def _live(self, key: str, now: float):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _tick(self, now: float):
+        self._ops += 1
+        if self._ops % self.PURGE_EVERY == 0:
+            for key in [key for key, (_, expires) in self._data.items() if expires and expires <= now]:
+                del self._data[key]
+
+    async def incr(self, key: str, amount: float = 1.0, ttl: float = 0, refresh: bool = False) -> float:
+        now = time.time()
+        self._tick(now)
+        entry = self._live(key, now)
+        expires = now + ttl if ttl > 0 else 0.0
+        if entry is None:
+            value = amount
+        else:
+            value = entry[0] + amount
+            if not refresh:
+                expires = entry[1]
+        self._data[key] = (value, expires)
+        return value
+
+    async def get(self, key: str) -> float:
+        entry = self._live(key, time.time())
+        return entry[0] if entry is not None else 0.0
+
+    async def add_to_window(self, key: str, amount: float, period: float) -> float:
+        now = time.time()
+        self._tick(now)
+        keys, weights, ttl = window_buckets(key, now, period)
+        current = self._live(keys[-1], now)
+        self._data[keys[-1]] = ((current[0] if current else 0.0) + amount, now + ttl)
+        total = 0.0
+        for bucket, weight in zip(keys, weights):
+            entry = self._live(bucket, now)
+            if entry is not None:
+                total += entry[0] * weight
+        return total
+
+    async def incr_decayed(self, key: str, amount: float, half_life: float, ttl: float = 0) -> float:
+        now = time.time()
+        self._tick(now)
+        entry = self._live(key, now)
+        at = self._live(key + ":at", now)
+        value = amount
+        if entry is not None:
+            value += decay(entry[0], at[0] if at else 0.0, now, half_life)
+        expires = now + ttl if ttl > 0 else 0.0
+        self._data[key] = (value, expires)
+        self._data[key + ":at"] = (now, expires)
+        return value
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+        self._data.pop(key + ":at", None)
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        self._tick(now)
+        if self._live(key, now) is not None:
+            return False
+        self._data[key] = (1.0, now + ttl)
+        return True
+
+
+class SQLiteBackend(StateBackend):
+    """基于 SQLite（WAL 模式）的共享存储，适用于同一台机器上的多个实例
+
+    每个操作在一个 IMMEDIATE 事务中完成，多个进程同时操作同一个键时也是原子的。
+    数据库调用在线程池中执行，不阻塞事件循环。
+    """
+
+    shared = True
+
+    PURGE_EVERY = 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS flood_state ("
+            "key TEXT PRIMARY KEY, value REAL NOT NULL, expires REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._ops = 0
+
+    def _transaction(self, func, *args):
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self._ops += 1
+                if self._ops % self.PURGE_EVERY == 0:
+                    conn.execute("DELETE FROM flood_state WHERE expires > 0 AND expires <= ?", (now,))
+                result = func(conn, now, *args)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _drop_expired(conn: sqlite3.Connection, key: str, now: float):
+        conn.execute("DELETE FROM flood_state WHERE key = ? AND expires > 0 AND expires <= ?", (key, now))
+
+    @classmethod
+    def _incr(cls, conn: sqlite3.Connection, now: float, key: str, amount: float, ttl: float, refresh: bool) -> float:
+        cls._drop_expired(conn, key, now)
+        expires = now + ttl if ttl > 0 else 0.0
+        if refresh:
+            updated = conn.execute(
+                "UPDATE flood_state SET value = value + ?, expires = ? WHERE key = ?", (amount, expires, key)
+            ).rowcount
+        else:
+            updated = conn.execute(
+                "UPDATE flood_state SET value = value + ? WHERE key = ?", (amount, key)
+            ).rowcount
+        if not updated:
+            conn.execute("INSERT INTO flood_state (key, value, expires) VALUES (?, ?, ?)", (key, amount, expires))
+            return amount
+        return conn.execute("SELECT value FROM flood_state WHERE key = ?", (key,)).fetchone()[0]
+
+    @classmethod
+    def _get(cls, conn: sqlite3.Connection, now: float, key: str) -> float:
+        cls._drop_expired(conn, key, now)
+        row = conn.execute("SELECT value FROM flood_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0.0
+
+    @classmethod
+    def _add_to_window(cls, conn: sqlite3.Connection, now: float, key: str, amount: float, period: float) -> float:
+        keys, weights, ttl = window_buckets(key, now, period)
+        cls._incr(conn, now, keys[-1], amount, ttl, False)
+        placeholders = ",".join("?" * len(keys))
+        rows = dict(conn.execute(
+            f"SELECT key, value FROM flood_state WHERE key IN ({placeholders}) AND (expires = 0 OR expires > ?)",
+            (*keys, now)
+        ).fetchall())
+        return sum(rows.get(bucket, 0.0) * weight for bucket, weight in zip(keys, weights))
+
+    @classmethod
+    def _incr_decayed(cls, conn: sqlite3.Connection, now: float, key: str, amount: float, half_life: float, ttl: float) -> float:
+        value = amount
+        previous = cls._get(conn, now, key)
+        if previous:
+            value += decay(previous, cls._get(conn, now, key + ":at"), now, half_life)
+        expires = now + ttl if ttl > 0 else 0.0
+        conn.executemany(
+            "INSERT OR REPLACE INTO flood_state (key, value, expires) VALUES (?, ?, ?)",
+            ((key, value, expires), (key + ":at", now, expires))
+        )
+        return value
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, now: float, key: str):
+        conn.execute("DELETE FROM flood_state WHERE key IN (?, ?)", (key, key + ":at"))
+
+    @classmethod
+    def _acquire(cls, conn: sqlite3.Connection, now: float, key: str, ttl: float) -> bool:
+        cls._drop_expired(conn, key, now)
+        return conn.execute(
+            "INSERT OR IGNORE INTO flood_state (key, value, expires) VALUES (?, 1, ?)", (key, now + ttl)
+        ).rowcount == 1
+
+    async def incr(self, key: str, amount: float = 1.0, ttl: float = 0, refresh: bool = False) -> float:
+        return await asyncio.to_thread(self._transaction, self._incr, key, amount, ttl, refresh)
+
+    async def get(self, key: str) -> float:
+        return await asyncio.to_thread(self._transaction, self._get, key)
+
+    async def add_to_window(self, key: str, amount: float, period: float) -> float:
+        return await asyncio.to_thread(self._transaction, self._add_to_window, key, amount, period)
+
+    async def incr_decayed(self, key: str, amount: float, half_life: float, ttl: float = 0) -> float:
+        return await asyncio.to_thread(self._transaction, self._incr_decayed, key, amount, half_life, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._transaction, self._delete, key)
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._transaction, self._acquire, key, ttl)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+STATE_BACKENDS = ("memory", "sqlite")
+
+
+def create_state_backend(kind: str, path: str = "") -> StateBackend:
+    """按名称创建状态存储后端，未知名称使用进程内存储"""
+    if kind == "sqlite":
+        return SQLiteBackend(path or os.path.join("data", "ban_flooding_the_screen_state.db"))
+    return MemoryBackend()
@@ -0,0 +1,94 @@
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Tuple
+
+# 取值为 QQ 号（或 QQ 号列表）的变量，渲染为 at 消息段
+AT_FIELDS = frozenset({"at_user", "users"})
+
+# 各提示语配置项可用的变量
+TEMPLATE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "mute_message": ("at_user", "nickname", "mute_time"),
+    "kick_message": ("at_user", "count"),
+    "long_message_mute_message": ("at_user", "nickname", "threshold", "mute_time"),
+    "raid_summary_message": ("count", "users", "mute_time"),
+    "mention_mute_message": ("at_user", "nickname", "mute_time"),
+    "keyword_mute_message": ("at_user", "nickname", "mute_time"),
+}
+
+_LITERAL = 0
+_TEXT_FIELD = 1
+_AT_FIELD = 2
+
+
+def text_segment(text: str) -> Dict[str, Any]:
+    return {"type": "text", "data": {"text": text}}
+
+
+def at_segment(uid: Any) -> Dict[str, Any]:
+    return {"type": "at", "data": {"qq": str(uid)}}
+
+
+class MessageTemplate:
+    """预编译的提示语模板
+
+    加载配置时解析一次并校验变量名，渲染时直接拼接为 OneBot 消息段数组：
+    {at_user}、{users} 渲染为 at 消息段，其余变量和文字渲染为 text 消息段。
+    模板为空字符串时表示不发送消息。
+    """
+
+    __slots__ = ("source", "_parts")
+
+    def __init__(self, source: str, parts: Tuple[Tuple[int, str], ...]):
+        self.source = source
+        self._parts = parts
+
+    @classmethod
+    def compile(cls, source: str, fields: Iterable[str]) -> "MessageTemplate":
+        """解析模板，包含未知变量或格式错误时抛出 ValueError"""
+        source = source or ""
+        allowed = frozenset(fields)
+        parts = []
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError as e:
+            raise ValueError(f"模板格式错误（花括号不匹配时请用 {{{{ 和 }}}} 表示）: {e}")
+        for literal, field_name, format_spec, conversion in parsed:
+            if literal:
+                parts.append((_LITERAL, literal))
+            if field_name is None:
+                continue
+            if field_name not in allowed:
+                names = "、".join(f"{{{name}}}" for name in sorted(allowed))
+                raise ValueError(f"未知变量 {{{field_name}}}，可用变量: {names}")
+            if conversion or format_spec:
+                raise ValueError(f"变量 {{{field_name}}} 不支持转换或格式说明")
+            parts.append((_AT_FIELD if field_name in AT_FIELDS else _TEXT_FIELD, field_name))
+        return cls(source, tuple(parts))
+
+    def __bool__(self) -> bool:
+        return bool(self.source)
+
+    def render(self, suffix: str = "", **values) -> List[Dict[str, Any]]:
+        """渲染为消息段数组，suffix 作为文字追加在末尾"""
+        segments: List[Dict[str, Any]] = []
+        text: List[str] = []
+        for kind, value in self._parts:
+            if kind == _LITERAL:
+                text.append(value)
+            elif kind == _TEXT_FIELD:
+                text.append(str(values.get(value, "")))
+            else:
+                uids = values.get(value)
+                if not isinstance(uids, (list, tuple)):
+                    uids = (uids,)
+                for index, uid in enumerate(uids):
+                    if index:
+                        text.append(" ")
+                    if text:
+                        segments.append(text_segment("".join(text)))
+                        text = []
+                    segments.append(at_segment(uid))
+        if suffix:
+            text.append(suffix)
+        if text:
+            segments.append(text_segment("".join(text)))
+        return segments
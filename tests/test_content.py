@@ -0,0 +1,50 @@
+"""重复内容检测：SimHash 指纹与逐位投票的参考实现一致"""
+
+import importlib
+import os
+import random
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "ban_flooding_the_screen"
+
+
+def _load_content():
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.content")
+
+
+content = _load_content()
+
+
+def _reference_simhash(text):
+    if len(text) <= content.SHINGLE_SIZE:
+        return hash(text) & content._MASK64
+    count = len(text) - content.SHINGLE_SIZE + 1
+    step = max(1, count // content.MAX_SHINGLES)
+    weights = [0] * 64
+    for start in range(0, count, step):
+        h = hash(text[start:start + content.SHINGLE_SIZE]) & content._MASK64
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def test_simhash_matches_bitwise_vote():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = "".join(rng.choice("abcdef加群广告你好") for _ in range(rng.randint(0, content.MAX_TEXT_LENGTH)))
+        assert content.simhash(text) == _reference_simhash(text)
+
+
+def test_repeats_differing_only_in_punctuation_share_a_window():
+    table = content.ContentTable(threshold=3, period=10)
+    text = "欢迎加入我们的交流群，每天都有最新的资料分享给大家"
+    assert not table.hit(text, 0)
+    assert not table.hit(text + "！", 1)
+    assert table.hit(text, 2)
+    assert len(table) == 1
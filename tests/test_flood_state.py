@@ -0,0 +1,65 @@
+"""刷屏状态表：淘汰只扫描可以淘汰的状态"""
+
+import importlib
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "ban_flooding_the_screen"
+
+
+def _load(name):
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+flood_state = _load("flood_state")
+detectors = _load("detectors")
+
+
+def _state(enforcing=False):
+    state = flood_state.FloodState(detectors.create_detector("sliding_window", 5, 5))
+    if enforcing:
+        state.begin_enforcement()
+    return state
+
+
+def test_evicts_least_recent_counting_state():
+    table = flood_state.FloodStateTable(max_size=3)
+    table.add("a", _state())
+    table.add("b", _state(enforcing=True))
+    table.add("c", _state())
+    table.touch("a")
+    assert table.evict_idle() == "c"
+    assert table.evict_idle() == "a"
+    assert table.evict_idle() is None
+    assert list(table) == ["b"]
+
+
+def test_skipped_states_are_not_rescanned_until_touched():
+    table = flood_state.FloodStateTable(max_size=2)
+    busy = _state(enforcing=True)
+    table.add("busy", busy)
+    assert table.evict_idle() is None
+    # 被跳过的状态仍可读取，且不再参与淘汰扫描
+    assert table.get("busy") is busy and "busy" in table and len(table) == 1
+    assert not table._states
+
+    busy.enter_cooldown(0)
+    table.add("new", _state())
+    assert table.touch("busy") is busy
+    assert table.evict_idle() == "new"
+    assert table.evict_idle() == "busy"
+    assert len(table) == 0
+
+
+def test_pop_removes_skipped_state():
+    table = flood_state.FloodStateTable(max_size=1)
+    table.add("busy", _state(enforcing=True))
+    table.evict_idle()
+    assert table.pop("busy") is not None
+    assert table.get("busy") is None and len(table) == 0
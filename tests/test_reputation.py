@@ -0,0 +1,109 @@
+"""跨群联防：信誉索引只统计用户在其他群的处罚记录"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_reputation():
+    spec = importlib.util.spec_from_file_location("reputation", os.path.join(ROOT, "reputation.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+ReputationIndex = _load_reputation().ReputationIndex
+
+
+def test_own_group_bans_are_excluded():
+    index = ReputationIndex(half_life=600)
+    index.record(42, 1, 0)
+    index.record(42, 1, 10)
+    assert index.score(42, 10, exclude_gid=1) == 0.0
+    assert index.score(42, 10, exclude_gid=2) == pytest.approx(2.0, rel=1e-2)
+
+
+def test_scores_from_other_groups_add_up():
+    index = ReputationIndex(half_life=600)
+    index.record(42, 1, 0)
+    index.record(42, 2, 0)
+    assert index.score(42, 0, exclude_gid=3) == pytest.approx(2.0)
+    assert index.score(42, 0, exclude_gid=2) == pytest.approx(1.0)
+
+
+def test_scores_decay_and_expire():
+    index = ReputationIndex(half_life=10)
+    index.record(42, 1, 0)
+    assert index.score(42, 10, exclude_gid=2) == pytest.approx(0.5)
+    assert index.score(42, 1000, exclude_gid=2) == 0.0
+    assert len(index) == 0
+
+
+def test_capacity_evicts_least_recent_user():
+    index = ReputationIndex(half_life=600, max_size=2)
+    index.record(1, 1, 0)
+    index.record(2, 1, 0)
+    index.record(1, 2, 1)
+    index.record(3, 1, 2)
+    assert index.score(2, 2) == 0.0
+    assert index.score(1, 2) > 0
+    assert index.stats()["evictions"] == 1
+
+
+def _flood(plugin, bot, gid, uid, count, first_id):
+    from fake_bot import FakeEvent
+
+    async def send():
+        for i in range(count):
+            raw = {
+                "post_type": "message", "message_type": "group", "group_id": gid, "user_id": uid,
+                "message_id": first_id + i, "message": [{"type": "text", "data": {"text": f"msg {first_id + i}"}}],
+                "sender": {"role": "member"}, "self_id": bot.api.self_id,
+            }
+            await plugin.handle_group_message(FakeEvent(bot, raw, raw["message"][0]["data"]["text"]))
+    return send()
+
+
+def test_single_group_repeat_offender_is_not_banned_instantly():
+    pytest.importorskip("astrbot")
+    sys.path.insert(0, os.path.join(ROOT, "benchmark"))
+    from fake_bot import FakeBot, FakeOneBotAPI
+    from run import PACKAGE_NAME, VirtualClock, enforcement_summary, load_plugin_class
+
+    async def main():
+        plugin_class, _ = load_plugin_class()
+        clock = VirtualClock()
+        clock.install(PACKAGE_NAME)
+        plugin = plugin_class({"enabled_groups": ["1", "2", "3"], "enable_cross_group": True})
+        api = FakeOneBotAPI(latency=0)
+        bot = FakeBot(api)
+
+        # 在群 1 刷屏两次（间隔超过冷却期），之后的一条普通消息不应直接禁言；
+        # 处罚在后台任务中执行，每波刷屏后让出事件循环
+        await _flood(plugin, bot, 1, 42, 4, 100)
+        await asyncio.sleep(0.05)
+        clock.advance_to(60)
+        await _flood(plugin, bot, 1, 42, 4, 200)
+        await asyncio.sleep(0.05)
+        clock.advance_to(120)
+        await _flood(plugin, bot, 1, 42, 1, 300)
+        await asyncio.sleep(0.2)
+        assert enforcement_summary(api, plugin.kv)["ban_calls"] == 2
+
+        # 在另外两个群各被禁言一次的用户，在群 3 发一条消息即被禁言
+        await _flood(plugin, bot, 2, 43, 4, 400)
+        await _flood(plugin, bot, 1, 43, 4, 500)
+        await asyncio.sleep(0.05)
+        await _flood(plugin, bot, 3, 43, 1, 600)
+        await asyncio.sleep(0.2)
+        banned = {params["group_id"] for action, params in api.log
+                  if action == "set_group_ban" and params.get("user_id") == 43}
+        assert banned == {1, 2, 3}
+        await plugin.terminate()
+
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""共享状态后端：滑动窗口计数和衰减分数"""
+
+import asyncio
+import importlib.util
+import os
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_state_backend():
+    spec = importlib.util.spec_from_file_location("state_backend", os.path.join(ROOT, "state_backend.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+state_backend = _load_state_backend()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(state_backend, "time", types.SimpleNamespace(time=lambda: clock.now))
+    if request.param == "sqlite":
+        instance = state_backend.SQLiteBackend(str(tmp_path / "state.db"))
+    else:
+        instance = state_backend.MemoryBackend()
+    instance.clock = clock
+    yield instance
+    asyncio.run(instance.close())
+
+
+def test_window_catches_burst_straddling_a_boundary(backend):
+    async def main():
+        # 固定窗口会在第一条消息 10 秒后清零，跨过这个时刻分两批发送的 9 条消息都不会达到阈值
+        backend.clock.now = 1000.0
+        await backend.add_to_window("window:1:42", 1, 10)
+        total = 0.0
+        for t in (1009.1, 1009.2, 1009.3, 1009.4, 1010.1, 1010.2, 1010.3, 1010.4, 1010.5):
+            backend.clock.now = t
+            total = await backend.add_to_window("window:1:42", 1, 10)
+        return total
+
+    # 1000 秒的那条消息只有一半的子桶仍在窗口内，误差不超过一个子桶
+    assert 9.0 <= asyncio.run(main()) <= 10.0
+
+
+def test_window_slides(backend):
+    async def main():
+        backend.clock.now = 1000.0
+        for _ in range(5):
+            await backend.add_to_window("window:1:42", 1, 10)
+        backend.clock.now = 1005.0
+        half = await backend.add_to_window("window:1:42", 0, 10)
+        backend.clock.now = 1011.0
+        expired = await backend.add_to_window("window:1:42", 1, 10)
+        return half, expired
+
+    half, expired = asyncio.run(main())
+    assert half == pytest.approx(5.0)
+    assert expired == pytest.approx(1.0)
+
+
+def test_decayed_score_halves_after_half_life(backend):
+    async def main():
+        first = await backend.incr_decayed("offense_score:1:42", 1, 3600)
+        backend.clock.now += 3600
+        second = await backend.incr_decayed("offense_score:1:42", 1, 3600)
+        await backend.delete("offense_score:1:42")
+        cleared = await backend.incr_decayed("offense_score:1:42", 1, 3600)
+        return first, second, cleared
+
+    assert asyncio.run(main()) == pytest.approx((1.0, 1.5, 1.0))
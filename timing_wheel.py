@@ -0,0 +1,100 @@
+from typing import Dict, Hashable, List, Optional
+
+
+class TimingWheel:
+    """哈希时间轮，用于批量过期刷屏检测窗口
+
+    - schedule / cancel 均为 O(1)，重复 schedule 同一个 key 只更新截止时间，
+      旧槽位中的条目会在该槽位到期时被惰性迁移
+    - advance 每次最多过期 max_expire_per_tick 个 key，剩余部分顺延到下一个 tick，
+      保证单次推进的耗时有上限
+    """
+
+    def __init__(self, tick: float = 0.5, slots: int = 64, max_expire_per_tick: int = 2000):
+        self.tick = tick
+        self.max_expire_per_tick = max_expire_per_tick
+        self._slot_count = slots
+        self._slots: List[Dict[Hashable, None]] = [{} for _ in range(slots)]
+        # key -> 截止时间
+        self._deadlines: Dict[Hashable, float] = {}
+        # 已完整处理过的最后一个 tick 序号
+        self._cursor: Optional[int] = None
+
+        # 统计计数
+        self.last_expired = 0
+        self.total_expired = 0
+        self.ticks = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    @property
+    def live(self) -> int:
+        """当前存活的窗口数"""
+        return len(self._deadlines)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """登记或更新 key 的截止时间"""
+        previous = self._deadlines.get(key)
+        self._deadlines[key] = deadline
+        # 已在更早的槽位中时无需移动，到期时会被重新放入正确的槽位
+        if previous is None or deadline < previous:
+            self._slots[int(deadline // self.tick) % self._slot_count][key] = None
+
+    def cancel(self, key: Hashable):
+        """取消 key 的过期登记，槽位中的残留条目会在扫描时被丢弃"""
+        self._deadlines.pop(key, None)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """推进时间轮到 now，返回本次过期的 key 列表"""
+        target = int(now // self.tick)
+        if self._cursor is None:
+            self._cursor = target - 1
+        expired: List[Hashable] = []
+        limit = self.max_expire_per_tick
+
+        # 只处理已经完整结束的 tick，最多绕一圈
+        first = max(self._cursor + 1, target - self._slot_count)
+        for current in range(first, target):
+            slot_index = current % self._slot_count
+            slot = self._slots[slot_index]
+            slot_end = (current + 1) * self.tick
+            for key in list(slot):
+                if len(expired) >= limit:
+                    break
+                deadline = self._deadlines.get(key)
+                if deadline is None:
+                    del slot[key]
+                elif deadline < slot_end:
+                    del slot[key]
+                    del self._deadlines[key]
+                    expired.append(key)
+                else:
+                    new_index = int(deadline // self.tick) % self._slot_count
+                    if new_index != slot_index:
+                        del slot[key]
+                        self._slots[new_index][key] = None
+            if len(expired) >= limit:
+                # 本 tick 预算用完，剩余条目留到下次推进
+                self._cursor = current - 1
+                break
+            self._cursor = current
+        else:
+            self._cursor = max(self._cursor, target - 1)
+
+        self.ticks += 1
+        self.last_expired = len(expired)
+        self.total_expired += len(expired)
+        return expired
+
+    def stats(self) -> Dict[str, int]:
+        """返回时间轮统计信息"""
+        return {
+            "live": len(self._deadlines),
+            "last_expired": self.last_expired,
+            "total_expired": self.total_expired,
+            "ticks": self.ticks,
+        }
@@ -0,0 +1,124 @@
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Tuple
+
+# 信任倍数的上限，避免误填过大的数值后等同于永久豁免
+MAX_MULTIPLIER = 100.0
+
+
+def _split(value: Any) -> Iterable[str]:
+    """配置既可以是列表，也可以是逗号分隔的字符串"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    else:
+        items = str(value or "").replace("，", ",").split(",")
+    for item in items:
+        item = str(item).strip()
+        if item:
+            yield item
+
+
+def parse_uid_set(value: Any) -> frozenset:
+    """解析白名单 QQ 号，格式错误时抛出 ValueError"""
+    uids = set()
+    for item in _split(value):
+        try:
+            uids.add(int(item))
+        except ValueError:
+            raise ValueError(f"无效的 QQ 号: {item}")
+    return frozenset(uids)
+
+
+def parse_multiplier(value: str) -> float:
+    try:
+        multiplier = float(value)
+    except ValueError:
+        raise ValueError(f"无效的倍数: {value}")
+    if not 1.0 <= multiplier <= MAX_MULTIPLIER:
+        raise ValueError(f"倍数需要在 1 到 {MAX_MULTIPLIER:g} 之间: {value}")
+    return multiplier
+
+
+def parse_trust_map(value: Any) -> Dict[int, float]:
+    """解析 "QQ号:倍数" 形式的信任用户列表，格式错误时抛出 ValueError"""
+    trusted: Dict[int, float] = {}
+    for item in _split(value):
+        uid, sep, multiplier = item.replace("：", ":").partition(":")
+        if not sep:
+            raise ValueError(f"信任用户需要写成 QQ号:倍数: {item}")
+        try:
+            uid = int(uid.strip())
+        except ValueError:
+            raise ValueError(f"无效的 QQ 号: {item}")
+        trusted[uid] = parse_multiplier(multiplier.strip())
+    return trusted
+
+
+def parse_level_tiers(value: Any) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+    """解析 "20:1.5,50:2" 形式的群等级信任档位
+
+    返回按等级升序排列的 (等级, 倍数) 两个元组，格式错误时抛出 ValueError。
+    """
+    tiers: Dict[int, float] = {}
+    for item in _split(value):
+        level, sep, multiplier = item.replace("：", ":").partition(":")
+        try:
+            level = int(level.strip())
+        except ValueError:
+            raise ValueError(f"无效的群等级: {item}")
+        if not sep:
+            raise ValueError(f"群等级档位需要写成 等级:倍数: {item}")
+        tiers[level] = parse_multiplier(multiplier.strip())
+    levels = tuple(sorted(tiers))
+    return levels, tuple(tiers[level] for level in levels)
+
+
+def format_trust_map(trusted: Dict[int, float]) -> str:
+    return ",".join(f"{uid}:{multiplier:g}" for uid, multiplier in trusted.items())
+
+
+class TrustPolicy:
+    """白名单和信任档位（只读）
+
+    - whitelist：完全豁免检测的 QQ 号集合
+    - trusted：QQ 号 -> 阈值倍数
+    - 群等级档位：群等级达到某一档时按该档倍数放宽阈值
+
+    所有判断都是集合/字典查找或一次二分查找，不调用任何接口。
+    """
+
+    __slots__ = ("whitelist", "trusted", "levels", "level_multipliers")
+
+    def __init__(self, whitelist: frozenset = frozenset(), trusted: Dict[int, float] = None,
+                 level_tiers: Tuple[Tuple[int, ...], Tuple[float, ...]] = ((), ())):
+        self.whitelist = whitelist
+        self.trusted = trusted or {}
+        self.levels, self.level_multipliers = level_tiers
+
+    def merge(self, whitelist: frozenset, trusted: Dict[int, float]) -> "TrustPolicy":
+        """合并群单独设置的白名单和信任用户，群设置优先"""
+        if not whitelist and not trusted:
+            return self
+        merged = dict(self.trusted)
+        merged.update(trusted)
+        return TrustPolicy(self.whitelist | whitelist, merged, (self.levels, self.level_multipliers))
+
+    def is_exempt(self, uid: int) -> bool:
+        return uid in self.whitelist
+
+    def multiplier(self, uid: int, sender: Dict[str, Any] = None) -> float:
+        """用户的阈值倍数：单独设置的信任用户优先，其次按群等级档位，都没有时为 1"""
+        multiplier = self.trusted.get(uid)
+        if multiplier is not None:
+            return multiplier
+        if self.levels and sender:
+            try:
+                level = int(sender.get("level") or 0)
+            except (TypeError, ValueError):
+                return 1.0
+            index = bisect_right(self.levels, level)
+            if index:
+                return self.level_multipliers[index - 1]
+        return 1.0
+
+
+EMPTY_POLICY = TrustPolicy()